@@ -3,8 +3,13 @@
 
 import logging
 import json
+import numbers
+import os
+import re
 import traceback
-from typing import Dict, Any, List
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
 
 try:
     import motia
@@ -34,10 +39,99 @@ from workflow_registry import (
 
 logger = logging.getLogger("BioViz.AgentRuntime")
 
+# Column aliases accepted in volcano rows, in priority order
+_VOLCANO_GENE_KEYS = ('gene', 'Gene', 'symbol', 'Symbol')
+_VOLCANO_LOGFC_KEYS = ('log2FC', 'logfc', 'logFC', 'x')
+_VOLCANO_PVAL_KEYS = ('pvalue', 'p_value', 'PVal')
+
+# Natural-language intent routing: one C-level scan per pattern (substring semantics)
+_NARRATIVE_INTENT_RE = re.compile("summarize|findings|significance|mechanism|evidence|literature")
+_SC_INTENT_RE = re.compile("single cell|spatial|trajectory|sc")
+
+_FLOAT_RE = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+
+
+def _detect_key(row: Dict[str, Any], candidates) -> Any:
+    """Return the first candidate key present in row, or None."""
+    return next((k for k in candidates if k in row), None)
+
+
+def _maybe_float(value: Any) -> Optional[float]:
+    """Coerce a cell value to float without raising; None for missing/non-numeric."""
+    if isinstance(value, (float, int)):
+        return float(value)
+    if isinstance(value, str):
+        text = value.strip()
+        return float(text) if _FLOAT_RE.fullmatch(text) else None
+    if isinstance(value, numbers.Real):
+        return float(value)
+    return None
+
+
+_fusion_pipeline = None
+
+# Raw fusion results keyed by (frozenset(genes), method); bounded LRU
+_fusion_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_FUSION_CACHE_MAX = 32
+
+
+def _get_fusion_pipeline():
+    """Import the enrichment fusion pipeline on first narrative run and reuse it."""
+    global _fusion_pipeline
+    if _fusion_pipeline is None:
+        from enrichment.fusion import fusion_pipeline
+        _fusion_pipeline = fusion_pipeline
+    return _fusion_pipeline
+
+
+def _build_enrichment_from_genes(genes: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Run ORA fusion on a gene list and reshape the clusters into enrichment rows.
+    
+    Returns None if fusion failed, otherwise the (possibly empty) row list.
+    """
+    method = "ORA"
+    key = (frozenset(genes), method)
+    fusion = _fusion_cache.get(key)
+    if fusion is not None:
+        _fusion_cache.move_to_end(key)
+    else:
+        try:
+            fusion = _get_fusion_pipeline().run_fusion_analysis(genes=genes, method=method)
+        except Exception as e:
+            logger.warning(f"Failed to derive enrichment results: {e}")
+            return None
+        # Only successful runs are cached so transient source failures are retried
+        if fusion.get("status") == "ok":
+            _fusion_cache[key] = fusion
+            if len(_fusion_cache) > _FUSION_CACHE_MAX:
+                _fusion_cache.popitem(last=False)
+
+    if fusion.get("status") != "ok":
+        return None
+
+    rows = []
+    for cluster in fusion.get("fusion_results", []):
+        get = cluster.get
+        rows.append({
+            "Term": get("representative_term") or "Unknown",
+            "P-value": get("p_value", 1.0),
+            "Adjusted P-value": get("fdr", 1.0),
+            # The narrative deduplicator accepts sequences directly; no join/split round trip
+            "Genes": tuple(get("genes") or ())
+        })
+    return rows
+
+
 class AgentRuntime:
     def __init__(self):
         self.engine = motia.WorkflowEngine()
         self.active_workflows = {}
+        # Shared pool for independent workflow steps (avoids per-call thread spawn)
+        self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="agent-step")
+        # LRU of loaded single-cell datasets keyed by (abs_path, mtime_ns, size)
+        self._sc_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._sc_cache_max = 2
         logger.info("AgentRuntime initialized with Motia Engine.")
 
 
@@ -67,6 +161,8 @@ class AgentRuntime:
         logger.info("Starting Mechanistic Narrative Workflow...")
         
         enrichment_data = params.get('enrichment_results')
+        has_input = False
+        derived_from_input = False
         if not enrichment_data:
             file_path = params.get('file_path')
             mapping = params.get('mapping') or {}
@@ -76,48 +172,38 @@ class AgentRuntime:
             top_n = int(filters.get('top_n', 200))
             volcano_data = params.get('volcano_data') or params.get('volcanoData')
             gene_list = params.get('genes') or params.get('gene_list') or params.get('geneList')
+            has_input = bool(gene_list or volcano_data or (file_path and mapping))
 
             def extract_genes_from_volcano(rows):
                 if not rows:
                     return []
+                # Resolve the schema once from the first row instead of per-row fallback chains
+                first = rows[0]
+                gene_key = _detect_key(first, _VOLCANO_GENE_KEYS)
+                lfc_key = _detect_key(first, _VOLCANO_LOGFC_KEYS)
+                if gene_key is None or lfc_key is None:
+                    return []
+                pval_key = _detect_key(first, _VOLCANO_PVAL_KEYS)
+                y_key = 'y' if 'y' in first else None
+
                 picked = []
                 ranked = []
                 for row in rows:
-                    gene = (
-                        row.get('gene')
-                        or row.get('Gene')
-                        or row.get('symbol')
-                        or row.get('Symbol')
-                    )
+                    gene = row.get(gene_key)
                     if not gene:
                         continue
-                    logfc = (
-                        row.get('log2FC')
-                        or row.get('logfc')
-                        or row.get('logFC')
-                        or row.get('x')
-                    )
-                    pval = (
-                        row.get('pvalue')
-                        or row.get('p_value')
-                        or row.get('PVal')
-                    )
-                    if pval is None and row.get('y') is not None:
-                        try:
-                            pval = 10 ** (-float(row.get('y')))
-                        except Exception:
-                            pval = None
-                    if logfc is not None:
-                        try:
-                            ranked.append((gene, abs(float(logfc)), float(pval) if pval is not None else None))
-                        except Exception:
-                            continue
-                    if pval is not None and logfc is not None:
-                        try:
-                            if float(pval) < pvalue_threshold and abs(float(logfc)) > logfc_threshold:
-                                picked.append(gene)
-                        except Exception:
-                            continue
+                    logfc = _maybe_float(row.get(lfc_key))
+                    if logfc is None:
+                        continue
+                    abs_logfc = abs(logfc)
+                    pval = _maybe_float(row.get(pval_key))
+                    if pval is None and y_key is not None:
+                        neg_log_p = _maybe_float(row.get(y_key))
+                        if neg_log_p is not None and neg_log_p >= 0:
+                            pval = 10 ** (-neg_log_p)
+                    ranked.append((gene, abs_logfc, pval))
+                    if pval is not None and pval < pvalue_threshold and abs_logfc > logfc_threshold:
+                        picked.append(gene)
                 if picked:
                     return list(dict.fromkeys(picked))
                 ranked.sort(key=lambda item: item[1], reverse=True)
@@ -125,59 +211,50 @@ class AgentRuntime:
 
             if gene_list:
                 genes = [str(g) for g in gene_list if g]
+                source = "gene_list"
             else:
                 genes = extract_genes_from_volcano(volcano_data)
+                source = "volcano_data"
 
-            if genes:
-                try:
-                    from enrichment.fusion import fusion_pipeline
-                    logger.info("Deriving enrichment results from volcano_data for narrative workflow.")
-                    fusion = fusion_pipeline.run_fusion_analysis(genes=genes, method="ORA")
-                    if fusion.get("status") == "ok":
-                        enrichment_data = []
-                        for cluster in fusion.get("fusion_results", []):
-                            term = cluster.get("representative_term") or "Unknown"
-                            genes_list = cluster.get("genes") or []
-                            enrichment_data.append({
-                                "Term": term,
-                                "P-value": cluster.get("p_value", 1.0),
-                                "Adjusted P-value": cluster.get("fdr", 1.0),
-                                "Genes": " ".join(genes_list)
-                            })
-                except Exception as e:
-                    logger.warning(f"Failed to derive enrichment results from volcano_data: {e}")
-
-            if not enrichment_data and file_path and mapping:
+            if not genes and file_path and mapping:
+                source = "file_path"
                 try:
-                    from enrichment.fusion import fusion_pipeline
-                    logger.info("Deriving enrichment results from file_path for narrative workflow.")
                     df = step_load_data(file_path=file_path, mapping=mapping)
                     if 'pvalue' in df.columns:
                         sig = df[(df['pvalue'] < pvalue_threshold) & (df['log2FC'].abs() > logfc_threshold)]
-                        genes = sig['gene'].dropna().astype(str).unique().tolist()
+                        genes = list(dict.fromkeys(sig['gene'].dropna().map(str)))
                     else:
-                        df = df.dropna(subset=['log2FC'])
-                        df = df.reindex(df['log2FC'].abs().sort_values(ascending=False).index)
-                        genes = df['gene'].dropna().astype(str).unique().tolist()[:top_n]
-
-                    if genes:
-                        fusion = fusion_pipeline.run_fusion_analysis(genes=genes, method="ORA")
-                        if fusion.get("status") == "ok":
-                            enrichment_data = []
-                            for cluster in fusion.get("fusion_results", []):
-                                term = cluster.get("representative_term") or "Unknown"
-                                genes_list = cluster.get("genes") or []
-                                enrichment_data.append({
-                                    "Term": term,
-                                    "P-value": cluster.get("p_value", 1.0),
-                                    "Adjusted P-value": cluster.get("fdr", 1.0),
-                                    "Genes": " ".join(genes_list)
-                                })
+                        # Partial selection of the top |log2FC| rows instead of a full sort + reindex
+                        top = df.assign(_abs_logfc=df['log2FC'].abs()).nlargest(top_n, '_abs_logfc')
+                        genes = top['gene'].dropna().astype(str).drop_duplicates().tolist()
                 except Exception as e:
-                    logger.warning(f"Failed to derive enrichment results: {e}")
+                    logger.warning(f"Failed to load genes from file_path: {e}")
+
+            # Single fusion run on whichever source produced genes
+            if genes:
+                logger.info(f"Deriving enrichment results from {source} for narrative workflow.")
+                enrichment_data = _build_enrichment_from_genes(genes)
+                derived_from_input = enrichment_data is not None
+
+        if not enrichment_data and derived_from_input:
+            # Fusion ran on the user's genes but nothing passed the thresholds;
+            # skip dedup/RAG/narrative rather than narrate unrelated demo data.
+            logger.info("No enriched modules derived from input; skipping narrative steps.")
+            return {
+                "status": "completed",
+                "narrative": "No significantly enriched modules at the chosen thresholds.",
+                "modules_found": 0,
+                "trace": self.engine.context.get_history()
+            }
+
+        if not enrichment_data and has_input and not params.get('demo'):
+            return {
+                "status": "error",
+                "error": "Could not derive enrichment results from the provided input."
+            }
 
         if not enrichment_data:
-            # Fallback for testing: Generate synthetic data
+            # Fallback for testing (no input, or demo=True): Generate synthetic data
             logger.warning("Narrative workflow using synthetic enrichment data (fallback).")
             enrichment_data = [
                 {'Term': 'Cell Cycle', 'P-value': 1e-5, 'Genes': 'TP53 CDK2 CCNB1'},
@@ -221,9 +298,11 @@ class AgentRuntime:
             mapping=params.get('mapping', {'gene': 'Gene', 'value': 'Log2FC'})
         )
         
-        # 2. Parallel Analysis (Sequential in Shim for now)
-        omics_result = step_multi_omics(df)
-        drugs_result = step_druggability(df)
+        # 2. Parallel Analysis (independent steps, no shared context writes)
+        omics_future = self._pool.submit(step_multi_omics, df)
+        drugs_future = self._pool.submit(step_druggability, df)
+        omics_result = omics_future.result()
+        drugs_result = drugs_future.result()
         
         # 3. Aggregate
         insights = {
@@ -256,7 +335,7 @@ class AgentRuntime:
         if not file_path:
             raise ValueError("Missing required parameter: file_path (.h5ad file)")
         
-        sc_data = step_load_sc_data(file_path)
+        sc_data = self._load_sc_cached(file_path)
         logger.info(f"Loaded {sc_data['metadata']['n_cells']} cells, {sc_data['metadata']['n_genes']} genes")
         
         # 2. Define pathways for scoring
@@ -291,6 +370,34 @@ class AgentRuntime:
             "trace": history
         }
 
+    def _load_sc_cached(self, file_path: str) -> Dict[str, Any]:
+        """
+        Load AnnData through a small LRU so repeated workflows on the same
+        .h5ad skip re-reading it. A changed mtime/size invalidates the entry.
+        """
+        abs_path = os.path.abspath(file_path)
+        try:
+            st = os.stat(abs_path)
+            key = (abs_path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            # Let the loader report the missing file
+            return step_load_sc_data(file_path)
+
+        cached = self._sc_cache.get(key)
+        if cached is not None:
+            self._sc_cache.move_to_end(key)
+            logger.info(f"Reusing cached single-cell data for {abs_path}")
+            return cached
+
+        sc_data = step_load_sc_data(file_path)
+        # Drop stale versions of the same file before inserting
+        for stale in [k for k in self._sc_cache if k[0] == abs_path]:
+            del self._sc_cache[stale]
+        self._sc_cache[key] = sc_data
+        while len(self._sc_cache) > self._sc_cache_max:
+            self._sc_cache.popitem(last=False)
+        return sc_data
+
     def process_intent(self, intent_json: Dict[str, Any]) -> Dict[str, Any]:
         """
         Main entry point for AI Panel commands.
@@ -308,10 +415,10 @@ class AgentRuntime:
             
         # Natural Language Heuristics
         intent_lower = str(intent).lower()
-        if any(k in intent_lower for k in ["summarize", "findings", "significance", "mechanism", "evidence", "literature"]):
+        if _NARRATIVE_INTENT_RE.search(intent_lower):
              logger.info(f"Mapping structured prompt '{intent}' to narrative_analysis")
              return self.run_workflow("narrative_analysis", params)
-        elif any(k in intent_lower for k in ["single cell", "spatial", "trajectory", "sc"]):
+        elif _SC_INTENT_RE.search(intent_lower):
              logger.info(f"Mapping structured prompt '{intent}' to sc_contextual")
              return self.run_workflow("sc_contextual", params)
              
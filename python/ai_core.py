@@ -4,22 +4,48 @@ Handles AI interactions with Logic Lock safety protocol.
 Supports: OpenAI, DeepSeek, Ollama, and other OpenAI-compatible APIs.
 """
 
+from __future__ import annotations
+
+import functools
+import heapq
+import itertools
 import os
 import json
+import logging
+import socket
 import sys
-from typing import Any, Dict, List, Optional
+import threading
+import time
+from types import SimpleNamespace
+from urllib.parse import urlparse
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+# Load environment variables from .env file.
+# Skipped when the parent process (Tauri, Docker, CI) already configured the
+# provider, and only done once per process (survives importlib.reload).
+_ENV_LOADED = globals().get("_ENV_LOADED", False)
+env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+if not _ENV_LOADED and not os.environ.get("AI_PROVIDER") and os.path.exists(env_path):
+    try:
+        from dotenv import load_dotenv
+        # Process environment takes precedence over the project root .env file
+        load_dotenv(env_path)
+        print(f"[AI Core] Loaded environment from: {env_path}", file=sys.stderr)
+    except ImportError:
+        print("[AI Core] Warning: python-dotenv not installed. Environment variables must be set manually.", file=sys.stderr)
+_ENV_LOADED = True
+
+logger = logging.getLogger("BioViz.AICore")
 
-# Load environment variables from .env file
 try:
-    from dotenv import load_dotenv
-    # Load from project root .env file
-    env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
-    load_dotenv(env_path, override=True)
-    print(f"[AI Core] Loaded environment from: {env_path}", file=sys.stderr)
-except ImportError:
-    print("[AI Core] Warning: python-dotenv not installed. Environment variables must be set manually.", file=sys.stderr)
-
-from openai import OpenAI
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional speedup
+    _json_loads = json.loads
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 from ai_protocol import AIAction, SafetyLevel, store_proposal
 from ai_tools import (
     get_openai_tools_schema,
@@ -52,79 +78,107 @@ from ai_tools import (
 #   export OLLAMA_BASE_URL="http://localhost:11434/v1"  # optional
 # ============================================
 
+def _get_openai():
+    """Import the OpenAI SDK on first use (it pulls in httpx/pydantic, ~300ms cold)."""
+    from openai import OpenAI
+    return OpenAI
+
+@functools.lru_cache(maxsize=64)
 def _get_env_clean(key: str, default: str = "") -> str:
     val = os.getenv(key, default)
     if val:
         val = val.strip().strip("'").strip('"')
     return val
 
+def invalidate_env_cache() -> None:
+    """Drop memoized env lookups so the next read sees the current os.environ."""
+    _get_env_clean.cache_clear()
+
+_LOCAL_HOSTS = frozenset({"localhost", "127.0.0.1", "::1"})
+
+def _is_local(url: Any) -> bool:
+    """True if ``url`` (str or httpx.URL) points at a loopback host."""
+    if not url:
+        return False
+    host = getattr(url, "host", None)
+    if host is None:
+        host = urlparse(url).hostname
+    return host in _LOCAL_HOSTS
+
+# One pooled httpx.Client per proxy mode (keyed by is_local), reused across
+# provider reconfigurations so keep-alive/TLS connections survive.
+_http_clients: Dict[bool, Any] = {}
+
+def _get_http_client(is_local: bool) -> Any:
+    client = _http_clients.get(is_local)
+    if client is None or client.is_closed:
+        import httpx
+        client = httpx.Client(trust_env=not is_local, timeout=120.0)
+        _http_clients[is_local] = client
+    return client
+
+# provider -> (default base URL, env vars tried in order for the API key).
+# A base URL of None means the SDK default. Unknown providers are "custom".
+_PROVIDER_TABLE: Dict[str, Tuple[Optional[str], Tuple[str, ...]]] = {
+    "bailian": ("https://dashscope.aliyuncs.com/compatible-mode/v1", ("DEEPSEEK_API_KEY", "DASHSCOPE_API_KEY")),
+    "deepseek": ("https://api.deepseek.com", ("DEEPSEEK_API_KEY",)),
+    "openai": (None, ("OPENAI_API_KEY",)),
+    "gemini": ("https://generativelanguage.googleapis.com/v1beta/openai/", ("GEMINI_API_KEY",)),
+    "grok": ("https://api.x.ai/v1", ("XAI_API_KEY", "GROK_API_KEY")),
+}
+_CUSTOM_SPEC = ("http://localhost:11434/v1", ("CUSTOM_API_KEY",))
+
+# Providers that cannot work without a real key (fail fast instead of placeholder).
+_KEY_REQUIRED = frozenset({"openai"})
+
+
+def _build_client(
+    provider: str,
+    api_key_override: str = "",
+    base_url_override: str = "",
+    client_to_use: Any = None,
+) -> OpenAI:
+    """Create an OpenAI-compatible client for ``provider``.
+
+    Explicit overrides win; otherwise the first non-empty env key from the
+    provider's chain and its default base URL are used.
+    """
+    OpenAI = _get_openai()
+    if provider in _PROVIDER_TABLE:
+        default_base_url, env_keys = _PROVIDER_TABLE[provider]
+    else:
+        default_base_url, env_keys = _CUSTOM_SPEC
+        default_base_url = _get_env_clean("CUSTOM_BASE_URL", default_base_url)
+
+    api_key = api_key_override or next(
+        (v for v in map(_get_env_clean, env_keys) if v), ""
+    )
+    if api_key:
+        print(f"[AI Core] API key found for {provider}.", file=sys.stderr)
+    elif provider in _KEY_REQUIRED:
+        raise ValueError(f"{env_keys[0]} environment variable not set")
+    else:
+        print(f"[AI Core] Warning: No API key found for {provider}. Using placeholder.", file=sys.stderr)
+        api_key = "sk-placeholder"
+
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url_override or default_base_url,
+        http_client=client_to_use,
+    )
+
+
 def get_ai_client() -> OpenAI:
     """
     Initialize AI client based on environment configuration.
     """
-    # We only bypass proxies if the user explicitly points to localhost/127.0.0.1
-    is_local = "localhost" in str(os.getenv("CUSTOM_BASE_URL", "")) or "127.0.0.1" in str(os.getenv("CUSTOM_BASE_URL", ""))
-    client_to_use = httpx.Client(trust_env=not is_local, timeout=120.0)
+    provider = _get_env_clean("AI_PROVIDER", "bailian").lower()
 
-    print(f"[AI Core] Initializing AI Client. Provider: {provider}", file=sys.stderr)
+    # We only bypass proxies if the user explicitly points to a loopback host
+    is_local = _is_local(_get_env_clean("CUSTOM_BASE_URL"))
 
-    if provider == "bailian":
-        api_key = _get_env_clean("DEEPSEEK_API_KEY") or _get_env_clean("DASHSCOPE_API_KEY")
-        
-        if api_key:
-            masked_key = f"{api_key[:6]}...{api_key[-4:]}" if len(api_key) > 10 else "***"
-            print(f"[AI Core] Using API Key: {masked_key}", file=sys.stderr)
-        else:
-            print("[AI Core] No API Key found for bailian!", file=sys.stderr)
-            api_key = "sk-placeholder"
-        
-        return OpenAI(
-            api_key=api_key,
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-            http_client=client_to_use
-        )
-    
-    elif provider == "deepseek":
-        api_key = _get_env_clean("DEEPSEEK_API_KEY")
-        if not api_key:
-            print("[AI Core] Warning: DEEPSEEK_API_KEY not set. Using placeholder.", file=sys.stderr)
-            api_key = "sk-placeholder"
-        
-        return OpenAI(
-            api_key=api_key,
-            base_url="https://api.deepseek.com",
-            http_client=client_to_use
-        )
-    
-    elif provider == "openai":
-        api_key = _get_env_clean("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        
-        return OpenAI(api_key=api_key, http_client=client_to_use)
-    
-    elif provider == "gemini":
-        api_key = _get_env_clean("GEMINI_API_KEY")
-        return OpenAI(
-            api_key=api_key or "sk-placeholder",
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-            http_client=client_to_use
-        )
-    
-    elif provider == "grok":
-        api_key = _get_env_clean("XAI_API_KEY") or _get_env_clean("GROK_API_KEY")
-        return OpenAI(
-            api_key=api_key or "sk-placeholder",
-            base_url="https://api.x.ai/v1",
-            http_client=client_to_use
-        )
-    
-    
-    else:
-        # Custom provider
-        api_key = _get_env_clean("CUSTOM_API_KEY", "placeholder")
-        base_url = _get_env_clean("CUSTOM_BASE_URL", "http://localhost:11434/v1")
-        return OpenAI(api_key=api_key, base_url=base_url, http_client=client_to_use)
+    print(f"[AI Core] Initializing AI Client. Provider: {provider}", file=sys.stderr)
+    return _build_client(provider, client_to_use=_get_http_client(is_local))
 
 
 def get_model_name() -> str:
@@ -144,6 +198,36 @@ _current_client: Optional[OpenAI] = None
 _current_model: str = "deepseek-v3"
 _current_config: Dict[str, Any] = {}
 
+# Single-flight TCP reachability probe for update_ai_config: rapid
+# reconfigurations reuse a recent success instead of re-resolving and
+# reconnecting to the same (host, port).
+_PROBE_TTL = 30.0
+_probe_cache: Dict[Tuple[str, int], float] = {}
+_probe_inflight: set = set()
+_probe_lock = threading.Lock()
+
+def _probe_endpoint(base_url: str) -> None:
+    try:
+        p = urlparse(base_url)
+        if p.hostname:
+            key = (p.hostname, p.port or (443 if p.scheme == 'https' else 80))
+            now = time.monotonic()
+            with _probe_lock:
+                if key in _probe_inflight or now - _probe_cache.get(key, float("-inf")) < _PROBE_TTL:
+                    return
+                _probe_inflight.add(key)
+            try:
+                with socket.create_connection(key, timeout=1):
+                    pass
+                with _probe_lock:
+                    _probe_cache[key] = now
+            finally:
+                with _probe_lock:
+                    _probe_inflight.discard(key)
+        print(f"[AI Core] New configuration reachable: {base_url}", file=sys.stderr)
+    except Exception as e:
+        print(f"[AI Core] New configuration reachability warning: {e}", file=sys.stderr)
+
 def update_ai_config(config: Dict[str, Any]) -> bool:
     """
     Update the global AI configuration and re-initialize the client.
@@ -156,55 +240,16 @@ def update_ai_config(config: Dict[str, Any]) -> bool:
     }
     """
     global _current_client, _current_model, _current_config
+    invalidate_env_cache()
     try:
-        import httpx
         provider = config.get("provider", "bailian").lower()
         api_key = config.get("apiKey", "")
         base_url = config.get("baseUrl", "")
         model = config.get("model", "")
 
         # Only bypass proxies for explicit local addresses
-        is_local = "localhost" in base_url or "127.0.0.1" in base_url
-        client_to_use = httpx.Client(trust_env=not is_local, timeout=120.0)
-
-        new_client = None
-        if provider == "bailian":
-            new_client = OpenAI(
-                api_key=api_key or _get_env_clean("DEEPSEEK_API_KEY") or _get_env_clean("DASHSCOPE_API_KEY") or "sk-placeholder",
-                base_url=base_url or "https://dashscope.aliyuncs.com/compatible-mode/v1",
-                http_client=client_to_use
-            )
-        elif provider == "deepseek":
-            new_client = OpenAI(
-                api_key=api_key or _get_env_clean("DEEPSEEK_API_KEY") or "sk-placeholder",
-                base_url=base_url or "https://api.deepseek.com",
-                http_client=client_to_use
-            )
-        elif provider == "openai":
-            new_client = OpenAI(
-                api_key=api_key or _get_env_clean("OPENAI_API_KEY"),
-                base_url=base_url or None, # Use default if empty
-                http_client=client_to_use
-            )
-        elif provider == "gemini":
-            new_client = OpenAI(
-                api_key=api_key or _get_env_clean("GEMINI_API_KEY"),
-                base_url=base_url or "https://generativelanguage.googleapis.com/v1beta/openai/",
-                http_client=client_to_use
-            )
-        elif provider == "grok":
-            new_client = OpenAI(
-                api_key=api_key or _get_env_clean("XAI_API_KEY") or _get_env_clean("GROK_API_KEY"),
-                base_url=base_url or "https://api.x.ai/v1",
-                http_client=client_to_use
-            )
-        else:
-            # Custom
-            new_client = OpenAI(
-                api_key=api_key or "placeholder",
-                base_url=base_url,
-                http_client=client_to_use
-            )
+        is_local = _is_local(base_url)
+        new_client = _build_client(provider, api_key, base_url, _get_http_client(is_local))
 
         # Update global state
         _current_client = new_client
@@ -214,71 +259,53 @@ def update_ai_config(config: Dict[str, Any]) -> bool:
         print(f"[AI Core] Reconfigured to {provider} ({_current_model}) via {base_url}", file=sys.stderr)
         
         # Lightweight connectivity test
-        def test_online():
-            try:
-                import socket
-                from urllib.parse import urlparse
-                p = urlparse(base_url)
-                if p.hostname:
-                    with socket.create_connection((p.hostname, p.port or (443 if p.scheme == 'https' else 80)), timeout=1):
-                        pass
-                print(f"[AI Core] New configuration reachable: {base_url}", file=sys.stderr)
-            except Exception as e:
-                print(f"[AI Core] New configuration reachability warning: {e}", file=sys.stderr)
-        
-        import threading
-        threading.Thread(target=test_online, daemon=True).start()
+        threading.Thread(target=_probe_endpoint, args=(base_url,), daemon=True).start()
         
         return True
     except Exception as e:
         print(f"[AI Core] Failed to update config: {e}", file=sys.stderr)
         return False
 
+def _check_ai_online(base_url: Any) -> None:
+    """Lightweight connectivity test: a DNS/TCP check for local servers, not a full API call."""
+    try:
+        if _is_local(base_url):
+            # Local check
+            p = urlparse(str(base_url))
+            with socket.create_connection((p.hostname or "localhost", p.port or 11434), timeout=1):
+                pass
+        print(f"[AI Core] Connectivity check OK for {base_url}", file=sys.stderr)
+    except Exception as e:
+        print(f"[AI Core] Connectivity check FAILED: {e}", file=sys.stderr)
+
 def get_current_client() -> OpenAI:
+    """Return the active client, building it from the environment on first use."""
     global _current_client
     if _current_client is None:
-        _current_client = get_ai_client()
+        try:
+            _current_client = get_ai_client()
+        except Exception as e:
+            err_msg = str(e)
+            if "Connection refused" in err_msg and "dashscope" in err_msg.lower():
+                err_msg = "Connection to Alibaba Cloud Bailian failed. Please check your network and API Key."
+            elif "OPENAI_API_KEY" in err_msg:
+                err_msg = "OpenAI API Key is missing. Please set OPENAI_API_KEY in your .env file."
+            print(f"[AI Core] CRITICAL: {err_msg}", file=sys.stderr)
+            raise
+        print(f"[AI Core] Initializing with model: {_current_model}", file=sys.stderr)
+        # Probe in the background; the check only logs, so callers never wait on it
+        threading.Thread(
+            target=_check_ai_online, args=(_current_client.base_url,), daemon=True
+        ).start()
     return _current_client
 
 def get_current_model() -> str:
     global _current_model
     return _current_model
 
-# Initialize client and handle configuration Resilience
-try:
-    _current_client = get_ai_client()
-    _current_model = get_model_name()
-    
-    # Proactive connectivity test (Lightweight)
-    print(f"[AI Core] Initializing with model: {_current_model}", file=sys.stderr)
-    
-    def check_ai_online():
-        try:
-            import httpx
-            # Just a DNS/TCP check, not a full API call
-            base_url = _current_client.base_url
-            if "localhost" in str(base_url) or "127.0.0.1" in str(base_url):
-                # Local check
-                import socket
-                from urllib.parse import urlparse
-                p = urlparse(str(base_url))
-                with socket.create_connection((p.hostname or "localhost", p.port or 11434), timeout=1):
-                    pass
-            print(f"[AI Core] Connectivity check OK for {base_url}", file=sys.stderr)
-        except Exception as e:
-            print(f"[AI Core] Connectivity check FAILED: {e}", file=sys.stderr)
-
-    check_ai_online()
-except Exception as e:
-    err_msg = str(e)
-    if "Connection refused" in err_msg and "dashscope" in err_msg.lower():
-        err_msg = "Connection to Alibaba Cloud Bailian failed. Please check your network and API Key."
-    elif "OPENAI_API_KEY" in err_msg:
-        err_msg = "OpenAI API Key is missing. Please set OPENAI_API_KEY in your .env file."
-    
-    print(f"[AI Core] CRITICAL: {err_msg}", file=sys.stderr)
-    client = None
-    DEFAULT_MODEL = "gpt-4o-mini"
+# The client itself is built lazily by get_current_client(); resolving the
+# model name here is just env lookups.
+_current_model = get_model_name()
 
 
 # --- System Prompt ---
@@ -318,11 +345,132 @@ Be concise and helpful. Focus on biological insights.
 """
 
 
+def _collect_stream(stream: Any, on_update: Optional[Any] = None) -> SimpleNamespace:
+    """Accumulate a streamed chat completion into a message-like object.
+
+    Mirrors the ``content`` / ``tool_calls[i].function.{name,arguments}`` shape
+    of a non-streamed ``ChatCompletionMessage``. Returns ``None`` when the
+    stream yields no chunks at all.
+    """
+    content_parts: List[str] = []
+    calls: Dict[int, Dict[str, Any]] = {}
+    announced = False
+    received = False
+    for chunk in stream:
+        received = True
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta is None:
+            continue
+        if delta.content:
+            if on_update and not announced:
+                on_update("AI_PROCESS_UPDATE", {"stepIndex": 1, "status": "streaming"})
+                announced = True
+            content_parts.append(delta.content)
+        for tc in delta.tool_calls or ():
+            slot = calls.setdefault(tc.index, {"id": None, "name": [], "arguments": []})
+            if tc.id:
+                slot["id"] = tc.id
+            if tc.function is not None:
+                if tc.function.name:
+                    slot["name"].append(tc.function.name)
+                if tc.function.arguments:
+                    slot["arguments"].append(tc.function.arguments)
+
+    tool_calls = [
+        SimpleNamespace(
+            id=slot["id"],
+            type="function",
+            function=SimpleNamespace(name="".join(slot["name"]), arguments="".join(slot["arguments"])),
+        )
+        for _, slot in sorted(calls.items())
+    ]
+    if not received:
+        return None
+    return SimpleNamespace(content="".join(content_parts) or None, tool_calls=tool_calls or None)
+
+
+def _complete_message(client: Any, on_update: Optional[Any] = None, **request: Any) -> Any:
+    """Run a chat completion, streaming when the backend actually streams.
+
+    Some OpenAI-compatible backends ignore ``stream=True`` and answer with a
+    plain JSON body, which the SDK would parse as an empty event stream; that
+    body is read and parsed as a regular completion. Only an event stream that
+    yields no chunks at all is repeated with ``stream=False``.
+    """
+    stream = client.chat.completions.create(stream=True, **request)
+    content_type = stream.response.headers.get("content-type", "")
+    if not content_type.startswith("text/event-stream"):
+        from openai.types.chat import ChatCompletion
+        try:
+            body = stream.response.read()
+        finally:
+            stream.close()
+        return ChatCompletion.model_validate_json(body).choices[0].message
+    message = _collect_stream(stream, on_update)
+    if message is not None:
+        return message
+    logger.info("Backend sent an empty event stream; retrying without stream")
+    response = client.chat.completions.create(stream=False, **request)
+    return response.choices[0].message
+
+
+def _summarize_render(result: Dict[str, Any]) -> str:
+    stats = result.get("statistics", {})
+    return f"Rendered pathway with {stats.get('total_nodes', 0)} nodes: {stats.get('upregulated', 0)} upregulated, {stats.get('downregulated', 0)} downregulated."
+
+
+def _summarize_render_and_analyze(result: Dict[str, Any]) -> str:
+    summary = _summarize_render(result)
+    enrichment = result.get("enrichment")
+    if enrichment is not None:
+        if enrichment.get("error"):
+            summary += f" Enrichment failed: {enrichment['error']}"
+        else:
+            summary += f" Enrichment found {enrichment.get('total_terms', 0)} terms."
+    return summary
+
+
+# Green-zone tool name -> user-facing summary of its result
+_SUMMARY_BUILDERS: Dict[str, Callable[[Any], str]] = {
+    "render_pathway": _summarize_render,
+    "render_and_analyze": _summarize_render_and_analyze,
+    "get_pathway_stats": lambda r: f"Statistics: {r.get('upregulated', 0)} upregulated, {r.get('downregulated', 0)} downregulated out of {r.get('total_nodes', 0)} nodes.",
+    "list_pathways": lambda r: f"Found {len(r)} available pathway templates.",
+    "explain_pathway": lambda r: r,
+}
+
+
 # --- Main Processing Function ---
 
+def _scan_volcano(
+    volcano_data: List[Dict[str, Any]], top_n: int = 15, keep_sig: int = 50
+) -> Tuple[List[Any], int, List[Dict[str, Any]]]:
+    """Walk volcano points once.
+
+    Returns the first ``keep_sig`` significant (UP/DOWN) gene names, the total
+    significant count, and the ``top_n`` points by |x| (ties keep input order).
+    """
+    sig: List[Any] = []
+    n_sig = 0
+    top: List[Tuple[float, int, Dict[str, Any]]] = []  # min-heap of (|x|, -index, point)
+    for i, g in enumerate(volcano_data):
+        if g.get('status') in ('UP', 'DOWN'):
+            n_sig += 1
+            if len(sig) < keep_sig:
+                sig.append(g.get('gene'))
+        item = (abs(g.get('x', 0)), -i, g)
+        if len(top) < top_n:
+            heapq.heappush(top, item)
+        elif item[0] > top[0][0]:
+            heapq.heapreplace(top, item)
+    top.sort(reverse=True)
+    return sig, n_sig, [g for _, _, g in top]
+
 def process_query(
     user_query: str,
-    history: Optional[List[Dict[str, str]]] = None,
+    history: Optional[Union[List[Dict[str, str]], Deque[Dict[str, str]]]] = None,
     context: Optional[Dict[str, Any]] = None,
     on_update: Optional[Any] = None
 ) -> AIAction:
@@ -331,7 +479,7 @@ def process_query(
     
     Args:
         user_query: The user's question/request
-        history: Previous conversation messages
+        history: Previous conversation messages (list, or a deque(maxlen=10))
         context: Optional context data (e.g., current pathway, gene expression data)
     
     Returns:
@@ -341,7 +489,7 @@ def process_query(
     context = context or {}
     
     # Debug: Log context data
-    print(f"[AI Core] Processing query: {user_query[:50]}...", file=sys.stderr)
+    logger.debug("Processing query: %.50s...", user_query)
     
     if on_update:
         on_update("AI_PROCESS_START", {
@@ -349,109 +497,115 @@ def process_query(
             "steps": ["Analyzing context", "Consulting BioEngine", "Verifying Safety"]
         })
 
-    if context:
-        print(f"[AI Core] Context keys: {list(context.keys())}", file=sys.stderr)
-        if 'pathway' in context and context['pathway']:
-            pathway_id = context['pathway'].get('id', 'unknown')
-            pathway_name = context['pathway'].get('name', 'unknown')
-            print(f"[AI Core] Current pathway: {pathway_id} - {pathway_name}", file=sys.stderr)
-        if 'volcanoData' in context:
-            print(f"[AI Core] Volcano data points: {len(context.get('volcanoData', []))}", file=sys.stderr)
-    else:
-        print(f"[AI Core] No context provided", file=sys.stderr)
+    if logger.isEnabledFor(logging.DEBUG):
+        if context:
+            logger.debug("Context keys: %s", list(context))
+            if context.get('pathway'):
+                logger.debug("Current pathway: %s - %s",
+                             context['pathway'].get('id', 'unknown'), context['pathway'].get('name', 'unknown'))
+            if 'volcanoData' in context:
+                logger.debug("Volcano data points: %d", len(context.get('volcanoData') or []))
+        else:
+            logger.debug("No context provided")
     
     # Build system message with context awareness
-    system_message = SYSTEM_PROMPT
+    # SYSTEM_PROMPT stays at offset 0 so the prefix is byte-stable across turns
+    # (provider-side prompt caching); dynamic sections are joined once below.
+    system_parts = [SYSTEM_PROMPT]
     lang_note = _language_system_note(context)
     if lang_note:
-        system_message += f"\n\n{lang_note}"
+        system_parts.append(f"\n\n{lang_note}")
     
     # Add context information to system message if available
+    significant_genes: List[Any] = []
     if context:
-        context_info = f"\n\n**CURRENT ANALYSIS CONTEXT:**\n"
+        parts = ["\n\n**CURRENT ANALYSIS CONTEXT:**\n"]
         
         # 1. First, handle general study data (Volcano/DE)
         if context.get('volcanoData'):
             volcano_data = context['volcanoData']
-            context_info += f"- Data Overview: {len(volcano_data)} genes loaded in the active analysis.\n"
+            parts.append(f"- Data Overview: {len(volcano_data)} genes loaded in the active analysis.\n")
             
-            # Extract significant genes for enrichment analysis
-            significant_genes = [
-                gene.get('gene') for gene in volcano_data 
-                if gene.get('status') in ['UP', 'DOWN']
-            ]
+            # One pass: significant-gene head + count, and the top hits by |logFC|
+            significant_genes, n_significant, top_genes = _scan_volcano(volcano_data)
             
             if significant_genes:
-                context_info += f"- Significant Genes ({len(significant_genes)}): {', '.join(significant_genes[:20])}"
-                if len(significant_genes) > 20:
-                    context_info += f" ...and {len(significant_genes) - 20} more\n"
+                parts.append(f"- Significant Genes ({n_significant}): {', '.join(significant_genes[:20])}")
+                if n_significant > 20:
+                    parts.append(f" ...and {n_significant - 20} more\n")
                 else:
-                    context_info += "\n"
+                    parts.append("\n")
                 
                 # Crucial for tool use
-                context_info += f"\n**IMPORTANT**: To perform enrichment analysis on these genes, use `run_enrichment(genes={significant_genes[:50]})`.\n"
-                context_info += f"**IMPORTANT**: To export this differential expression data, use `export_data(format='csv')`.\n"
+                # The gene list itself is injected into the tool call below rather than
+                # echoed into the prompt (saves ~1 KB of tokens per turn).
+                parts.append(
+                    "\n**IMPORTANT**: To perform enrichment analysis on these genes, call `run_enrichment` "
+                    f"with an empty `gene_list` (the top {len(significant_genes)} significant genes are pre-supplied).\n"
+                )
+                parts.append("**IMPORTANT**: To export this differential expression data, use `export_data(format='csv')`.\n")
             
             # Show top hits for orientation
-            sorted_genes = sorted(volcano_data, key=lambda x: abs(x.get('x', 0)), reverse=True)
-            context_info += "\n**Top Differential Genes:**\n"
-            for gene in sorted_genes[:15]:
-                gene_name = gene.get('gene', 'unknown')
-                logfc = gene.get('x', 0)
-                status = gene.get('status', 'NS')
-                context_info += f"  - {gene_name}: LogFC={logfc:.2f} ({status})\n"
+            parts.append("\n**Top Differential Genes:**\n")
+            parts.extend(
+                f"  - {g.get('gene', 'unknown')}: LogFC={g.get('x', 0):.2f} ({g.get('status', 'NS')})\n"
+                for g in top_genes
+            )
 
         # 2. Then, handle specific pathway selection if active
         if context.get('pathway'):
             pathway = context['pathway']
             pathway_name = pathway.get('title') or pathway.get('name', 'Unknown')
-            context_info += f"\n**ACTIVE PATHWAY FOCUS:**\n"
-            context_info += f"- Current Pathway: {pathway_name} (ID: {pathway.get('id', 'unknown')})\n"
+            parts.append("\n**ACTIVE PATHWAY FOCUS:**\n")
+            parts.append(f"- Current Pathway: {pathway_name} (ID: {pathway.get('id', 'unknown')})\n")
             
             if context.get('statistics'):
                 stats = context['statistics']
-                context_info += f"- Nodes in this pathway: {stats.get('total_nodes', 0)}\n"
-                context_info += f"- Pathway Stats: {stats.get('upregulated', 0)} UP, {stats.get('downregulated', 0)} DOWN\n"
+                parts.append(f"- Nodes in this pathway: {stats.get('total_nodes', 0)}\n")
+                parts.append(f"- Pathway Stats: {stats.get('upregulated', 0)} UP, {stats.get('downregulated', 0)} DOWN\n")
 
-        system_message += context_info
-        print(f"[AI Core] Injected analysis context ({len(context_info)} chars)", file=sys.stderr)
+        context_info = "".join(parts)
+        system_parts.append(context_info)
+        logger.debug("Injected analysis context (%d chars)", len(context_info))
     
     # Handle multi-sample context for time-series comparison
     if context and context.get('multiSample'):
         sample_groups = context.get('sampleGroups', [])
         expression_data = context.get('expressionData', {})
         
-        multi_info = f"\n\n**MULTI-SAMPLE TIME-SERIES DATA:**\n"
-        multi_info += f"- Sample Groups: {', '.join(sample_groups)}\n\n"
+        multi_parts = [
+            "\n\n**MULTI-SAMPLE TIME-SERIES DATA:**\n",
+            f"- Sample Groups: {', '.join(sample_groups)}\n\n",
+        ]
         
         for group in sample_groups:
             group_data = expression_data.get(group, [])
             if group_data:
-                multi_info += f"**{group} Expression Data:**\n"
+                multi_parts.append(f"**{group} Expression Data:**\n")
                 # Sort by absolute logfc
-                sorted_data = sorted(group_data, key=lambda x: abs(x.get('logfc', 0)), reverse=True)
-                for gene in sorted_data[:10]:  # Top 10 genes
+                top_data = heapq.nlargest(10, group_data, key=lambda x: abs(x.get('logfc', 0)))
+                for gene in top_data:  # Top 10 genes
                     gene_name = gene.get('gene', 'unknown')
                     logfc = gene.get('logfc', 0)
                     pvalue = gene.get('pvalue', 1)
                     status = "UP" if logfc > 0 and pvalue < 0.05 else ("DOWN" if logfc < 0 and pvalue < 0.05 else "NS")
-                    multi_info += f"  - {gene_name}: LogFC={logfc:.2f}, P={pvalue:.4f} ({status})\n"
-                multi_info += "\n"
+                    multi_parts.append(f"  - {gene_name}: LogFC={logfc:.2f}, P={pvalue:.4f} ({status})\n")
+                multi_parts.append("\n")
         
-        multi_info += """
+        multi_parts.append("""
 **对于以上多时间点数据，请提供详细的文本分析，并根据用户需求调用相应工具（如 export_data 或 run_enrichment）。**
-"""
-        system_message += multi_info
-        print(f"[AI Core] Added multi-sample context: {len(sample_groups)} groups", file=sys.stderr)
+""")
+        system_parts.extend(multi_parts)
+        logger.debug("Added multi-sample context: %d groups", len(sample_groups))
     
-    messages = [{"role": "system", "content": system_message}]
-    
-    # Add history
-    for msg in history[-10:]:  # Keep last 10 messages
-        messages.append(msg)
-    
-    # Add current query
-    messages.append({"role": "user", "content": user_query})
+    # system + last 10 history messages + current query, sized up front.
+    # islice handles both lists and deques without an intermediate slice copy.
+    n_hist = min(len(history), 10)
+    messages: List[Any] = [None] * (n_hist + 2)
+    messages[0] = {"role": "system", "content": "".join(system_parts)}
+    if n_hist:
+        messages[1:1 + n_hist] = itertools.islice(history, len(history) - n_hist, None)
+    messages[-1] = {"role": "user", "content": user_query}
     
     if on_update:
         on_update("AI_PROCESS_UPDATE", {"stepIndex": 0, "status": "done"})
@@ -465,15 +619,15 @@ def process_query(
         current_client = get_current_client()
         current_model = get_current_model()
         
-        response = current_client.chat.completions.create(
+        message = _complete_message(
+            current_client,
+            on_update,
             model=current_model,
             messages=messages,
             tools=tools,
-            tool_choice="auto"
+            tool_choice="auto",
         )
         
-        message = response.choices[0].message
-        
         if on_update:
             on_update("AI_PROCESS_UPDATE", {"stepIndex": 1, "status": "done"})
             on_update("AI_PROCESS_UPDATE", {"stepIndex": 2, "status": "active"})
@@ -493,12 +647,12 @@ def process_query(
         # Safely parse tool arguments
         try:
             args_str = tool_call.function.arguments
-            print(f"[AI Core] Tool arguments string: {args_str[:200] if args_str else 'empty'}", file=sys.stderr)
-            tool_args = json.loads(args_str) if args_str else {}
-        except json.JSONDecodeError as e:
+            logger.debug("Tool arguments string: %.200s", args_str or "empty")
+            tool_args = _json_loads(args_str) if args_str else {}
+        except (json.JSONDecodeError, ValueError) as e:
             error_detail = f"{str(e)} at position {e.pos}" if hasattr(e, 'pos') else str(e)
-            print(f"[AI Core] JSON decode error: {error_detail}", file=sys.stderr)
-            print(f"[AI Core] Raw arguments (full): {tool_call.function.arguments}", file=sys.stderr)
+            logger.warning("JSON decode error: %s", error_detail)
+            logger.debug("Raw arguments (full): %s", tool_call.function.arguments)
             return AIAction.chat(
                 f"遇到工具参数解析错误。\n"
                 f"错误详情: {error_detail}\n"
@@ -517,21 +671,14 @@ def process_query(
                 if "gene_expression" in tool_args and not tool_args.get("gene_expression"):
                     if context.get("gene_expression"):
                         tool_args["gene_expression"] = context["gene_expression"]
+                if tool_name in ("run_enrichment", "render_and_analyze") and not tool_args.get("gene_list") and significant_genes:
+                    tool_args["gene_list"] = list(significant_genes)
                 
                 result = execute_tool(tool_name, tool_args)
                 
                 # Generate summary based on tool
-                if tool_name == "render_pathway":
-                    stats = result.get("statistics", {})
-                    summary = f"Rendered pathway with {stats.get('total_nodes', 0)} nodes: {stats.get('upregulated', 0)} upregulated, {stats.get('downregulated', 0)} downregulated."
-                elif tool_name == "get_pathway_stats":
-                    summary = f"Statistics: {result.get('upregulated', 0)} upregulated, {result.get('downregulated', 0)} downregulated out of {result.get('total_nodes', 0)} nodes."
-                elif tool_name == "list_pathways":
-                    summary = f"Found {len(result)} available pathway templates."
-                elif tool_name == "explain_pathway":
-                    summary = result
-                else:
-                    summary = f"Executed {tool_def.label} successfully."
+                builder = _SUMMARY_BUILDERS.get(tool_name)
+                summary = builder(result) if builder else f"Executed {tool_def.label} successfully."
                 
                 if on_update:
                     on_update("AI_PROCESS_UPDATE", {
@@ -569,7 +716,7 @@ def process_query(
         if on_update:
             on_update("AI_PROCESS_COMPLETE", {"status": "error"})
         error_msg = str(e)
-        print(f"[AI Core] Error: {error_msg}", file=sys.stderr)
+        logger.error("Error: %s", error_msg)
         return AIAction.chat(f"Sorry, I encountered an error: {error_msg}")
 
 
@@ -636,16 +783,17 @@ def reject_proposal(proposal_id: str) -> AIAction:
         return AIAction.chat(f"Proposal {proposal_id} not found.")
 # --- Language Guidance ---
 
+_LANG_ZH = (
+    "Output language: Simplified Chinese. Keep gene/protein/pathway names, "
+    "database names, statistical symbols, and software names in English."
+)
+_LANG_EN = "Output language: English."
+_LANG_PREFIX = {"zh": _LANG_ZH, "en": _LANG_EN}
+
+
 def _language_system_note(context: Dict[str, Any]) -> str:
     lang = (context or {}).get("ui_language") or (context or {}).get("language") or ""
     if not lang:
         return ""
     lang = str(lang).lower()
-    if lang.startswith("zh"):
-        return (
-            "Output language: Simplified Chinese. Keep gene/protein/pathway names, "
-            "database names, statistical symbols, and software names in English."
-        )
-    if lang.startswith("en"):
-        return "Output language: English."
-    return f"Output language: {lang}. Keep technical terms in English where appropriate."
+    return _LANG_PREFIX.get(lang[:2]) or f"Output language: {lang}. Keep technical terms in English where appropriate."
@@ -4,8 +4,10 @@ Defines safety levels and action models for the Logic Lock system.
 """
 
 from enum import Enum
-from typing import Any, Dict, Literal, Optional
+from typing import Any, Dict, List, Literal, Optional, Tuple
 from pydantic import BaseModel, Field
+import heapq
+import time
 import uuid
 
 
@@ -35,15 +37,18 @@ class AIAction(BaseModel):
     proposal_id: Optional[str] = None
     proposal_reason: Optional[str] = None  # Why this needs confirmation
     
+    # The factories below build from trusted internal values, so they use
+    # model_construct() and skip field validation.
+
     @classmethod
     def chat(cls, content: str) -> "AIAction":
         """Create a simple chat response."""
-        return cls(type="CHAT", content=content)
+        return cls.model_construct(type="CHAT", content=content)
     
     @classmethod
     def execute(cls, tool_name: str, tool_label: str, tool_args: Dict[str, Any], result: Any, summary: str) -> "AIAction":
         """Create an executed action response (Green Zone)."""
-        return cls(
+        return cls.model_construct(
             type="EXECUTE",
             content=summary,
             tool_name=tool_name,
@@ -54,12 +59,12 @@ class AIAction(BaseModel):
     @classmethod
     def proposal(cls, tool_name: str, tool_label: str, tool_args: Dict[str, Any], reason: str) -> "AIAction":
         """Create a proposal for user confirmation (Yellow Zone)."""
-        return cls(
+        return cls.model_construct(
             type="PROPOSAL",
             content=f"I'd like to {tool_label}. {reason}",
             tool_name=tool_name,
             tool_args=tool_args,
-            proposal_id=str(uuid.uuid4()),
+            proposal_id=uuid.uuid4().hex,
             proposal_reason=reason
         )
 
@@ -74,19 +79,23 @@ class PendingProposal(BaseModel):
     
 # In-memory store for pending proposals (simple approach for desktop app)
 _pending_proposals: Dict[str, PendingProposal] = {}
+# (created_at, proposal_id) min-heap for age-ordered eviction. Entries for
+# proposals that were already removed are skipped lazily.
+_proposal_heap: List[Tuple[float, str]] = []
 
 
 def store_proposal(proposal: AIAction) -> None:
     """Store a proposal for later execution upon user confirmation."""
     if proposal.type != "PROPOSAL" or not proposal.proposal_id:
         return
-    import time
+    created_at = time.time()
     _pending_proposals[proposal.proposal_id] = PendingProposal(
         proposal_id=proposal.proposal_id,
         tool_name=proposal.tool_name or "",
         tool_args=proposal.tool_args or {},
-        created_at=time.time()
+        created_at=created_at
     )
+    heapq.heappush(_proposal_heap, (created_at, proposal.proposal_id))
 
 
 def get_proposal(proposal_id: str) -> Optional[PendingProposal]:
@@ -101,12 +110,12 @@ def remove_proposal(proposal_id: str) -> Optional[PendingProposal]:
 
 def cleanup_old_proposals(max_age_seconds: float = 3600) -> int:
     """Remove proposals older than max_age_seconds. Returns count removed."""
-    import time
     now = time.time()
-    to_remove = [
-        pid for pid, p in _pending_proposals.items()
-        if now - p.created_at > max_age_seconds
-    ]
-    for pid in to_remove:
-        del _pending_proposals[pid]
-    return len(to_remove)
+    removed = 0
+    while _proposal_heap and now - _proposal_heap[0][0] > max_age_seconds:
+        ts, pid = heapq.heappop(_proposal_heap)
+        p = _pending_proposals.get(pid)
+        if p is not None and p.created_at == ts:
+            del _pending_proposals[pid]
+            removed += 1
+    return removed
@@ -3,10 +3,27 @@ BioViz Local - AI Tool Definitions
 Defines available tools with safety classifications for the Logic Lock system.
 """
 
+import hashlib
+import heapq
+import inspect
+import itertools
 import os
 import json
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
 from ai_protocol import SafetyLevel
 import mapper
 from prompts import (
@@ -34,7 +51,8 @@ class ToolDefinition:
         description: str,
         parameters: Dict[str, Any],
         safety_level: SafetyLevel,
-        handler: Callable[..., Any]
+        handler: Callable[..., Any],
+        concurrency_safe: bool = False
     ):
         self.name = name
         self.label = label
@@ -42,6 +60,10 @@ class ToolDefinition:
         self.parameters = parameters  # JSON Schema format
         self.safety_level = safety_level
         self.handler = handler
+        # Resolved once here so execute_tool never has to inspect the handler
+        self.accepts_context = 'context' in inspect.signature(handler).parameters
+        # Read-only handlers with no shared mutable state may run in parallel
+        self.concurrency_safe = concurrency_safe
     
     def to_openai_schema(self) -> Dict[str, Any]:
         """Convert to OpenAI function calling format."""
@@ -61,6 +83,8 @@ STRUCTURED_SYSTEM_MESSAGE = (
     "Use only provided data, cite real statistics, and mark speculative content as 'Hypothesis (not validated)'. "
     "If required fields are missing, say what is needed instead of guessing."
 )
+# Shared (never mutated) system message for every structured prompt
+_STRUCTURED_SYSTEM_MSG = {"role": "system", "content": STRUCTURED_SYSTEM_MESSAGE}
 
 
 def _get_llm_client_and_model() -> Tuple[Any, str]:
@@ -72,38 +96,89 @@ def _get_llm_client_and_model() -> Tuple[Any, str]:
     return client, model
 
 
-def _invoke_structured_prompt(prompt: str, temperature: float = 0.2, max_tokens: int = 900) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+# Content-addressed cache of successful completions, keyed on
+# (endpoint, model, temperature, max_tokens, digest of prompt). Identical
+# renders (UI refreshes, retried exports) skip the network round-trip.
+_completion_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_COMPLETION_CACHE_MAX = 512
+# invoke_many runs prompts on worker threads; every cache access holds this
+_completion_cache_lock = threading.Lock()
+
+
+def _invoke_structured_prompt(
+    prompt: str,
+    temperature: float = 0.2,
+    max_tokens: int = 900,
+    use_cache: bool = True
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
     """
     Call the configured LLM with a structured system message.
     Returns (content, model_name, error_message).
+    Set use_cache=False for exploratory prompts that should vary between calls.
     """
+    if not prompt or not prompt.strip():
+        return None, None, "Empty prompt"
+
     try:
         client, model_name = _get_llm_client_and_model()
     except Exception as e:
         return None, None, str(e)
 
+    key = None
+    if use_cache:
+        digest = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+        key = (str(getattr(client, "base_url", "")), model_name, temperature, max_tokens, digest)
+        with _completion_cache_lock:
+            cached = _completion_cache.get(key)
+            if cached is not None:
+                _completion_cache.move_to_end(key)
+        if cached is not None:
+            return cached, model_name, None
+
     try:
         response = client.chat.completions.create(
             model=model_name,
-            messages=[
-                {"role": "system", "content": STRUCTURED_SYSTEM_MESSAGE},
-                {"role": "user", "content": prompt}
-            ],
+            messages=[_STRUCTURED_SYSTEM_MSG, {"role": "user", "content": prompt}],
             temperature=temperature,
             max_tokens=max_tokens
         )
-        content = response.choices[0].message.content or ""
-        return content.strip(), model_name, None
+        content = (response.choices[0].message.content or "").strip()
     except Exception as e:
         return None, None, str(e)
 
+    if key is not None and content:
+        with _completion_cache_lock:
+            _completion_cache[key] = content
+            _completion_cache.move_to_end(key)
+            while len(_completion_cache) > _COMPLETION_CACHE_MAX:
+                _completion_cache.popitem(last=False)
+    return content, model_name, None
+
+
+_LLM_MAX_CONCURRENCY = 4
+
+
+def invoke_many(calls: List[Callable[[], Any]]) -> List[Any]:
+    """
+    Run several independent LLM-backed calls concurrently and return their
+    results in order. Calls share the pooled HTTP client, so end-to-end latency
+    is roughly the slowest call instead of the sum.
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+    with ThreadPoolExecutor(max_workers=min(_LLM_MAX_CONCURRENCY, len(calls))) as pool:
+        return list(pool.map(lambda call: call(), calls))
+
 
 def _to_float(value: Any, default: Optional[float] = None) -> Optional[float]:
     """Safely convert values (including percentage strings) to float."""
     if value is None:
         return default
-    if isinstance(value, (int, float)):
+    # Fast path: numbers and clean numeric strings need no normalisation
+    try:
         return float(value)
+    except (ValueError, TypeError):
+        pass
     try:
         s = str(value).strip().rstrip('%')
         return float(s)
@@ -111,6 +186,56 @@ def _to_float(value: Any, default: Optional[float] = None) -> Optional[float]:
         return default
 
 
+# Key aliases in priority order for the enrichment/volcano shapes we accept
+_NAME_KEYS = ("term", "name", "pathway_name", "representative_term", "pathway", "pathway_id", "id")
+_PVAL_KEYS = ("p_value", "pvalue", "p", "NOM p-val")
+_FDR_KEYS = ("adjusted_p_value", "fdr", "q_value", "FDR q-val")
+_GENES_KEYS = ("genes", "hit_genes", "overlap", "leadingEdge")
+_SCORE_KEYS = ("combined_score", "score", "nes")
+_FUSION_TERM_KEYS = ("members", "isFused", "representative_term")
+_FUSION_SOURCE_MARKERS = frozenset({"fusion"})
+_ROW_GENE_KEYS = ("gene", "id", "name")
+_MISSING = object()
+# "A; B,C" -> ["A", "B", "C"]; surrounding whitespace is consumed by the split
+_GENE_DELIM = re.compile(r"\s*[;,]\s*")
+
+
+def _first(d: Dict[str, Any], keys: Tuple[str, ...], default: Any = _MISSING) -> Any:
+    """Equivalent to ``d.get(k1) or d.get(k2) or ... [or default]``."""
+    v = None
+    for k in keys:
+        v = d.get(k)
+        if v:
+            return v
+    return v if default is _MISSING else default
+
+
+def _to_float_column(values: List[Any]) -> List[Optional[float]]:
+    """Vectorized _to_float over a column; None stays None."""
+    if not values:
+        return []
+    try:
+        arr = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        # Mixed column (e.g. "5%" strings): fall back to per-value parsing
+        return [_to_float(v) for v in values]
+    if arr.ndim != 1:
+        return [_to_float(v) for v in values]
+    return [None if v is None else x for v, x in zip(values, arr.tolist())]
+
+
+def _float_array(values: List[Any], default: float) -> np.ndarray:
+    """Vectorized ``_to_float(v, default) or default`` over a column."""
+    try:
+        arr = np.asarray([default if v is None else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        arr = None
+    if arr is None or arr.ndim != 1:
+        return np.asarray([_to_float(v, default) or default for v in values], dtype=np.float64)
+    arr[arr == 0] = default
+    return arr
+
+
 def _normalize_enriched_terms(enrichment_data: Any) -> List[Dict[str, Any]]:
     """
     Normalize enrichment results to a common shape.
@@ -130,40 +255,45 @@ def _normalize_enriched_terms(enrichment_data: Any) -> List[Dict[str, Any]]:
     elif isinstance(enrichment_data, list):
         terms = enrichment_data
 
-    normalized: List[Dict[str, Any]] = []
+    # Pass 1: pick names/genes and raw numeric fields per term. Pass 2: coerce
+    # each numeric column in one vectorized call instead of per-field.
+    names: List[Any] = []
+    gene_lists: List[List[str]] = []
+    raw_pval: List[Any] = []
+    raw_fdr: List[Any] = []
+    raw_score: List[Any] = []
     for term in terms:
         if not isinstance(term, dict):
             continue
-        name = (
-            term.get("term")
-            or term.get("name")
-            or term.get("pathway_name")
-            or term.get("representative_term")
-            or term.get("pathway")
-            or term.get("pathway_id")
-            or term.get("id")
-            or "unknown"
-        )
-        pval = _to_float(term.get("p_value") or term.get("pvalue") or term.get("p") or term.get("NOM p-val"))
-        fdr = _to_float(term.get("adjusted_p_value") or term.get("fdr") or term.get("q_value") or term.get("FDR q-val"))
-        genes_raw = term.get("genes") or term.get("hit_genes") or term.get("overlap") or term.get("leadingEdge")
+        names.append(_first(term, _NAME_KEYS, "unknown"))
+        raw_pval.append(_first(term, _PVAL_KEYS))
+        raw_fdr.append(_first(term, _FDR_KEYS))
+        genes_raw = _first(term, _GENES_KEYS)
         if isinstance(genes_raw, str):
-            genes = [g.strip() for g in genes_raw.replace(";", ",").split(",") if g.strip()]
+            genes = [g for g in _GENE_DELIM.split(genes_raw.strip()) if g]
         elif isinstance(genes_raw, list):
-            genes = [str(g) for g in genes_raw]
+            genes = list(map(str, genes_raw))
         else:
             genes = []
-        combined_score = _to_float(term.get("combined_score") or term.get("score") or term.get("nes"))
+        gene_lists.append(genes)
+        raw_score.append(_first(term, _SCORE_KEYS))
 
-        normalized.append({
+    return [
+        {
             "term": name,
             "p_value": pval,
             "fdr": fdr,
             "combined_score": combined_score,
             "genes": genes
-        })
-
-    return normalized
+        }
+        for name, pval, fdr, combined_score, genes in zip(
+            names,
+            _to_float_column(raw_pval),
+            _to_float_column(raw_fdr),
+            _to_float_column(raw_score),
+            gene_lists,
+        )
+    ]
 
 
 def _is_fusion_enrichment(enrichment_data: Any, metadata: Optional[Dict[str, Any]]) -> bool:
@@ -175,7 +305,10 @@ def _is_fusion_enrichment(enrichment_data: Any, metadata: Optional[Dict[str, Any
         auto_enrich = metadata.get("auto_enrich")
         if isinstance(auto_enrich, dict):
             sources = auto_enrich.get("sources") or []
-            if "fusion" in sources:
+            if isinstance(sources, str):
+                if "fusion" in sources:
+                    return True
+            elif not _FUSION_SOURCE_MARKERS.isdisjoint(sources):
                 return True
 
     terms = []
@@ -189,13 +322,7 @@ def _is_fusion_enrichment(enrichment_data: Any, metadata: Optional[Dict[str, Any
     elif isinstance(enrichment_data, list):
         terms = enrichment_data
 
-    for term in terms:
-        if not isinstance(term, dict):
-            continue
-        if term.get("members") or term.get("isFused") or term.get("representative_term"):
-            return True
-
-    return False
+    return any(_first(term, _FUSION_TERM_KEYS) for term in terms if isinstance(term, dict))
 
 
 def _derive_significant_genes(
@@ -206,17 +333,11 @@ def _derive_significant_genes(
     """Extract significant gene symbols from volcano data."""
     if not volcano_data:
         return []
-    up, down, _ = _split_significant_genes(volcano_data, pvalue_threshold, logfc_threshold)
-    genes = [g.get("gene") for g in up + down if g.get("gene")]
+    up, down, _ = _split_significant_genes(volcano_data, pvalue_threshold, logfc_threshold, include_non_sig=False)
     # Keep order but remove duplicates
-    seen = set()
-    uniq = []
-    for gene in genes:
-        if gene in seen:
-            continue
-        seen.add(gene)
-        uniq.append(gene)
-    return uniq
+    return list(dict.fromkeys(
+        gene for gene in (g.get("gene") for g in itertools.chain(up, down)) if gene
+    ))
 
 
 def _auto_enrich_from_volcano(
@@ -248,12 +369,24 @@ def _auto_enrich_from_volcano(
     return result
 
 
+def _class_mask(logfc, pval, known_up, known_down, p_thr, fc_thr):
+    """Up/down masks: explicit UP/DOWN status wins, otherwise p and |log2FC| cutoffs."""
+    with np.errstate(invalid="ignore"):
+        auto = ~(known_up | known_down) & (pval < p_thr) & (np.abs(logfc) > fc_thr)
+        positive = logfc > 0
+    return known_up | (auto & positive), known_down | (auto & ~positive)
+
+
 def _split_significant_genes(
     volcano_data: Optional[List[Dict[str, Any]]],
     pvalue_threshold: float = 0.05,
-    logfc_threshold: float = 1.0
+    logfc_threshold: float = 1.0,
+    include_non_sig: bool = True
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
-    """Split volcano data into up/down/non-significant groups."""
+    """
+    Split volcano data into up/down/non-significant groups.
+    Pass include_non_sig=False to leave the (usually large) NS group empty.
+    """
     up: List[Dict[str, Any]] = []
     down: List[Dict[str, Any]] = []
     non_sig: List[Dict[str, Any]] = []
@@ -261,30 +394,40 @@ def _split_significant_genes(
     if not volcano_data:
         return up, down, non_sig
 
-    for row in volcano_data:
-        if not isinstance(row, dict):
-            continue
-        gene = row.get("gene") or row.get("id") or row.get("name") or "unknown"
-        logfc = _to_float(row.get("x"), 0.0) or 0.0
-        pval = _to_float(row.get("pvalue"), 1.0) or 1.0
-        status = str(row.get("status") or "").upper()
+    rows = [row for row in volcano_data if isinstance(row, dict)]
+    if not rows:
+        return up, down, non_sig
 
-        if status not in {"UP", "DOWN"}:
-            if pval < pvalue_threshold and abs(logfc) > logfc_threshold:
-                status = "UP" if logfc > 0 else "DOWN"
-            else:
-                status = "NS"
+    # Column-wise: coerce numerics once, then classify with boolean masks
+    logfc = _float_array([row.get("x") for row in rows], 0.0)
+    pval = _float_array([row.get("pvalue") for row in rows], 1.0)
+    status_in = [str(row.get("status") or "").upper() for row in rows]
 
+    known_up = np.fromiter((s == "UP" for s in status_in), dtype=bool, count=len(rows))
+    known_down = np.fromiter((s == "DOWN" for s in status_in), dtype=bool, count=len(rows))
+    up_mask, down_mask = _class_mask(
+        logfc, pval, known_up, known_down, float(pvalue_threshold), float(logfc_threshold)
+    )
+
+    # Only materialize entries for the groups the caller needs
+    keep = up_mask | down_mask if not include_non_sig else np.ones(len(rows), dtype=bool)
+    logfc_list = logfc.tolist()
+    pval_list = pval.tolist()
+    up_list = up_mask.tolist()
+    down_list = down_mask.tolist()
+    for i in np.flatnonzero(keep).tolist():
+        row = rows[i]
+        is_up = up_list[i]
+        is_down = down_list[i]
         entry = {
-            "gene": gene,
-            "log2fc": logfc,
-            "pvalue": pval,
-            "status": status
+            "gene": row.get("gene") or row.get("id") or row.get("name") or "unknown",
+            "log2fc": logfc_list[i],
+            "pvalue": pval_list[i],
+            "status": "UP" if is_up else ("DOWN" if is_down else "NS")
         }
-
-        if status == "UP":
+        if is_up:
             up.append(entry)
-        elif status == "DOWN":
+        elif is_down:
             down.append(entry)
         else:
             non_sig.append(entry)
@@ -294,64 +437,139 @@ def _split_significant_genes(
 
 # --- Green Zone Tools (Safe, Auto-Execute) ---
 
+# Colored pathways keyed by (pathway_id, data_type, digest of the expression
+# map). A fixed-size digest keeps keys small for genome-wide expression maps.
+_COLORED_PATHWAYS: "OrderedDict[Tuple[str, str, bytes], Tuple[Dict, Dict]]" = OrderedDict()
+_COLORED_PATHWAYS_MAX = 128
+_colored_pathways_lock = threading.Lock()
+
+
+def _expression_digest(gene_expression: Dict[str, Any]) -> bytes:
+    """Digest of the canonical (sorted-key) serialization of an expression map."""
+    blob = None
+    if orjson is not None:
+        blob = orjson.dumps(gene_expression, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        if b"null" in blob:  # orjson writes both NaN and None as null
+            blob = None
+    if blob is None:
+        blob = json.dumps(gene_expression, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(blob, digest_size=16).digest()
+
+
+def _color_pathway(pathway_id: str, gene_expression: Dict[str, float], data_type: str) -> Tuple[Dict, Dict]:
+    """Colored pathway + statistics, memoized on (pathway, data_type, expression values)."""
+    try:
+        key = (pathway_id, data_type, _expression_digest(gene_expression))
+    except (TypeError, ValueError):  # non-string keys or unserializable values: compute uncached
+        key = None
+    if key is not None:
+        with _colored_pathways_lock:
+            cached = _COLORED_PATHWAYS.get(key)
+            if cached is not None:
+                _COLORED_PATHWAYS.move_to_end(key)
+                return cached
+    colored = mapper.color_kegg_pathway(pathway_id, gene_expression, data_type=data_type)
+    result = (colored, mapper.get_pathway_statistics(colored))
+    if key is not None:
+        with _colored_pathways_lock:
+            _COLORED_PATHWAYS[key] = result
+            if len(_COLORED_PATHWAYS) > _COLORED_PATHWAYS_MAX:
+                _COLORED_PATHWAYS.popitem(last=False)
+    return result
+
+
 def _render_pathway(pathway_id: str, gene_expression: Dict[str, float], data_type: str = "gene") -> Dict:
     """Render a colored KEGG pathway."""
-    colored = mapper.color_kegg_pathway(pathway_id, gene_expression, data_type=data_type)
-    stats = mapper.get_pathway_statistics(colored)
+    # The colored pathway is shared with the cache; callers treat it as read-only
+    colored, stats = _color_pathway(pathway_id, gene_expression, data_type)
     return {
         "pathway": colored,
-        "statistics": stats
+        "statistics": dict(stats)
     }
 
 
 def _get_pathway_stats(pathway_id: str, gene_expression: Dict[str, float], data_type: str = "gene") -> Dict:
     """Get statistics for a pathway without full rendering."""
-    colored = mapper.color_kegg_pathway(pathway_id, gene_expression, data_type=data_type)
-    return mapper.get_pathway_statistics(colored)
+    _, stats = _color_pathway(pathway_id, gene_expression, data_type)
+    return dict(stats)
 
 
-def _list_available_pathways() -> List[Dict[str, str]]:
-    """List all available pathway templates."""
-    from pathlib import Path
-    import sys
-    
-    templates = []
-    
-    # Search paths for templates
-    search_paths = [
+def _template_search_paths() -> List[Path]:
+    paths = [
         Path(__file__).parent.parent / 'assets' / 'templates',
         Path.home() / '.bioviz_local' / 'templates',
     ]
-    
     if hasattr(sys, '_MEIPASS'):
-        search_paths.insert(0, Path(sys._MEIPASS) / 'assets' / 'templates')
-    
-    seen = set()
-    for path in search_paths:
-        if path.exists():
-            for f in path.glob("*.json"):
-                pid = f.stem
-                if pid not in seen:
-                    seen.add(pid)
-                    templates.append({
-                        "id": pid,
-                        "name": pid.replace("_", " ").title()
-                    })
-    
-    return sorted(templates, key=lambda x: x["id"])
+        paths.insert(0, Path(sys._MEIPASS) / 'assets' / 'templates')
+    return paths
+
+
+# Search paths for templates (constant per process, incl. the PyInstaller bundle)
+_TEMPLATE_SEARCH_PATHS = _template_search_paths()
+# Directory (path, mtime_ns) signature -> sorted template listing
+_pathway_list_cache: Dict[tuple, List[Dict[str, str]]] = {}
+
+
+def _list_available_pathways() -> List[Dict[str, str]]:
+    """List all available pathway templates."""
+    # Adding/removing a template bumps its directory's mtime, so the
+    # signature changes exactly when a rescan is needed.
+    sig = []
+    for path in _TEMPLATE_SEARCH_PATHS:
+        try:
+            sig.append((str(path), path.stat().st_mtime_ns))
+        except OSError:
+            sig.append((str(path), 0))
+    sig = tuple(sig)
+
+    templates = _pathway_list_cache.get(sig)
+    if templates is None:
+        pids = dict.fromkeys(
+            f.stem
+            for path in _TEMPLATE_SEARCH_PATHS if path.exists()
+            for f in path.glob("*.json")
+        )
+        templates = [
+            {"id": pid, "name": pid.replace("_", " ").title()}
+            for pid in sorted(pids)
+        ]
+        _pathway_list_cache.clear()
+        _pathway_list_cache[sig] = templates
+
+    return [dict(t) for t in templates]
+
+
+# Descriptions for common pathways; anything else falls back to a generic label
+_PATHWAY_DESCRIPTIONS: Dict[str, str] = {
+    "hsa04210": "Apoptosis pathway - programmed cell death signaling",
+    "hsa04110": "Cell cycle - regulation of cell division",
+    "hsa04115": "p53 signaling pathway - tumor suppressor response",
+    "hsa04151": "PI3K-Akt signaling pathway - cell survival and growth",
+    "hsa04010": "MAPK signaling pathway - cell proliferation and differentiation",
+}
 
 
 def _explain_pathway(pathway_id: str) -> str:
     """Get description of a pathway."""
-    # Simple lookup for common pathways
-    descriptions = {
-        "hsa04210": "Apoptosis pathway - programmed cell death signaling",
-        "hsa04110": "Cell cycle - regulation of cell division",
-        "hsa04115": "p53 signaling pathway - tumor suppressor response",
-        "hsa04151": "PI3K-Akt signaling pathway - cell survival and growth",
-        "hsa04010": "MAPK signaling pathway - cell proliferation and differentiation",
-    }
-    return descriptions.get(pathway_id, f"KEGG pathway {pathway_id}")
+    description = _PATHWAY_DESCRIPTIONS.get(pathway_id)
+    if description is None:
+        return "KEGG pathway " + str(pathway_id)
+    return description
+
+
+# Canonical gene set sources, in substring-match priority order
+_GENE_SET_SOURCES = ("reactome", "wikipathways", "go_bp", "kegg")
+# Exact (lower-cased) spellings the model tends to emit
+_GENE_SET_ALIASES = {
+    "reactome": "reactome",
+    "react": "reactome",
+    "wikipathways": "wikipathways",
+    "wiki": "wikipathways",
+    "go_bp": "go_bp",
+    "gobp": "go_bp",
+    "go": "go_bp",
+    "kegg": "kegg",
+}
 
 
 def _run_enrichment(gene_list: List[str], gene_sets: str = "reactome") -> Dict[str,  Any]:
@@ -366,14 +584,11 @@ def _run_enrichment(gene_list: List[str], gene_sets: str = "reactome") -> Dict[s
             "enriched_terms": []
         }
 
-    source_map = {
-        "reactome": "reactome",
-        "wikipathways": "wikipathways",
-        "go_bp": "go_bp",
-        "kegg": "kegg",
-    }
-    normalized = gene_sets.lower()
-    resolved_source = next((v for k, v in source_map.items() if k in normalized), "reactome")
+    normalized = (gene_sets or "").lower()
+    resolved_source = _GENE_SET_ALIASES.get(normalized)
+    if resolved_source is None:
+        # e.g. "Reactome_2022" -> reactome
+        resolved_source = next((s for s in _GENE_SET_SOURCES if s in normalized), "reactome")
 
     if resolved_source == "kegg":
         return {
@@ -410,6 +625,28 @@ def _run_enrichment(gene_list: List[str], gene_sets: str = "reactome") -> Dict[s
         }
 
 
+def _render_and_analyze(
+    pathway_id: str,
+    gene_expression: Dict[str, float],
+    data_type: str = "gene",
+    include_stats: bool = True,
+    include_enrichment: bool = False,
+    gene_list: Optional[List[str]] = None,
+    gene_sets: str = "reactome"
+) -> Dict[str, Any]:
+    """
+    Render a pathway and return its statistics and (optionally) enrichment in one call.
+    The template is loaded and colored once for both outputs.
+    """
+    colored, stats = _color_pathway(pathway_id, gene_expression, data_type)
+    result: Dict[str, Any] = {"pathway": colored}
+    if include_stats:
+        result["statistics"] = dict(stats)
+    if include_enrichment:
+        result["enrichment"] = _run_enrichment(gene_list or [], gene_sets)
+    return result
+
+
 # --- LLM-backed structured analyses ---
 
 def summarize_enrichment(
@@ -502,7 +739,7 @@ def summarize_de_genes(
     pvalue_threshold = _to_float(thresholds.get("pvalue_threshold"), 0.05) or 0.05
     logfc_threshold = _to_float(thresholds.get("logfc_threshold"), 1.0) or 1.0
 
-    up, down, _ = _split_significant_genes(volcano_data, pvalue_threshold, logfc_threshold)
+    up, down, _ = _split_significant_genes(volcano_data, pvalue_threshold, logfc_threshold, include_non_sig=False)
 
     if not up and not down:
         return {
@@ -511,8 +748,11 @@ def summarize_de_genes(
             "counts": {"up": 0, "down": 0}
         }
 
-    top_up = sorted(up, key=lambda g: abs(g.get("log2fc", 0)), reverse=True)[:10]
-    top_down = sorted(down, key=lambda g: abs(g.get("log2fc", 0)), reverse=True)[:10]
+    def _abs_lfc(g: Dict[str, Any]) -> float:
+        return abs(g.get("log2fc", 0))
+
+    top_up = heapq.nlargest(10, up, key=_abs_lfc)
+    top_down = heapq.nlargest(10, down, key=_abs_lfc)
 
     payload = {
         "thresholds": {"p_value": pvalue_threshold, "log2fc": logfc_threshold},
@@ -539,6 +779,10 @@ def summarize_de_genes(
     }
 
 
+# Leading ```/```json and trailing ``` fences around model JSON output
+_FENCE_RE = re.compile(r"^`{3,}(?:json)?\s*|\s*`{3,}$", re.IGNORECASE)
+
+
 def parse_filter_query(
     natural_language_query: str,
     available_fields: Optional[List[str]] = None,
@@ -560,16 +804,11 @@ def parse_filter_query(
     if error or not content:
         return {"status": "error", "message": f"LLM error: {error or 'empty response'}"}
 
-    cleaned = content.strip()
-    if cleaned.startswith("```"):
-        cleaned = cleaned.strip("`")
-        if cleaned.lower().startswith("json"):
-            cleaned = cleaned[4:]
-        cleaned = cleaned.strip()
+    cleaned = _FENCE_RE.sub("", content.strip())
 
     parsed = None
     try:
-        parsed = json.loads(cleaned)
+        parsed = orjson.loads(cleaned) if orjson is not None else json.loads(cleaned)
     except Exception:
         parsed = None
 
@@ -638,7 +877,7 @@ def generate_hypothesis(
     if ui_language:
         payload["ui_language"] = ui_language
     prompt = render_prompt(HYPOTHESIS_PROMPT, payload, extra_notes="Always prefix speculative content with 'Hypothesis (not validated)'.")
-    content, model, error = _invoke_structured_prompt(prompt, temperature=0.35, max_tokens=800)
+    content, model, error = _invoke_structured_prompt(prompt, temperature=0.35, max_tokens=800, use_cache=False)
 
     if error or not content:
         return {"status": "error", "message": f"LLM error: {error or 'empty response'}"}
@@ -665,7 +904,7 @@ def discover_patterns(expression_matrix: Any, ui_language: Optional[str] = None)
     if ui_language:
         payload["ui_language"] = ui_language
     prompt = render_prompt(PATTERN_DISCOVERY_PROMPT, payload, extra_notes="Treat all findings as exploratory.")
-    content, model, error = _invoke_structured_prompt(prompt, temperature=0.3, max_tokens=850)
+    content, model, error = _invoke_structured_prompt(prompt, temperature=0.3, max_tokens=850, use_cache=False)
 
     if error or not content:
         return {"status": "error", "message": f"LLM error: {error or 'empty response'}"}
@@ -745,6 +984,64 @@ def _update_analysis_thresholds(
     return result
 
 
+_EXPORT_CSV_HEADER = ('Gene', 'Log2FC', 'PValue', 'Status')
+
+
+def _export_rows(data: List[Dict[str, Any]]):
+    """Yield (gene, log2fc, pvalue, status) tuples for CSV export."""
+    for item in data:
+        get = item.get
+        yield (get('gene', ''), get('x', 0), get('pvalue', 1.0), get('status', 'NS'))
+
+
+# Characters that force csv.writer (QUOTE_MINIMAL) to quote a field
+_CSV_NEEDS_QUOTING = re.compile(r'[,"\r\n]')
+
+
+def _format_export_csv_fast(data: List[Dict[str, Any]]) -> Optional[bytes]:
+    """
+    Render the fixed 4-column export without csv.writer, byte-for-byte identical
+    to its output. Returns None as soon as a field would need quoting or is not
+    a plain str/number, so the caller can fall back to the csv module.
+    """
+    needs_quoting = _CSV_NEEDS_QUOTING.search
+    lines = [",".join(_EXPORT_CSV_HEADER) + "\r\n"]
+    append = lines.append
+    for gene, x, pvalue, status in _export_rows(data):
+        if (
+            type(gene) is not str or type(status) is not str
+            or type(x) not in (int, float) or type(pvalue) not in (int, float)
+            or needs_quoting(gene) or needs_quoting(status)
+            or not gene or not status
+        ):
+            return None
+        append(f"{gene},{x},{pvalue},{status}\r\n")
+    return "".join(lines).encode("utf-8")
+
+
+def _write_export_csv(path: str, data: List[Dict[str, Any]]) -> None:
+    payload = _format_export_csv_fast(data)
+    if payload is not None:
+        with open(path, "wb") as f:
+            f.write(payload)
+        return
+    import csv
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(_EXPORT_CSV_HEADER)
+        writer.writerows(_export_rows(data))
+
+
+def _dumps_export_json(data: Any) -> bytes:
+    """Serialize export data as indented UTF-8 JSON (orjson when available)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass  # e.g. non-str dict keys; stdlib handles those
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
 def _export_analysis_data(
     output_path: Optional[str] = None,
     format: str = "csv",
@@ -755,7 +1052,6 @@ def _export_analysis_data(
     This is a Yellow Zone action - requires user confirmation.
     """
     try:
-        import csv
         import os
         from pathlib import Path
         import time
@@ -802,28 +1098,14 @@ def _export_analysis_data(
             
         # 3. Perform Export
         if format.lower() == "csv":
-            with open(resolved_path, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Gene', 'Log2FC', 'PValue', 'Status'])
-                for item in data:
-                    writer.writerow([
-                        item.get('gene', ''),
-                        item.get('x', 0),
-                        item.get('pvalue', 1.0),
-                        item.get('status', 'NS')
-                    ])
+            _write_export_csv(resolved_path, data)
         elif format.lower() == "json":
-            with open(resolved_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4)
+            Path(resolved_path).write_bytes(_dumps_export_json(data))
         else:
              # Fallback to CSV if format not supported yet (Excel requires extra libs)
              if not resolved_path.endswith(".csv"):
                  resolved_path += ".csv"
-             with open(resolved_path, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(['Gene', 'Log2FC', 'PValue', 'Status'])
-                for item in data:
-                    writer.writerow([item.get('gene', ''), item.get('x', 0), item.get('pvalue', 1.0), item.get('status', 'NS')])
+             _write_export_csv(resolved_path, data)
 
         # 4. Generate Preview
         rows = ["gene,log2FoldChange,status"]
@@ -859,7 +1141,7 @@ TOOLS: List[ToolDefinition] = [
     ToolDefinition(
         name="render_pathway",
         label="Pathway Visualization",
-        description="Render and color a KEGG pathway with gene expression data. Returns the colored pathway and statistics.",
+        description="Render and color a KEGG pathway with gene expression data. Returns the colored pathway and statistics. Prefer render_and_analyze when enrichment is also needed.",
         parameters={
             "type": "object",
             "properties": {
@@ -882,13 +1164,14 @@ TOOLS: List[ToolDefinition] = [
             "required": ["pathway_id", "gene_expression"]
         },
         safety_level=SafetyLevel.GREEN,
-        handler=_render_pathway
+        handler=_render_pathway,
+        concurrency_safe=True
     ),
     
     ToolDefinition(
         name="get_pathway_stats",
         label="Pathway Statistics",
-        description="Get statistics for a pathway (upregulated, downregulated, unchanged counts) without full rendering.",
+        description="Get statistics for a pathway (upregulated, downregulated, unchanged counts) without full rendering. If the pathway is also being rendered, use render_and_analyze instead.",
         parameters={
             "type": "object",
             "properties": {
@@ -910,7 +1193,8 @@ TOOLS: List[ToolDefinition] = [
             "required": ["pathway_id", "gene_expression"]
         },
         safety_level=SafetyLevel.GREEN,
-        handler=_get_pathway_stats
+        handler=_get_pathway_stats,
+        concurrency_safe=True
     ),
     
     ToolDefinition(
@@ -923,7 +1207,8 @@ TOOLS: List[ToolDefinition] = [
             "required": []
         },
         safety_level=SafetyLevel.GREEN,
-        handler=_list_available_pathways
+        handler=_list_available_pathways,
+        concurrency_safe=True
     ),
     
     ToolDefinition(
@@ -941,7 +1226,8 @@ TOOLS: List[ToolDefinition] = [
             "required": ["pathway_id"]
         },
         safety_level=SafetyLevel.GREEN,
-        handler=_explain_pathway
+        handler=_explain_pathway,
+        concurrency_safe=True
     ),
     
     ToolDefinition(
@@ -966,7 +1252,57 @@ TOOLS: List[ToolDefinition] = [
             "required": ["gene_list"]
         },
         safety_level=SafetyLevel.GREEN,
-        handler=_run_enrichment
+        handler=_run_enrichment,
+        concurrency_safe=True
+    ),
+
+    ToolDefinition(
+        name="render_and_analyze",
+        label="Pathway Analysis",
+        description="Render a KEGG pathway with expression data and, in the same step, return its statistics and optionally an enrichment analysis. Prefer this over calling render_pathway, get_pathway_stats and run_enrichment one after another.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "pathway_id": {
+                    "type": "string",
+                    "description": "KEGG pathway ID (e.g., 'hsa04210' for Apoptosis)"
+                },
+                "gene_expression": {
+                    "type": "object",
+                    "description": "Dictionary mapping gene symbols to expression values (log2 fold change)",
+                    "additionalProperties": {"type": "number"}
+                },
+                "data_type": {
+                    "type": "string",
+                    "enum": ["gene", "protein", "cell"],
+                    "default": "gene"
+                },
+                "include_stats": {
+                    "type": "boolean",
+                    "description": "Include pathway statistics",
+                    "default": True
+                },
+                "include_enrichment": {
+                    "type": "boolean",
+                    "description": "Also run enrichment analysis (ORA) on gene_list",
+                    "default": False
+                },
+                "gene_list": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Significant gene symbols for enrichment; defaults to the current significant genes"
+                },
+                "gene_sets": {
+                    "type": "string",
+                    "enum": ["reactome", "wikipathways", "go_bp"],
+                    "default": "reactome"
+                }
+            },
+            "required": ["pathway_id", "gene_expression"]
+        },
+        safety_level=SafetyLevel.GREEN,
+        handler=_render_and_analyze,
+        concurrency_safe=True
     ),
 
     ToolDefinition(
@@ -984,7 +1320,8 @@ TOOLS: List[ToolDefinition] = [
             "required": ["intelligence_data"]
         },
         safety_level=SafetyLevel.GREEN,
-        handler=summarize_studio_intelligence
+        handler=summarize_studio_intelligence,
+        concurrency_safe=True
     ),
     
     # Yellow Zone - Requires confirmation
@@ -1036,44 +1373,86 @@ TOOLS: List[ToolDefinition] = [
 ]
 
 
+# Lookup tables derived once from TOOLS (tool names are unique)
+_TOOLS_BY_NAME: Dict[str, ToolDefinition] = {t.name: t for t in TOOLS}
+GREEN_ZONE_NAMES: Tuple[str, ...] = tuple(t.name for t in TOOLS if t.safety_level == SafetyLevel.GREEN)
+YELLOW_ZONE_NAMES: Tuple[str, ...] = tuple(t.name for t in TOOLS if t.safety_level == SafetyLevel.YELLOW)
+# Set forms for O(1) membership checks
+GREEN_ZONE_SET = frozenset(GREEN_ZONE_NAMES)
+YELLOW_ZONE_SET = frozenset(YELLOW_ZONE_NAMES)
+# The function-calling schema is static for the life of the process
+_OPENAI_SCHEMA: Tuple[Dict[str, Any], ...] = tuple(t.to_openai_schema() for t in TOOLS)
+
+
 # --- Helper Functions ---
 
 def get_tool(name: str) -> Optional[ToolDefinition]:
     """Get a tool by name."""
-    for tool in TOOLS:
-        if tool.name == name:
-            return tool
-    return None
+    return _TOOLS_BY_NAME.get(name)
 
 
-def get_openai_tools_schema() -> List[Dict[str, Any]]:
-    """Get all tools in OpenAI API format."""
-    return [tool.to_openai_schema() for tool in TOOLS]
+def get_openai_tools_schema() -> Tuple[Dict[str, Any], ...]:
+    """Get all tools in OpenAI API format (shared and read-only; do not mutate)."""
+    return _OPENAI_SCHEMA
 
 
-def get_green_zone_tools() -> List[str]:
+def get_green_zone_tools() -> Tuple[str, ...]:
     """Get names of all Green Zone tools."""
-    return [t.name for t in TOOLS if t.safety_level == SafetyLevel.GREEN]
+    return GREEN_ZONE_NAMES
 
 
-def get_yellow_zone_tools() -> List[str]:
+def get_yellow_zone_tools() -> Tuple[str, ...]:
     """Get names of all Yellow Zone tools."""
-    return [t.name for t in TOOLS if t.safety_level == SafetyLevel.YELLOW]
+    return YELLOW_ZONE_NAMES
 
 
 def execute_tool(name: str, args: Dict[str, Any], context: Optional[Dict[str, Any]] = None) -> Any:
     """Execute a tool by name with given arguments and optional context."""
-    tool = get_tool(name)
-    if not tool:
+    tool = _TOOLS_BY_NAME.get(name)
+    if tool is None:
         raise ValueError(f"Unknown tool: {name}")
-    
-    # Try to inject context if the handler accepts it
-    import inspect
-    try:
-        sig = inspect.signature(tool.handler)
-        if 'context' in sig.parameters:
-            return tool.handler(**args, context=context)
-    except Exception:
-        pass
-        
-    return tool.handler(**args)
+    # Inject context if the handler accepts it
+    return tool.handler(**args, context=context) if tool.accepts_context else tool.handler(**args)
+
+
+# Upper bound on tool handlers running at once in execute_tools_batch; same as
+# ThreadPoolExecutor's default, since handlers mix CPU work with LLM/file I/O
+_TOOL_MAX_CONCURRENCY = min(32, (os.cpu_count() or 1) + 4)
+
+
+def execute_tools_batch(
+    calls: List[Tuple[str, Dict[str, Any]]],
+    context: Optional[Dict[str, Any]] = None,
+    return_exceptions: bool = False
+) -> List[Any]:
+    """
+    Execute several (name, args) tool calls and return results in call order.
+    Concurrency-safe tools run in parallel, so latency is roughly the slowest
+    call rather than the sum; all other tools then run one at a time, in order.
+    With return_exceptions=True a failing call yields its exception instead of
+    aborting the batch.
+    """
+    def run(call: Tuple[str, Dict[str, Any]]) -> Any:
+        name, args = call
+        if not return_exceptions:
+            return execute_tool(name, args, context)
+        try:
+            return execute_tool(name, args, context)
+        except Exception as e:
+            return e
+
+    results: List[Any] = [None] * len(calls)
+    parallel, serial = [], []
+    for i, (name, _) in enumerate(calls):
+        tool = _TOOLS_BY_NAME.get(name)
+        (parallel if tool is not None and tool.concurrency_safe else serial).append(i)
+
+    if len(parallel) > 1:
+        with ThreadPoolExecutor(max_workers=min(_TOOL_MAX_CONCURRENCY, len(parallel))) as pool:
+            for i, result in zip(parallel, pool.map(lambda i: run(calls[i]), parallel)):
+                results[i] = result
+    else:
+        serial = sorted(parallel + serial)
+    for i in serial:
+        results[i] = run(calls[i])
+    return results
@@ -30,6 +30,7 @@ except ImportError:
     pass
 import traceback
 import math
+import sqlite3
 import numpy as np
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple
@@ -58,9 +59,11 @@ if sys.platform != 'win32':
 
 
 class BioJSONEncoder(json.JSONEncoder):
-    """Custom JSON encoder to handle numpy types."""
+    """Custom JSON encoder to handle numpy types and sqlite3 rows."""
     def default(self, obj):
-        if isinstance(obj, (np.int_, np.intc, np.intp, np.int8,
+        if isinstance(obj, sqlite3.Row):
+            return dict(obj)
+        elif isinstance(obj, (np.int_, np.intc, np.intp, np.int8,
                             np.int16, np.int32, np.int64, np.uint8,
                             np.uint16, np.uint32, np.uint64)):
             return int(obj)
@@ -113,7 +116,8 @@ except ImportError as e:
 # Project Memory (Knowledge Graph-lite)
 try:
     from project_manager import ProjectManager
-    PROJECT_MANAGER = ProjectManager()
+    # Project memory is best-effort bookkeeping; keep its commits off the request path
+    PROJECT_MANAGER = ProjectManager(deferred_writes=True)
     logging.info("[INIT] ProjectManager initialized")
 except Exception as e:
     PROJECT_MANAGER = None
@@ -1851,11 +1855,88 @@ def handle_describe_visualization(payload: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         return {"status": "error", "message": f"Failed to describe visualization: {str(e)}"}
 
+def _interpret_studio(payload: Dict[str, Any]) -> Dict[str, Any]:
+    from ai_tools import execute_tool
+    return execute_tool("summarize_studio_intelligence", payload)
+
+
+_STRUCTURED_BATCH_HANDLERS = {
+    "SUMMARIZE_ENRICHMENT": handle_summarize_enrichment,
+    "SUMMARIZE_DE": handle_summarize_de,
+    "PARSE_FILTER": handle_parse_filter,
+    "GENERATE_HYPOTHESIS": handle_generate_hypothesis,
+    "DISCOVER_PATTERNS": handle_discover_patterns,
+    "DESCRIBE_VISUALIZATION": handle_describe_visualization,
+    "AI_INTERPRET_STUDIO": _interpret_studio,
+}
+
+
+def _run_batch_item(handler: Any, payload: Dict[str, Any]) -> Dict[str, Any]:
+    # One failing item must not sink the rest of the batch
+    try:
+        return handler(payload)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def handle_structured_batch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run several structured prompt commands concurrently (one LLM round-trip of latency).
+    Payload: {"requests": [{"cmd": "SUMMARIZE_DE", "payload": {...}}, ...]}
+    Results are returned in request order.
+    """
+    try:
+        from functools import partial
+        from ai_tools import invoke_many
+
+        calls = []
+        for req in payload.get("requests") or []:
+            handler = _STRUCTURED_BATCH_HANDLERS.get(str(req.get("cmd", "")).upper())
+            if handler is None:
+                calls.append(partial(dict, status="error", message=f"Unsupported batch command: {req.get('cmd')}"))
+            else:
+                calls.append(partial(_run_batch_item, handler, req.get("payload") or {}))
+        return {"status": "ok", "results": invoke_many(calls)}
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to run structured batch: {str(e)}"}
+
+
+def handle_tools_batch(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run several Green Zone tools concurrently.
+    Payload: {"calls": [{"tool": "render_pathway", "args": {...}}, ...], "context": {...}}
+    Yellow Zone tools are refused; they must go through the proposal flow.
+    Results are returned in call order.
+    """
+    try:
+        from ai_tools import GREEN_ZONE_SET, execute_tools_batch
+
+        calls = payload.get("calls") or []
+        results: List[Any] = [None] * len(calls)
+        runnable, positions = [], []
+        for i, call in enumerate(calls):
+            name = str(call.get("tool", ""))
+            if name in GREEN_ZONE_SET:
+                runnable.append((name, call.get("args") or {}))
+                positions.append(i)
+            else:
+                results[i] = {"status": "error", "message": f"Tool not allowed in batch: {name}"}
+
+        outputs = execute_tools_batch(runnable, payload.get("context"), return_exceptions=True)
+        for i, output in zip(positions, outputs):
+            if isinstance(output, Exception):
+                results[i] = {"status": "error", "message": str(output)}
+            else:
+                results[i] = {"status": "ok", "result": output}
+        return {"status": "ok", "results": results}
+    except Exception as e:
+        return {"status": "error", "message": f"Failed to run tool batch: {str(e)}"}
+
+
 def handle_ai_interpret_studio(payload: Dict[str, Any]):
     """[Phase 6] Synthesis of 7-layer Studio Intelligence."""
-    from ai_tools import execute_tool
     try:
-        result = execute_tool("summarize_studio_intelligence", payload)
+        result = _interpret_studio(payload)
         send_response(result)
     except Exception as e:
         logging.error(f"Studio AI synthesis failed: {e}")
@@ -1925,6 +2006,8 @@ def process_command(command_obj: Dict[str, Any]) -> None:
             "DISCOVER_PATTERNS": handle_discover_patterns,
             "DISCOVER_PATTERNS": handle_discover_patterns,
             "DESCRIBE_VISUALIZATION": handle_describe_visualization,
+            "STRUCTURED_BATCH": handle_structured_batch,
+            "TOOLS_BATCH": handle_tools_batch,
             "AGENT_TASK": handle_agent_task,
             "UPDATE_AI_CONFIG": handle_update_ai_config,
         }
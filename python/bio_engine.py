@@ -1,6 +1,8 @@
+import importlib
 import os
 import sys
 import logging
+import logging.handlers
 from pathlib import Path
 from datetime import datetime
 
@@ -39,12 +41,16 @@ for mod_name in ['numpy', 'pandas', 'scipy', 'openai', 'gseapy', 'cryptography',
     try:
         __import__(mod_name)
         print(f">>> [BioEngine] OK: {mod_name} loaded", file=sys.stderr, flush=True)
-    except ImportError as e:
+    except Exception as e:  # a broken extension must not abort startup either
         print(f">>> [BioEngine] FAIL: {mod_name} failed to load: {e}", file=sys.stderr, flush=True)
 
 # Setup file logging for packaged app
 def setup_logging():
     """Setup file logging to user's home directory."""
+    # basicConfig would silently ignore our handlers if logging is already configured
+    if logging.getLogger().handlers:
+        return None
+
     log_dir = Path.home() / ".bioviz_local" / "logs"
     log_dir.mkdir(parents=True, exist_ok=True)
     
@@ -54,7 +60,10 @@ def setup_logging():
         level=logging.DEBUG,
         format='%(asctime)s [%(levelname)s] %(message)s',
         handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
+            # delay=True: the file is opened on the first record, not at construction
+            logging.handlers.RotatingFileHandler(
+                log_file, encoding='utf-8', maxBytes=5_000_000, backupCount=3, delay=True
+            ),
             logging.StreamHandler(sys.stderr)
         ]
     )
@@ -73,44 +82,32 @@ setup_logging()
 # Ensure custom modules (agent_runtime, motia, workflow_registry, narrative)
 # are discoverable by adding the python directory to sys.path
 # ==============================================================================
-# Determine the directory containing this script
+# Resolve the module root once (PyInstaller bundle or the script directory)
+# and import bio_core a single time, instead of retrying after a failure
 if hasattr(sys, '_MEIPASS'):
-    # Running as PyInstaller bundle - modules should be in the bundle
-    bundle_dir = sys._MEIPASS
-    logging.info(f"Running in PyInstaller bundle: {bundle_dir}")
-    # Add bundle directory to path (should already be there, but ensure it)
-    if bundle_dir not in sys.path:
-        sys.path.insert(0, bundle_dir)
+    module_root = sys._MEIPASS
+    logging.info(f"Running in PyInstaller bundle: {module_root}")
 else:
-    # Running from source - add the python directory
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    logging.info(f"Running from source: {script_dir}")
-    if script_dir not in sys.path:
-        sys.path.insert(0, script_dir)
+    module_root = os.path.dirname(os.path.abspath(__file__))
+    logging.info(f"Running from source: {module_root}")
+if module_root not in sys.path:
+    sys.path.insert(0, module_root)
+# The working directory stays a lowest-priority fallback root
+if os.getcwd() not in sys.path:
+    sys.path.append(os.getcwd())
 
 # Log sys.path for debugging
 logging.info(f"Python sys.path: {sys.path[:3]}...")  # Log first 3 entries
 
-# Check if running in packaged app (PyInstaller)
-is_packaged = hasattr(sys, '_MEIPASS')
-
 try:
-    import bio_core
+    bio_core = importlib.import_module('bio_core')
     logging.info("bio_core imported successfully")
 except ImportError as e:
-    logging.error(f"Failed to import bio_core: {e}")
-    # Try adding current directory to path just in case
-    sys.path.append(os.getcwd())
-    try:
-        import bio_core
-        logging.info("bio_core imported successfully after path fix")
-    except ImportError as e2:
-        # Fallback: Create a dummy bio_core with just the run method if it's missing (for bootstrapping)
-        # This is CRITICAL if bio_core itself has import errors due to missing scipy/etc
-        logging.error(f"FATAL: Failed to import bio_core: {e2}")
-        print(f"FATAL: Failed to import bio_core: {e2}", file=sys.stderr)
-        # We don't exit yet, we might still be able to run SYS_CHECK if we import it manually
-        # sys.exit(1) (Removed to allow pure diagnostic mode)
+    # This is CRITICAL if bio_core itself has import errors due to missing scipy/etc
+    logging.error(f"FATAL: Failed to import bio_core: {e}")
+    print(f"FATAL: Failed to import bio_core: {e}", file=sys.stderr)
+    # We don't exit yet, we might still be able to run SYS_CHECK if we import it manually
+    # sys.exit(1) (Removed to allow pure diagnostic mode)
 
 try:
     import sys_check
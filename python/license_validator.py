@@ -1,11 +1,18 @@
 import json
 import base64
 import datetime
+import functools
 import logging
+from typing import Any, Dict, Optional, Tuple
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 from cryptography.hazmat.primitives import serialization
 
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
 logger = logging.getLogger("BioViz.Licensing")
 
 # Matches the Public Key in src/utils/licenseManager.ts
@@ -19,10 +26,60 @@ R0+6bjXLRNwAozDcb0klYacyi3CsaZFuMRXZdNOBBsymeUxQsAzgEQs3Y+TJcTZN
 qwIDAQAB
 -----END PUBLIC KEY-----"""
 
+# Stateless signature parameters, shared by every verification
+_PKCS1V15 = padding.PKCS1v15()
+_SHA256 = hashes.SHA256()
+
+
+@functools.lru_cache(maxsize=1)
+def _load_public_key():
+    """Parse the embedded PEM once per process."""
+    return serialization.load_pem_public_key(PUBLIC_KEY_PEM)
+
+
+@functools.lru_cache(maxsize=256)
+def _verify_envelope(license_key: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Decode a license key and check its signature.
+    Returns (license_data, None) on success or (None, error). The result only
+    depends on the key string, so repeat validations (UI polling) skip the
+    decode and RSA work; expiry and machine checks stay in validate().
+    """
+    # 1. Decode Envelope
+    try:
+        # Remove any whitespace
+        raw = base64.b64decode(license_key.strip())
+        # orjson validates UTF-8 itself, so it can parse the bytes directly
+        envelope = orjson.loads(raw) if orjson is not None else json.loads(raw.decode('utf-8'))
+    except Exception:
+        return None, "Invalid License Format (Base64/JSON)"
+
+    if "data" not in envelope or "signature" not in envelope:
+        return None, "Malformed License Envelope"
+
+    license_data = envelope["data"]
+    signature_b64 = envelope["signature"]
+
+    # 2. Reconstruct Canonical Data String (matches json.dumps(sort_keys=True))
+    # IMPORTANT: Must match exactly how issue_license.py created it. orjson cannot
+    # be used here: it emits compact separators and raw UTF-8, not json's format.
+    data_str = json.dumps(license_data, sort_keys=True)
+
+    # 3. Verify Signature
+    try:
+        signature = base64.b64decode(signature_b64)
+        _load_public_key().verify(signature, data_str.encode('utf-8'), _PKCS1V15, _SHA256)
+    except Exception as e:
+        logger.warning(f"Signature verification failed: {e}")
+        return None, "Invalid Signature"
+
+    return license_data, None
+
+
 class LicenseValidator:
     def __init__(self):
         try:
-            self.public_key = serialization.load_pem_public_key(PUBLIC_KEY_PEM)
+            self.public_key = _load_public_key()
             self.is_pro = True # Default to True for Community/Open version
             self.license_data = {"type": "PRO", "status": "unlocked"}
         except Exception as e:
@@ -38,37 +95,12 @@ class LicenseValidator:
             return {"valid": False, "error": "Internal Error: Missing Public Key"}
 
         try:
-            # 1. Decode Envelope
-            try:
-                # Remove any whitespace
-                license_key = license_key.strip()
-                json_str = base64.b64decode(license_key).decode('utf-8')
-                envelope = json.loads(json_str)
-            except Exception:
-                return {"valid": False, "error": "Invalid License Format (Base64/JSON)"}
-
-            if "data" not in envelope or "signature" not in envelope:
-                return {"valid": False, "error": "Malformed License Envelope"}
-
-            license_data = envelope["data"]
-            signature_b64 = envelope["signature"]
-
-            # 2. Reconstruct Canonical Data String (matches json.dumps(sort_keys=True))
-            # IMPORTANT: Must match exactly how issue_license.py created it
-            data_str = json.dumps(license_data, sort_keys=True)
-            
-            # 3. Verify Signature
-            try:
-                signature = base64.b64decode(signature_b64)
-                self.public_key.verify(
-                    signature,
-                    data_str.encode('utf-8'),
-                    padding.PKCS1v15(),
-                    hashes.SHA256()
-                )
-            except Exception as e:
-                logger.warning(f"Signature verification failed: {e}")
-                return {"valid": False, "error": "Invalid Signature"}
+            # 1-3. Decode envelope and verify signature (cached per key string)
+            verified, error = _verify_envelope(license_key)
+            if error:
+                return {"valid": False, "error": error}
+            # Copy so callers cannot mutate the cached entry
+            license_data = dict(verified)
 
             # 4. Check Expiry
             expiry_str = license_data.get("expiry")
@@ -3,24 +3,64 @@ BioViz Local - KEGG Pathway Mapper
 Maps gene expression data to KEGG pathway nodes and applies color coding
 """
 
+import functools
 import json
 import sys
 from typing import Dict, List, Optional
 from pathlib import Path
 
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Two-digit hex for every channel intensity, indexed by the uint8 value
+_HEX_LUT = np.array([f'{i:02x}' for i in range(256)])
+
+
+class _TemplateNotFound(LookupError):
+    """Raised inside the cached loader so failed lookups are not memoized."""
+
+
+def _copy_template(template: Dict) -> Dict:
+    """
+    Copy a cached template deep enough for callers to annotate it.
+    
+    Node and edge dicts are copied (coloring writes into them); nested
+    values such as gene lists stay shared and must be treated as read-only.
+    """
+    copied = dict(template)
+    for key in ('nodes', 'edges'):
+        if key in template:
+            copied[key] = [dict(item) for item in template[key]]
+    return copied
+
 
 def load_pathway_template(pathway_id: str) -> Optional[Dict]:
     """
     Load a KEGG pathway template from assets/templates/
     If not found locally, automatically download from KEGG and cache it.
     
+    Parsed templates are memoized per process; each call returns a fresh
+    copy so callers may color/annotate nodes without touching the cache.
+    
     Args:
         pathway_id: KEGG pathway ID (e.g., 'hsa04210', 'hsa04115', 'hsa04110')
     
     Returns:
         Pathway template dict or None if not found
     """
-    import sys
+    try:
+        return _copy_template(_load_pathway_template_cached(pathway_id))
+    except _TemplateNotFound:
+        return None
+
+
+@functools.lru_cache(maxsize=64)
+def _load_pathway_template_cached(pathway_id: str) -> Dict:
+    """Locate, parse (or download) a template; raises _TemplateNotFound on failure."""
     import logging
     
     # Try multiple possible locations
@@ -54,9 +94,13 @@ def load_pathway_template(pathway_id: str) -> Optional[Dict]:
     for template_path in search_paths:
         if template_path.exists():
             try:
-                with open(template_path, 'r', encoding='utf-8') as f:
-                    logging.info(f"[TEMPLATE] Loaded {pathway_id} from {template_path}")
-                    return json.load(f)
+                if orjson is not None:
+                    template = orjson.loads(template_path.read_bytes())
+                else:
+                    with open(template_path, 'r', encoding='utf-8') as f:
+                        template = json.load(f)
+                logging.info(f"[TEMPLATE] Loaded {pathway_id} from {template_path}")
+                return template
             except Exception as e:
                 logging.warning(f"[TEMPLATE] Failed to read {template_path}: {e}")
                 continue
@@ -82,7 +126,7 @@ def load_pathway_template(pathway_id: str) -> Optional[Dict]:
         
         if not kgml_content or kgml_content.startswith('<!DOCTYPE'):
             logging.error(f"[TEMPLATE] Failed to download {pathway_id}: Invalid response")
-            return None
+            raise _TemplateNotFound(pathway_id)
         
         # Step 2: Parse KGML to JSON (simplified inline version)
         root = ET.fromstring(kgml_content)
@@ -130,14 +174,19 @@ def load_pathway_template(pathway_id: str) -> Optional[Dict]:
         
         # Step 3: Cache to user directory for future use
         user_template_dir.mkdir(parents=True, exist_ok=True)
-        with open(user_template_path, 'w', encoding='utf-8') as f:
-            json.dump(template, f, indent=2)
+        if orjson is not None:
+            user_template_path.write_bytes(orjson.dumps(template))
+        else:
+            with open(user_template_path, 'w', encoding='utf-8') as f:
+                json.dump(template, f)
         
         logging.info(f"[TEMPLATE] Successfully downloaded and cached {pathway_id} to {user_template_path}")
         print(f"✓ Downloaded pathway template: {pathway_id} → {template['name']}", file=sys.stderr)
         
         return template
         
+    except _TemplateNotFound:
+        raise
     except Exception as e:
         logging.error(f"[TEMPLATE] Auto-download failed for {pathway_id}: {e}")
         print(f"✗ Failed to auto-download {pathway_id}: {e}", file=sys.stderr)
@@ -147,7 +196,7 @@ def load_pathway_template(pathway_id: str) -> Optional[Dict]:
         for p in search_paths[:5]:  # Show first 5 paths only
             print(f"  - {p} (exists: {p.exists()})", file=sys.stderr)
         
-        return None
+        raise _TemplateNotFound(pathway_id)
 
 
 
@@ -180,6 +229,37 @@ def map_expression_to_color(value: float, min_val: float, max_val: float) -> str
         return f'#ff{intensity:02x}{intensity:02x}'
 
 
+def map_expression_to_color_vec(values: np.ndarray, min_val: float, max_val: float) -> np.ndarray:
+    """
+    Vectorized map_expression_to_color over an array of expression values
+    
+    Args:
+        values: Array of expression values
+        min_val: Minimum value in dataset
+        max_val: Maximum value in dataset
+    
+    Returns:
+        Array of hex color strings, same length as values
+    """
+    values = np.clip(np.asarray(values, dtype=np.float64), min_val, max_val)
+    if max_val == min_val:
+        normalized = np.zeros_like(values)
+    else:
+        normalized = 2 * (values - min_val) / (max_val - min_val) - 1
+    
+    down = normalized < 0
+    # Same truncation as the scalar version: 0-255 blue ramp / 255-0 red ramp
+    intensity = np.where(down, 255 * (1 + normalized), 255 * (1 - normalized)).astype(np.uint8)
+    hex_i = _HEX_LUT[intensity]
+    hex_ii = np.char.add(hex_i, hex_i)
+    
+    return np.where(
+        down,
+        np.char.add(np.char.add('#', hex_ii), 'ff'),
+        np.char.add('#ff', hex_ii),
+    )
+
+
 def normalize_entity_name(name: str, entity_type: str = 'gene') -> str:
     """
     Normalize entity name based on type (gene, protein, cell).
@@ -299,7 +379,10 @@ def color_kegg_pathway(
              normalized_expression[key] = val
              key_map[key] = key
 
-    # Apply colors to nodes
+    # Match nodes first, then color all hits in one vectorized pass
+    matched_nodes = []
+    matched_values = []
+    
     for node in pathway['nodes']:
         # Template nodes usually have 'name' or 'id' as the gene/entity name
         # In our templates, 'id' is often the Symbol/Name (e.g. "TP53"), 
@@ -310,31 +393,23 @@ def color_kegg_pathway(
         if not node_name:
              node_name = str(node.get('id', ''))
         
-        # For matching, we might need to be careful. 
-        # If node_name is "TP53", we look for "TP53" in normalized_expression.
-        
-        matched_value = None
-        matched_original_key = None
-        
         # Direct match or Normalized match
-        if node_name in normalized_expression:
-            matched_value = normalized_expression[node_name]
-            matched_original_key = key_map.get(node_name, node_name)
-        
-        # Try to fuzzy match if we are in Cell mode and exact match failed?
-        # (Already handled by normalize_entity_name filling the dict with standard names)
+        # (Cell mode fuzzy matching is already handled by normalize_entity_name
+        # filling the dict with standard names)
+        matched_value = normalized_expression.get(node_name)
             
         if matched_value is not None:
             # DEBUG: Print first few matches
-            if len([n for n in pathway['nodes'] if n.get('expression') is not None]) < 5:
+            if len(matched_values) < 5:
                 print(f"[DEBUG] Matched {node_name}: value={matched_value}, type={type(matched_value)}", file=sys.stderr, flush=True)
             
-            node['color'] = map_expression_to_color(matched_value, min_val, max_val)
+            matched_nodes.append(node)
+            matched_values.append(matched_value)
             node['value'] = abs(matched_value)  # Size by absolute expression
             node['expression'] = matched_value  # Store original value
             
             # CRITICAL: Store the matched entity name (Original User Key) so frontend can link click -> data
-            node['hit_name'] = matched_original_key
+            node['hit_name'] = key_map.get(node_name, node_name)
         else:
             # Keep default gray for nodes without data
             node['color'] = '#95a5a6'
@@ -342,6 +417,11 @@ def color_kegg_pathway(
             node['expression'] = None
             node['hit_name'] = None
     
+    if matched_nodes:
+        colors = map_expression_to_color_vec(np.array(matched_values, dtype=np.float64), min_val, max_val)
+        for node, color in zip(matched_nodes, colors.tolist()):
+            node['color'] = color
+    
     # Add metadata
     pathway['metadata'] = {
         'colored': True,
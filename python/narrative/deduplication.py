@@ -1,6 +1,20 @@
+import sys
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Any, Optional
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+
+# Above this many terms the dense N x N Jaccard matrix is replaced by
+# MinHash/LSH candidate pairs that are then checked exactly
+MINHASH_MIN_TERMS = 2000
+_MINHASH_PERMUTATIONS = 128
+_MERSENNE_PRIME = (1 << 31) - 1
+# Fixed universal hash family h(x) = (a*x + b) mod p, so runs are reproducible
+_hash_rng = np.random.default_rng(20240101)
+_HASH_A = _hash_rng.integers(1, _MERSENNE_PRIME, size=_MINHASH_PERMUTATIONS, dtype=np.int64)
+_HASH_B = _hash_rng.integers(0, _MERSENNE_PRIME, size=_MINHASH_PERMUTATIONS, dtype=np.int64)
+
 
 class SemanticAggregator:
     """
@@ -20,6 +34,107 @@ class SemanticAggregator:
             return 0.0
         return intersection / union
 
+    @staticmethod
+    def _incidence(gene_sets: Sequence[frozenset]) -> Tuple[sp.csr_matrix, np.ndarray]:
+        """Sparse term x gene incidence matrix plus the size of each gene set."""
+        n = len(gene_sets)
+        gene_idx: Dict[str, int] = {}
+        indices = [gene_idx.setdefault(g, len(gene_idx)) for s in gene_sets for g in s]
+        sizes = np.fromiter((len(s) for s in gene_sets), dtype=np.int64, count=n)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(sizes, out=indptr[1:])
+        incidence = sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.int32), np.asarray(indices, dtype=np.int64), indptr),
+            shape=(n, len(gene_idx)),
+        )
+        return incidence, sizes
+
+    @classmethod
+    def jaccard_matrix(cls, gene_sets: Sequence[frozenset]) -> np.ndarray:
+        """
+        Pairwise Jaccard indices for all gene sets at once.
+        Builds a sparse term x gene incidence matrix so every intersection
+        comes out of a single sparse product instead of N^2 set operations.
+        """
+        incidence, sizes = cls._incidence(gene_sets)
+        inter = (incidence @ incidence.T).toarray().astype(np.float64)
+        union = sizes[:, None] + sizes[None, :] - inter
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    def similarity_graph(self, gene_sets: Sequence[frozenset]) -> sp.csr_matrix:
+        """Adjacency of term pairs whose Jaccard index reaches the threshold."""
+        if len(gene_sets) < MINHASH_MIN_TERMS or self.threshold <= 0:
+            return sp.csr_matrix(self.jaccard_matrix(gene_sets) >= self.threshold)
+        return self._minhash_graph(gene_sets)
+
+    def _band_rows(self) -> int:
+        """
+        Rows per LSH band: the largest that still makes a pair sitting exactly
+        at the threshold a candidate with >= 99% probability. At least two rows,
+        since single-row bands turn any shared gene into a candidate.
+        """
+        best = 2
+        for rows in (2, 4, 8, 16, 32):
+            bands = _MINHASH_PERMUTATIONS // rows
+            if 1.0 - (1.0 - self.threshold ** rows) ** bands >= 0.99:
+                best = rows
+        return best
+
+    def _minhash_graph(self, gene_sets: Sequence[frozenset]) -> sp.csr_matrix:
+        """
+        Approximate similarity_graph for large N: MinHash signatures are banded
+        (LSH) to find candidate pairs, and only those pairs get an exact Jaccard.
+        """
+        n = len(gene_sets)
+        incidence, sizes = self._incidence(gene_sets)
+        # Empty sets never reach a positive threshold
+        rows = np.flatnonzero(sizes)
+        sub = incidence[rows]
+        sub_sizes = sizes[rows]
+        m = len(rows)
+
+        # signatures[k, t] = min over genes g of term t of h_k(g); each gene is hashed once
+        # (permutation-major so each reduceat runs over contiguous memory)
+        gene_ids = np.arange(sub.shape[1], dtype=np.int64)
+        gene_hashes = ((_HASH_A[:, None] * gene_ids + _HASH_B[:, None]) % _MERSENNE_PRIME).astype(np.uint32)
+        signatures = np.empty((_MINHASH_PERMUTATIONS, m), dtype=np.uint32)
+        for k in range(_MINHASH_PERMUTATIONS):
+            signatures[k] = np.minimum.reduceat(gene_hashes[k, sub.indices], sub.indptr[:-1])
+
+        # Terms that agree on every row of some band become candidate pairs.
+        # Band rows are folded into one uint64 key; collisions only add candidates.
+        band_rows = self._band_rows()
+        positions = np.arange(m)
+        candidates = np.empty(0, dtype=np.int64)
+        for k in range(0, _MINHASH_PERMUTATIONS, band_rows):
+            key = signatures[k].astype(np.uint64)
+            for c in range(k + 1, k + band_rows):
+                key = key * np.uint64(1000003) ^ signatures[c]
+            order = np.argsort(key, kind='stable')
+            sorted_key = key[order]
+            bucket_start = np.flatnonzero(np.r_[True, sorted_key[1:] != sorted_key[:-1]])
+            bucket_end = np.r_[bucket_start[1:], m]
+            # Pair every sorted position with each later position in its bucket
+            partners = bucket_end[np.cumsum(np.isin(positions, bucket_start)) - 1] - positions - 1
+            total = int(partners.sum())
+            if total == 0:
+                continue
+            left = np.repeat(positions, partners)
+            right = left + 1 + np.arange(total) - np.repeat(np.cumsum(partners) - partners, partners)
+            # Stable sort keeps bucket members ascending, so order[left] < order[right]
+            candidates = np.union1d(candidates, order[left] * m + order[right])
+        if not len(candidates):
+            return sp.csr_matrix((n, n), dtype=bool)
+
+        left, right = candidates // m, candidates % m
+        inter = np.asarray(sub[left].multiply(sub[right]).sum(axis=1)).ravel()
+        union = sub_sizes[left] + sub_sizes[right] - inter
+        keep = inter / union >= self.threshold
+        return sp.csr_matrix(
+            (np.ones(int(keep.sum()), dtype=bool), (rows[left[keep]], rows[right[keep]])),
+            shape=(n, n),
+        )
+
     def deduplicate(self, enrichment_df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
         Main entry point.
@@ -35,83 +150,86 @@ class SemanticAggregator:
                     return name
             return None
 
-        def parse_gene_set(val: Any) -> set:
+        # Gene symbols are interned: the same few thousand symbols recur across
+        # every term, so sets share one string object per symbol and hash/equality
+        # checks hit the identity fast path.
+        def parse_gene_set(val: Any) -> frozenset:
+            # Common case first: delimited gene string straight from the enrichment table
+            if isinstance(val, str):
+                return frozenset(map(sys.intern, val.replace(';', ' ').replace(',', ' ').split()))
             if val is None or (isinstance(val, float) and np.isnan(val)):
-                return set()
-            if isinstance(val, (list, tuple, set)):
-                return set(str(v).strip() for v in val if str(v).strip())
+                return frozenset()
+            if isinstance(val, (list, tuple, set, frozenset)):
+                return frozenset(sys.intern(str(v).strip()) for v in val if str(v).strip())
             text = str(val).replace(';', ' ').replace(',', ' ')
-            return set(tok for tok in text.split() if tok)
+            return frozenset(map(sys.intern, text.split()))
 
-        # Standardize DF
-        df = enrichment_df.copy()
+        # Resolve source-specific column names; the frame itself is never copied
+        df = enrichment_df
         term_col = pick_column(df, ['Term', 'term', 'Pathway', 'pathway', 'pathway_name', 'Name', 'name'])
         genes_col = pick_column(df, ['Genes', 'genes', 'Hit Genes', 'hit_genes', 'Gene Set', 'gene_set', 'Lead_genes', 'Leading edge', 'leading_edge'])
         fdr_col = pick_column(df, ['Adjusted P-value', 'adjusted_p_value', 'FDR', 'fdr'])
         p_col = pick_column(df, ['P-value', 'p_value', 'PValue'])
+        sort_col = fdr_col or p_col
 
-        if term_col and term_col != 'Term':
-            df['Term'] = df[term_col]
-        if genes_col:
-            df['Genes'] = df[genes_col]
-        elif 'Genes' not in df.columns:
-            df['Genes'] = ''
+        # Sort by P-value (most significant first) to pick "Representatives".
+        # Stable argsort on the raw column (NaN last); ties keep input order.
+        if sort_col:
+            p_series = df[sort_col]
+            if pd.api.types.is_numeric_dtype(p_series):
+                order = np.argsort(p_series.to_numpy(dtype=np.float64, na_value=np.nan), kind='stable')
+            else:
+                order = p_series.reset_index(drop=True).sort_values(kind='stable').index.to_numpy()
+        else:
+            order = np.arange(len(df))
 
+        # Project only the three columns the clustering reads, in sorted order
+        n = len(order)
+        terms = df[term_col].to_numpy(dtype=object)[order].tolist() if term_col else [''] * n
+        pvals = df[sort_col].to_numpy(dtype=object)[order].tolist() if sort_col else [0] * n
         # Ensure we have a set of genes for each term
-        # Assuming 'Genes' col formatting is typical (e.g., "TP53;EGFR" or "TP53, EGFR")
-        df['GeneSet'] = df['Genes'].apply(parse_gene_set)
-        
-        # Sort by P-value (most significant first) to pick "Representatives"
-        if fdr_col:
-            df = df.sort_values(fdr_col)
-        elif p_col:
-            df = df.sort_values(p_col)
-            
-        data = df.to_dict('records')
-        clusters = [] # List of {'rep': record, 'members': [record, ...]}
-        
-        assigned_indices = set()
+        # Assuming gene column formatting is typical (e.g., "TP53;EGFR" or "TP53, EGFR")
+        if genes_col:
+            gene_sets = [parse_gene_set(val) for val in df[genes_col].to_numpy(dtype=object)[order]]
+        else:
+            gene_sets = [frozenset()] * n
 
-        for i, row_a in enumerate(data):
-            if i in assigned_indices:
-                continue
+        clusters = [] # List of {'rep': term, 'members': [term, ...]}
+
+        # Terms linked (directly or transitively) by Jaccard >= threshold form one module
+        _, labels = connected_components(self.similarity_graph(gene_sets), directed=False)
+        # Stable grouping keeps each module's members in p-value order
+        by_module = np.argsort(labels, kind='stable')
+        bounds = np.flatnonzero(np.diff(labels[by_module])) + 1
+        groups = np.split(by_module, bounds)
+        # Modules are emitted in the order of their most significant term
+        groups.sort(key=lambda g: g[0])
+
+        for group in groups:
+            member_idx = group.tolist()
+            rep = member_idx[0]
             
-            # Start a new cluster with this term as the Representative (because it has lowest P-val)
+            # The Representative is the member with the lowest P-val (arrays are sorted)
             current_cluster = {
-                "representative": row_a.get('Term', ''),
-                "p_value": row_a.get(fdr_col, row_a.get(p_col, 0)),
-                "genes": list(row_a['GeneSet']),
-                "members": [row_a.get('Term', '')],  # Include itself
-                "size": 1
+                "representative": terms[rep],
+                "p_value": pvals[rep],
+                "genes": list(gene_sets[rep]),
+                "members": [terms[j] for j in member_idx],  # Includes itself
+                "size": len(member_idx)
             }
-            assigned_indices.add(i)
-            
-            # Find all subsequent terms that are similar to this representative
-            for j in range(i + 1, len(data)):
-                if j in assigned_indices:
-                    continue
-                
-                row_b = data[j]
-                similarity = self.calculate_jaccard(row_a['GeneSet'], row_b['GeneSet'])
-                
-                if similarity >= self.threshold:
-                    current_cluster['members'].append(row_b.get('Term', ''))
-                    # Merge gene sets for a comprehensive view? 
-                    # For now, keep rep's genes or union? Union is safer for "Module" view.
-                    # row_a['GeneSet'].update(row_b['GeneSet']) 
-                    current_cluster['size'] += 1
-                    assigned_indices.add(j)
-            
-            # Format output for the next step (Narrative)
-            # Simplify 'members' if too long
-            if len(current_cluster['members']) > 5:
-                current_cluster['members_str'] = ", ".join(current_cluster['members'][:5]) + f", ... ({len(current_cluster['members'])} total)"
-            else:
-                current_cluster['members_str'] = ", ".join(current_cluster['members'])
-                
             clusters.append(current_cluster)
 
         return clusters
 
+def format_members(cluster: Dict[str, Any], k: int = 5) -> str:
+    """
+    Human-readable member list for a module, truncated to the first k terms.
+    Formatted on demand so only the modules actually shown pay for it.
+    """
+    members = cluster.get('members', [])
+    if len(members) > k:
+        return ", ".join(members[:k]) + f", ... ({len(members)} total)"
+    return ", ".join(members)
+
 # Singleton
 deduplicator = SemanticAggregator()
@@ -1,107 +1,330 @@
+import atexit
 import json
+import logging
+import queue
 import sqlite3
-import uuid
-from datetime import datetime
+import threading
+import time
+from contextlib import contextmanager
+from os import urandom
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+# Applied once to the long-lived connection. WAL lets readers proceed during a
+# write and, with synchronous=NORMAL, only fsyncs at checkpoints.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+)
+
+def _dumps(obj: Any) -> str:
+    """Serialize a JSON column value (orjson when available)."""
+    if orjson is not None:
+        try:
+            # Columns are TEXT and rows are returned to the UI as-is, so keep str
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:  # e.g. non-string keys; stdlib json coerces those
+            pass
+    return json.dumps(obj, ensure_ascii=False)
+
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+# (epoch second, formatted prefix) of the last timestamp; strftime dominates
+# the cost and only changes once a second
+_last_second: Tuple[int, str] = (-1, "")
+
+
+def _now_iso() -> str:
+    """Current UTC time as ISO-8601 with microseconds (naive, like utcnow().isoformat())."""
+    global _last_second
+    seconds, nanos = divmod(time.time_ns(), 1_000_000_000)
+    cached = _last_second
+    if cached[0] != seconds:
+        cached = _last_second = (seconds, time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)))
+    return f"{cached[1]}.{nanos // 1000:06d}"
+
+
+# Schema, applied in one script and one transaction at startup
+_SCHEMA_DDL = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    file_path TEXT,
+    file_name TEXT,
+    created_at TEXT,
+    data_type TEXT,
+    pathway_id TEXT,
+    pathway_name TEXT,
+    gene_count INTEGER,
+    has_pvalue INTEGER,
+    insights_summary TEXT,
+    config_json TEXT
+);
+CREATE TABLE IF NOT EXISTS project_genes (
+    project_id INTEGER,
+    gene TEXT,
+    score REAL,
+    direction TEXT,
+    FOREIGN KEY(project_id) REFERENCES projects(id)
+);
+CREATE TABLE IF NOT EXISTS enrichment_audits (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT,
+    file_path TEXT,
+    method TEXT,
+    gene_set_source TEXT,
+    metadata_json TEXT,
+    summary_json TEXT
+);
+CREATE TABLE IF NOT EXISTS de_analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT,
+    file_path TEXT,
+    method TEXT,
+    group1_json TEXT,
+    group2_json TEXT,
+    qc_json TEXT,
+    summary_json TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at);
+CREATE INDEX IF NOT EXISTS idx_projects_pathway ON projects(pathway_id);
+CREATE INDEX IF NOT EXISTS idx_project_genes_gene_cover
+    ON project_genes(gene, project_id, score, direction);
+-- Superseded by the covering index above (same leading column)
+DROP INDEX IF EXISTS idx_project_genes_gene;
+CREATE INDEX IF NOT EXISTS idx_project_genes_project_cover
+    ON project_genes(project_id, gene, score, direction);
+CREATE INDEX IF NOT EXISTS idx_enrichment_audits_created ON enrichment_audits(created_at);
+CREATE INDEX IF NOT EXISTS idx_enrichment_audits_file ON enrichment_audits(file_path);
+CREATE INDEX IF NOT EXISTS idx_de_analyses_created ON de_analyses(created_at);
+CREATE INDEX IF NOT EXISTS idx_de_analyses_file ON de_analyses(file_path);
+COMMIT;
+"""
+
+# Hot statements are kept as fixed strings so sqlite3's per-connection
+# statement cache reuses the compiled form instead of re-preparing them.
+_SQL_INSERT_PROJECT = """
+    INSERT INTO projects (
+        session_id, file_path, file_name, created_at, data_type,
+        pathway_id, pathway_name, gene_count, has_pvalue, insights_summary,
+        config_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_INSERT_GENE = """
+    INSERT INTO project_genes (project_id, gene, score, direction)
+    VALUES (?, ?, ?, ?)
+"""
+_SQL_LIST_RECENT = """
+    SELECT id, session_id, file_path, file_name, created_at,
+           pathway_id, pathway_name, gene_count, has_pvalue
+    FROM projects
+    ORDER BY created_at DESC
+    LIMIT ?
+"""
+_SQL_PATHWAY_FREQ = """
+    SELECT pathway_id, pathway_name, COUNT(*) as count
+    FROM projects
+    WHERE pathway_id IS NOT NULL
+    GROUP BY pathway_id, pathway_name
+    ORDER BY count DESC
+    LIMIT ?
+"""
+_SQL_INSERT_AUDIT = """
+    INSERT INTO enrichment_audits (
+        created_at, file_path, method, gene_set_source,
+        metadata_json, summary_json
+    ) VALUES (?, ?, ?, ?, ?, ?)
+"""
+_SQL_INSERT_DE = """
+    INSERT INTO de_analyses (
+        created_at, file_path, method, group1_json, group2_json,
+        qc_json, summary_json
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+_SQL_GENE_CONTEXT = """
+    SELECT p.id, p.file_name, p.pathway_id, p.pathway_name, p.created_at,
+           g.gene, g.score, g.direction
+    FROM project_genes g
+    JOIN projects p ON p.id = g.project_id
+    WHERE g.gene IN ({placeholders})
+    ORDER BY p.created_at DESC
+    LIMIT ?
+"""
+# Seconds a cached list_recent/list_pathway_frequency result may be served;
+# writes through this manager invalidate it sooner
+_READ_CACHE_TTL = 2.0
+
+# Deferred writes: the writer thread commits up to this many queued records
+# per transaction, waiting at most this long for a batch to fill
+_WRITE_BATCH_MAX = 64
+_WRITE_BATCH_WAIT = 0.05
+
+# Same rows and order as _SQL_GENE_CONTEXT, but walks projects newest-first and
+# checks each one's genes against the list, stopping after LIMIT matches.
+# CROSS JOIN pins the loop order; the unary + keeps the planner from probing
+# the gene index once per listed gene.
+_SQL_GENE_CONTEXT_RECENT_FIRST = """
+    SELECT p.id, p.file_name, p.pathway_id, p.pathway_name, p.created_at,
+           g.gene, g.score, g.direction
+    FROM projects p
+    CROSS JOIN project_genes g ON g.project_id = p.id
+    WHERE +g.gene IN ({placeholders})
+    ORDER BY p.created_at DESC
+    LIMIT ?
+"""
+# Gene-list size from which the newest-first plan wins over gene-index lookups
+_RECENT_FIRST_MIN_GENES = 256
+
+# get_gene_context pads its IN-list up to a power of two (repeating the last
+# gene) so the statement text recurs; beyond this size the list is used as-is.
+_GENE_CONTEXT_BUCKET_MAX = 1024
 
 
 class ProjectManager:
-    def __init__(self, db_path: Optional[str] = None) -> None:
+    """
+    SQLite-backed project memory.
+    list_recent, list_pathway_frequency and get_gene_context return
+    sqlite3.Row objects, not dicts: row["col"] and row[0] work, but there is
+    no .get() and `in` tests values rather than column names;
+    list_enrichment_audits returns dicts with the decoded JSON columns.
+    JSON-encode Rows with bio_core.BioJSONEncoder or convert with dict(row).
+    With deferred_writes=True the record_* methods queue their rows for a
+    background writer that commits them in batches, and return None instead
+    of the new row id; call flush() to wait for queued writes.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, deferred_writes: bool = False) -> None:
         if db_path is None:
             base_dir = Path.home() / ".bioviz_local"
             base_dir.mkdir(parents=True, exist_ok=True)
             db_path = str(base_dir / "project_memory.db")
         self.db_path = db_path
+        # One connection for the lifetime of the manager; sqlite3 objects are
+        # not safe for concurrent use, so every access goes through _lock.
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.db_path, check_same_thread=False, isolation_level=None, cached_statements=256
+        )
+        self._conn.row_factory = sqlite3.Row
+        # Polled UI reads, keyed by (query, params, write generation)
+        self._read_cache: Dict[Tuple, Tuple[float, List[sqlite3.Row]]] = {}
+        self._write_gen = 0
         self._init_db()
 
-    def _connect(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        return conn
+        self._write_q: Optional["queue.Queue[Callable[[sqlite3.Connection], Any]]"] = None
+        if deferred_writes:
+            self._write_q = queue.Queue()
+            threading.Thread(
+                target=self._writer_loop, name="project-memory-writer", daemon=True
+            ).start()
+            # The writer is a daemon thread; drain it before the interpreter exits
+            atexit.register(self.flush)
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Run a block of writes as one IMMEDIATE transaction on the shared connection."""
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            self._write_gen += 1
+
+    def _submit(self, job: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run a write job now, or queue it for the writer thread in deferred mode."""
+        if self._write_q is None:
+            with self._write() as conn:
+                return job(conn)
+        self._write_q.put(job)
+        return None
+
+    def _writer_loop(self) -> None:
+        write_q = self._write_q
+        while True:
+            jobs = [write_q.get()]
+            deadline = time.monotonic() + _WRITE_BATCH_WAIT
+            while len(jobs) < _WRITE_BATCH_MAX:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    jobs.append(write_q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                with self._write() as conn:
+                    for job in jobs:
+                        job(conn)
+            except Exception:
+                # Retry one by one so a single bad record does not drop the batch
+                for job in jobs:
+                    try:
+                        with self._write() as conn:
+                            job(conn)
+                    except Exception as e:
+                        logging.warning(f"[ProjectMemory] Deferred write failed: {e}")
+            finally:
+                for _ in jobs:
+                    write_q.task_done()
+
+    def flush(self) -> None:
+        """Block until all queued deferred writes are committed."""
+        if self._write_q is not None:
+            self._write_q.join()
+
+    def _read(self, query: str, params: Any = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(query, params).fetchall()
+
+    def _cached_read(self, query: str, params: Tuple) -> List[sqlite3.Row]:
+        """Like _read, but reuse a recent result if nothing was written since."""
+        now = time.monotonic()
+        with self._lock:
+            key = (query, params, self._write_gen)
+            hit = self._read_cache.get(key)
+            if hit is None or now - hit[0] > _READ_CACHE_TTL:
+                rows = self._conn.execute(query, params).fetchall()
+                if len(self._read_cache) > 32:
+                    self._read_cache.clear()
+                self._read_cache[key] = hit = (now, rows)
+        # Rows are immutable, so only the list needs copying
+        return list(hit[1])
 
     def _init_db(self) -> None:
-        with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS projects (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    session_id TEXT NOT NULL,
-                    file_path TEXT,
-                    file_name TEXT,
-                    created_at TEXT,
-                    data_type TEXT,
-                    pathway_id TEXT,
-                    pathway_name TEXT,
-                    gene_count INTEGER,
-                    has_pvalue INTEGER,
-                    insights_summary TEXT,
-                    config_json TEXT
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS project_genes (
-                    project_id INTEGER,
-                    gene TEXT,
-                    score REAL,
-                    direction TEXT,
-                    FOREIGN KEY(project_id) REFERENCES projects(id)
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS enrichment_audits (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    created_at TEXT,
-                    file_path TEXT,
-                    method TEXT,
-                    gene_set_source TEXT,
-                    metadata_json TEXT,
-                    summary_json TEXT
-                )
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS de_analyses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    created_at TEXT,
-                    file_path TEXT,
-                    method TEXT,
-                    group1_json TEXT,
-                    group2_json TEXT,
-                    qc_json TEXT,
-                    summary_json TEXT
-                )
-                """
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_projects_created ON projects(created_at)"
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_projects_pathway ON projects(pathway_id)"
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_project_genes_gene ON project_genes(gene)"
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_enrichment_audits_created ON enrichment_audits(created_at)"
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_enrichment_audits_file ON enrichment_audits(file_path)"
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_de_analyses_created ON de_analyses(created_at)"
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_de_analyses_file ON de_analyses(file_path)"
-            )
+        with self._lock:
+            conn = self._conn
+            for pragma in _CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            try:
+                conn.executescript(_SCHEMA_DDL)
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            # Give the planner statistics on first use; afterwards let SQLite
+            # decide whether they are stale enough to refresh
+            has_stats = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            ).fetchone()
+            conn.execute("PRAGMA optimize" if has_stats else "ANALYZE")
 
-    def record_analysis(
-        self,
+    @staticmethod
+    def _project_row(
         *,
         file_path: Optional[str],
         data_type: str,
@@ -110,107 +333,128 @@ class ProjectManager:
         gene_count: int,
         has_pvalue: bool,
         insights_summary: Optional[str],
-        top_genes: Optional[List[Dict[str, Any]]],
         config: Optional[Dict[str, Any]] = None,
-    ) -> Optional[int]:
-        session_id = str(uuid.uuid4())
-        created_at = datetime.utcnow().isoformat()
+        config_json: Optional[str] = None,
+    ) -> tuple:
+        # Opaque per-analysis token; only stored and echoed back to the UI
+        session_id = urandom(16).hex()
+        created_at = _now_iso()
         file_name = None
         if file_path:
             file_name = Path(file_path).name
 
-        config_json = json.dumps(config or {}, ensure_ascii=False)
-
-        with self._connect() as conn:
-            cursor = conn.execute(
-                """
-                INSERT INTO projects (
-                    session_id, file_path, file_name, created_at, data_type,
-                    pathway_id, pathway_name, gene_count, has_pvalue, insights_summary,
-                    config_json
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    session_id,
-                    file_path,
-                    file_name,
-                    created_at,
-                    data_type,
-                    pathway_id,
-                    pathway_name,
-                    gene_count,
-                    1 if has_pvalue else 0,
-                    insights_summary,
-                    config_json,
-                ),
+        if config_json is None:
+            config_json = _dumps(config or {})
+        return (
+            session_id,
+            file_path,
+            file_name,
+            created_at,
+            data_type,
+            pathway_id,
+            pathway_name,
+            gene_count,
+            1 if has_pvalue else 0,
+            insights_summary,
+            config_json,
+        )
+
+    @staticmethod
+    def _gene_rows(project_id: int, top_genes: Optional[List[Dict[str, Any]]]) -> List[tuple]:
+        return [
+            (
+                project_id,
+                g.get("gene"),
+                float(g.get("score") or 0.0),
+                g.get("direction"),
             )
-            project_id = cursor.lastrowid
+            for g in top_genes or ()
+            if g.get("gene")
+        ]
 
-            if top_genes:
-                conn.executemany(
-                    """
-                    INSERT INTO project_genes (project_id, gene, score, direction)
-                    VALUES (?, ?, ?, ?)
-                    """,
-                    [
-                        (
-                            project_id,
-                            g.get("gene"),
-                            float(g.get("score") or 0.0),
-                            g.get("direction"),
-                        )
-                        for g in top_genes
-                        if g.get("gene")
-                    ],
-                )
+    def record_analysis(
+        self,
+        *,
+        file_path: Optional[str],
+        data_type: str,
+        pathway_id: Optional[str],
+        pathway_name: Optional[str],
+        gene_count: int,
+        has_pvalue: bool,
+        insights_summary: Optional[str],
+        top_genes: Optional[List[Dict[str, Any]]],
+        config: Optional[Dict[str, Any]] = None,
+    ) -> Optional[int]:
+        row = self._project_row(
+            file_path=file_path,
+            data_type=data_type,
+            pathway_id=pathway_id,
+            pathway_name=pathway_name,
+            gene_count=gene_count,
+            has_pvalue=has_pvalue,
+            insights_summary=insights_summary,
+            config=config,
+        )
 
+        def job(conn: sqlite3.Connection) -> int:
+            project_id = conn.execute(_SQL_INSERT_PROJECT, row).lastrowid
+            if top_genes:
+                conn.executemany(_SQL_INSERT_GENE, self._gene_rows(project_id, top_genes))
             return project_id
 
-    def list_recent(self, limit: int = 8) -> List[Dict[str, Any]]:
-        with self._connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT id, session_id, file_path, file_name, created_at,
-                       pathway_id, pathway_name, gene_count, has_pvalue
-                FROM projects
-                ORDER BY created_at DESC
-                LIMIT ?
-                """,
-                (limit,),
-            ).fetchall()
-        return [dict(row) for row in rows]
-
-    def list_pathway_frequency(self, limit: int = 6) -> List[Dict[str, Any]]:
-        with self._connect() as conn:
-            rows = conn.execute(
-                """
-                SELECT pathway_id, pathway_name, COUNT(*) as count
-                FROM projects
-                WHERE pathway_id IS NOT NULL
-                GROUP BY pathway_id, pathway_name
-                ORDER BY count DESC
-                LIMIT ?
-                """,
-                (limit,),
-            ).fetchall()
-        return [dict(row) for row in rows]
-
-    def get_gene_context(self, genes: List[str], limit: int = 5) -> List[Dict[str, Any]]:
+        return self._submit(job)
+
+    def record_analyses_bulk(self, records: List[Dict[str, Any]]) -> List[int]:
+        """
+        Record many analyses in a single transaction.
+        Each record takes the keyword arguments of record_analysis; returns the
+        project ids in input order. Nothing is written if any record fails.
+        """
+        # Parameter sweeps pass the same config dict for many records; serialize
+        # each distinct object once (ids are stable while records is alive)
+        config_blobs: Dict[int, str] = {}
+        rows = []
+        for record in records:
+            fields = {k: v for k, v in record.items() if k != "top_genes"}
+            config = fields.pop("config", None)
+            config_json = config_blobs.get(id(config))
+            if config_json is None:
+                config_json = config_blobs[id(config)] = _dumps(config or {})
+            rows.append(self._project_row(**fields, config_json=config_json))
+        project_ids: List[int] = []
+        gene_rows: List[tuple] = []
+        with self._write() as conn:
+            for record, row in zip(records, rows):
+                project_id = conn.execute(_SQL_INSERT_PROJECT, row).lastrowid
+                project_ids.append(project_id)
+                gene_rows.extend(self._gene_rows(project_id, record.get("top_genes")))
+            if gene_rows:
+                conn.executemany(_SQL_INSERT_GENE, gene_rows)
+        return project_ids
+
+    # Read paths return sqlite3.Row (key and index access). The bio_core
+    # handlers serialize them through BioJSONEncoder.default, which is where
+    # each Row becomes a dict
+
+    def list_recent(self, limit: int = 8) -> List[sqlite3.Row]:
+        return self._cached_read(_SQL_LIST_RECENT, (limit,))
+
+    def list_pathway_frequency(self, limit: int = 6) -> List[sqlite3.Row]:
+        return self._cached_read(_SQL_PATHWAY_FREQ, (limit,))
+
+    def get_gene_context(self, genes: List[str], limit: int = 5) -> List[sqlite3.Row]:
         if not genes:
             return []
-        placeholders = ",".join(["?"] * len(genes))
-        query = f"""
-            SELECT p.id, p.file_name, p.pathway_id, p.pathway_name, p.created_at,
-                   g.gene, g.score, g.direction
-            FROM project_genes g
-            JOIN projects p ON p.id = g.project_id
-            WHERE g.gene IN ({placeholders})
-            ORDER BY p.created_at DESC
-            LIMIT ?
-        """
-        with self._connect() as conn:
-            rows = conn.execute(query, (*genes, limit)).fetchall()
-        return [dict(row) for row in rows]
+        genes = list(genes)
+        if len(genes) <= _GENE_CONTEXT_BUCKET_MAX:
+            # Duplicates in an IN-list do not change the result
+            genes.extend([genes[-1]] * ((1 << (len(genes) - 1).bit_length()) - len(genes)))
+        if len(genes) >= _RECENT_FIRST_MIN_GENES and limit < len(genes):
+            sql = _SQL_GENE_CONTEXT_RECENT_FIRST
+        else:
+            sql = _SQL_GENE_CONTEXT
+        query = sql.format(placeholders=",".join(["?"] * len(genes)))
+        return self._read(query, (*genes, limit))
 
     def record_enrichment_run(
         self,
@@ -221,28 +465,19 @@ class ProjectManager:
         metadata: Optional[Dict[str, Any]],
         summary: Optional[Dict[str, Any]] = None,
     ) -> Optional[int]:
-        created_at = datetime.utcnow().isoformat()
-        metadata_json = json.dumps(metadata or {}, ensure_ascii=False)
-        summary_json = json.dumps(summary or {}, ensure_ascii=False)
-
-        with self._connect() as conn:
-            cursor = conn.execute(
-                """
-                INSERT INTO enrichment_audits (
-                    created_at, file_path, method, gene_set_source,
-                    metadata_json, summary_json
-                ) VALUES (?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    created_at,
-                    file_path,
-                    method,
-                    gene_set_source,
-                    metadata_json,
-                    summary_json,
-                ),
-            )
-            return cursor.lastrowid
+        created_at = _now_iso()
+        metadata_json = _dumps(metadata or {})
+        summary_json = _dumps(summary or {})
+
+        row = (
+            created_at,
+            file_path,
+            method,
+            gene_set_source,
+            metadata_json,
+            summary_json,
+        )
+        return self._submit(lambda conn: conn.execute(_SQL_INSERT_AUDIT, row).lastrowid)
 
     def list_enrichment_audits(
         self,
@@ -262,18 +497,17 @@ class ProjectManager:
         query += " ORDER BY created_at DESC LIMIT ?"
         params.append(limit)
 
-        with self._connect() as conn:
-            rows = conn.execute(query, params).fetchall()
+        rows = self._read(query, params)
 
         results = []
         for row in rows:
             item = dict(row)
             try:
-                item["metadata"] = json.loads(item.get("metadata_json") or "{}")
+                item["metadata"] = _loads(item.get("metadata_json") or "{}")
             except Exception:
                 item["metadata"] = {}
             try:
-                item["summary"] = json.loads(item.get("summary_json") or "{}")
+                item["summary"] = _loads(item.get("summary_json") or "{}")
             except Exception:
                 item["summary"] = {}
             results.append(item)
@@ -289,28 +523,19 @@ class ProjectManager:
         qc_report: Optional[Dict[str, Any]],
         summary: Optional[Dict[str, Any]] = None,
     ) -> Optional[int]:
-        created_at = datetime.utcnow().isoformat()
-        group1_json = json.dumps(group1_samples or [], ensure_ascii=False)
-        group2_json = json.dumps(group2_samples or [], ensure_ascii=False)
-        qc_json = json.dumps(qc_report or {}, ensure_ascii=False)
-        summary_json = json.dumps(summary or {}, ensure_ascii=False)
-
-        with self._connect() as conn:
-            cursor = conn.execute(
-                """
-                INSERT INTO de_analyses (
-                    created_at, file_path, method, group1_json, group2_json,
-                    qc_json, summary_json
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    created_at,
-                    file_path,
-                    method,
-                    group1_json,
-                    group2_json,
-                    qc_json,
-                    summary_json,
-                ),
-            )
-            return cursor.lastrowid
+        created_at = _now_iso()
+        group1_json = _dumps(group1_samples or [])
+        group2_json = _dumps(group2_samples or [])
+        qc_json = _dumps(qc_report or {})
+        summary_json = _dumps(summary or {})
+
+        row = (
+            created_at,
+            file_path,
+            method,
+            group1_json,
+            group2_json,
+            qc_json,
+            summary_json,
+        )
+        return self._submit(lambda conn: conn.execute(_SQL_INSERT_DE, row).lastrowid)
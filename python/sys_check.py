@@ -1,12 +1,17 @@
 
 import sys
 import os
+import functools
+import importlib.util
 import shutil
-import platform
 import socket
-import logging
 from pathlib import Path
 import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+if sys.platform == 'darwin':
+    import subprocess  # sysctl fallback in check_ram_gb
 
 def check_ram_gb():
     """Get total RAM in GB. Uses platform-specific methods if psutil is missing."""
@@ -17,7 +22,6 @@ def check_ram_gb():
         # Fallback for Mac
         if sys.platform == 'darwin':
             try:
-                import subprocess
                 cmd = ['sysctl', '-n', 'hw.memsize']
                 mem_bytes = int(subprocess.check_output(cmd).decode().strip())
                 return round(mem_bytes / (1024**3), 2)
@@ -41,35 +45,18 @@ def check_network(host="www.kegg.jp", port=443, timeout=3):
     except OSError:
         return False
 
-def check_dependencies():
-    """Check critical python dependencies."""
+@functools.lru_cache(maxsize=1)
+def _missing_dependencies():
     required = ['pandas', 'numpy', 'scipy', 'statsmodels']
-    missing = []
-    for pkg in required:
-        try:
-            __import__(pkg)
-        except ImportError:
-            missing.append(pkg)
-    return missing
+    # Presence check only: find_spec locates the package without executing it
+    return tuple(pkg for pkg in required if importlib.util.find_spec(pkg) is None)
 
-def perform_system_check():
-    """Run all checks and return a dict report."""
-    
-    # 1. RAM Check (Require > 4GB recommended)
-    ram_gb = check_ram_gb()
-    ram_status = "OK" if ram_gb >= 4 else "WARN" if ram_gb > 0 else "UNKNOWN"
-    
-    # 2. Disk Check (Require > 2GB free)
-    disk_free_gb = check_disk_space_gb()
-    disk_status = "OK" if disk_free_gb >= 2 else "WARN"
-    
-    # 3. Connectivity
-    # Check NCBI/KEGG (primary scientific data sources)
-    kegg_ok = check_network("www.kegg.jp")
-    ncbi_ok = check_network("www.ncbi.nlm.nih.gov")
-    
-    # Check AI Provider
-    ai_provider = os.getenv("AI_PROVIDER", "ollama").lower()
+def check_dependencies():
+    """Check critical python dependencies (result is fixed for the process lifetime)."""
+    return list(_missing_dependencies())
+
+def check_ai_provider(ai_provider):
+    """Check connectivity to the configured AI provider. Returns (reachable, target)."""
     ai_ok = False
     ai_url = "N/A"
     
@@ -88,6 +75,38 @@ def perform_system_check():
     elif ai_provider in ["deepseek", "bailian"]:
         ai_url = "api.deepseek.com" if ai_provider == "deepseek" else "dashscope.aliyuncs.com"
         ai_ok = check_network(ai_url, 443, timeout=3)
+    return ai_ok, ai_url
+
+def perform_system_check():
+    """Run all checks and return a dict report."""
+    
+    ai_provider = os.getenv("AI_PROVIDER", "ollama").lower()
+
+    # The probes are independent and mostly wait on sockets, so run them
+    # together; wall time is bounded by the slowest network timeout
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        ram_future = executor.submit(check_ram_gb)
+        disk_future = executor.submit(check_disk_space_gb)
+        kegg_future = executor.submit(check_network, "www.kegg.jp")
+        ncbi_future = executor.submit(check_network, "www.ncbi.nlm.nih.gov")
+        ai_future = executor.submit(check_ai_provider, ai_provider)
+        deps_future = executor.submit(check_dependencies)
+
+    # 1. RAM Check (Require > 4GB recommended)
+    ram_gb = ram_future.result()
+    ram_status = "OK" if ram_gb >= 4 else "WARN" if ram_gb > 0 else "UNKNOWN"
+    
+    # 2. Disk Check (Require > 2GB free)
+    disk_free_gb = disk_future.result()
+    disk_status = "OK" if disk_free_gb >= 2 else "WARN"
+    
+    # 3. Connectivity
+    # Check NCBI/KEGG (primary scientific data sources)
+    kegg_ok = kegg_future.result()
+    ncbi_ok = ncbi_future.result()
+    
+    # Check AI Provider
+    ai_ok, ai_url = ai_future.result()
 
     network_status = "OK" if (kegg_ok or ncbi_ok) else "OFFLINE"
     
@@ -98,7 +117,7 @@ def perform_system_check():
     # Logic is handled by the wrapper scripts usually, here we just report
     
     # 5. Dependency integrity
-    missing_deps = check_dependencies()
+    missing_deps = deps_future.result()
     deps_status = "OK" if not missing_deps else "CRITICAL"
 
     report = {
@@ -122,5 +141,4 @@ def perform_system_check():
     return report
 
 if __name__ == "__main__":
-    from datetime import datetime
     print(json.dumps(perform_system_check(), indent=2))
@@ -19,32 +19,40 @@ from mapper import (
 )
 
 
+def _emit(lines):
+    """Write one test phase's output in a single call"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def _header(title):
+    return ["=" * 60, title, "=" * 60]
+
+
 def test_load_pathways():
     """Test loading all three pathway templates"""
-    print("=" * 60)
-    print("TEST 1: Loading Pathway Templates")
-    print("=" * 60)
+    lines = _header("TEST 1: Loading Pathway Templates")
     
     pathway_ids = ['hsa04210', 'hsa04115', 'hsa04110']
     
     for pathway_id in pathway_ids:
         pathway = load_pathway_template(pathway_id)
         if pathway:
-            print(f"✓ {pathway_id}: {pathway['name']}")
-            print(f"  - Nodes: {len(pathway['nodes'])}")
-            print(f"  - Edges: {len(pathway['edges'])}")
-            print(f"  - Categories: {len(pathway['categories'])}")
+            lines += [
+                f"✓ {pathway_id}: {pathway['name']}",
+                f"  - Nodes: {len(pathway['nodes'])}",
+                f"  - Edges: {len(pathway['edges'])}",
+                f"  - Categories: {len(pathway['categories'])}",
+            ]
         else:
-            print(f"✗ {pathway_id}: FAILED TO LOAD")
+            lines.append(f"✗ {pathway_id}: FAILED TO LOAD")
     
-    print()
+    lines.append("")
+    _emit(lines)
 
 
 def test_color_pathway():
     """Test coloring a pathway with sample data"""
-    print("=" * 60)
-    print("TEST 2: Coloring Apoptosis Pathway")
-    print("=" * 60)
+    lines = _header("TEST 2: Coloring Apoptosis Pathway")
     
     # Sample gene expression data (log2 fold change)
     gene_expression = {
@@ -64,30 +72,31 @@ def test_color_pathway():
     colored_pathway = color_kegg_pathway('hsa04210', gene_expression)
     stats = get_pathway_statistics(colored_pathway)
     
-    print(f"Pathway: {colored_pathway['name']}")
-    print(f"Gene expression data: {len(gene_expression)} genes")
-    print()
-    print("Statistics:")
-    print(f"  - Total nodes: {stats['total_nodes']}")
-    print(f"  - Upregulated: {stats['upregulated']} ({stats['percent_upregulated']:.1f}%)")
-    print(f"  - Downregulated: {stats['downregulated']} ({stats['percent_downregulated']:.1f}%)")
-    print(f"  - Unchanged: {stats['unchanged']}")
-    print()
-    
-    # Show some colored nodes
-    print("Sample colored nodes:")
-    for node in colored_pathway['nodes'][:5]:
-        expr = node.get('expression', 'N/A')
-        print(f"  - {node['id']:10s}: color={node['color']}, expression={expr}")
+    lines += [
+        f"Pathway: {colored_pathway['name']}",
+        f"Gene expression data: {len(gene_expression)} genes",
+        "",
+        "Statistics:",
+        f"  - Total nodes: {stats['total_nodes']}",
+        f"  - Upregulated: {stats['upregulated']} ({stats['percent_upregulated']:.1f}%)",
+        f"  - Downregulated: {stats['downregulated']} ({stats['percent_downregulated']:.1f}%)",
+        f"  - Unchanged: {stats['unchanged']}",
+        "",
+        # Show some colored nodes
+        "Sample colored nodes:",
+    ]
+    lines += [
+        f"  - {node['id']:10s}: color={node['color']}, expression={node.get('expression', 'N/A')}"
+        for node in colored_pathway['nodes'][:5]
+    ]
     
-    print()
+    lines.append("")
+    _emit(lines)
 
 
 def test_batch_coloring():
     """Test batch coloring multiple pathways"""
-    print("=" * 60)
-    print("TEST 3: Batch Coloring All Pathways")
-    print("=" * 60)
+    lines = _header("TEST 3: Batch Coloring All Pathways")
     
     gene_expression = {
         # Shared genes across pathways
@@ -115,17 +124,18 @@ def test_batch_coloring():
     
     for pathway_id, pathway in pathways.items():
         stats = get_pathway_statistics(pathway)
-        print(f"{pathway_id} - {pathway['name']}")
-        print(f"  Up: {stats['upregulated']}, Down: {stats['downregulated']}, Unchanged: {stats['unchanged']}")
+        lines += [
+            f"{pathway_id} - {pathway['name']}",
+            f"  Up: {stats['upregulated']}, Down: {stats['downregulated']}, Unchanged: {stats['unchanged']}",
+        ]
     
-    print()
+    lines.append("")
+    _emit(lines)
 
 
 def test_color_mapping():
     """Test the color mapping function"""
-    print("=" * 60)
-    print("TEST 4: Color Mapping Verification")
-    print("=" * 60)
+    lines = _header("TEST 4: Color Mapping Verification")
     
     from mapper import map_expression_to_color
     
@@ -137,18 +147,18 @@ def test_color_mapping():
         (2.0, "Strong upregulation")
     ]
     
-    for value, description in test_values:
-        color = map_expression_to_color(value, -2.0, 2.0)
-        print(f"  {value:5.1f} → {color} ({description})")
+    lines += [
+        f"  {value:5.1f} → {map_expression_to_color(value, -2.0, 2.0)} ({description})"
+        for value, description in test_values
+    ]
     
-    print()
+    lines.append("")
+    _emit(lines)
 
 
 def main():
     """Run all tests"""
-    print("\n" + "=" * 60)
-    print("BioViz Local - KEGG Pathway Integration Tests")
-    print("=" * 60 + "\n")
+    _emit(["", "=" * 60, "BioViz Local - KEGG Pathway Integration Tests", "=" * 60, ""])
     
     try:
         test_load_pathways()
@@ -156,11 +166,15 @@ def main():
         test_batch_coloring()
         test_color_mapping()
         
-        print("=" * 60)
-        print("✓ ALL TESTS PASSED!")
-        print("=" * 60)
-        print("\nThe KEGG pathway integration is ready to use.")
-        print("Next step: Integrate into the Tauri frontend.\n")
+        _emit([
+            "=" * 60,
+            "✓ ALL TESTS PASSED!",
+            "=" * 60,
+            "",
+            "The KEGG pathway integration is ready to use.",
+            "Next step: Integrate into the Tauri frontend.",
+            "",
+        ])
         
     except Exception as e:
         print(f"\n✗ TEST FAILED: {e}")
@@ -14,18 +14,20 @@ except ImportError:
 from biologic_logic import biologic_studio
 import pandas as pd
 import logging
-from typing import Dict, Any, List
+import threading
+import time
+from typing import Dict, Any, List, Tuple
 
 # --- Narrative Engine Imports ---
 try:
-    from narrative.deduplication import deduplicator
+    from narrative.deduplication import deduplicator, format_members
     from narrative.literature_rag import rag_client
 except ImportError:
     # Handle relative imports if needed during build/test quirks
     import sys
     import os
     sys.path.append(os.path.join(os.path.dirname(__file__), 'narrative'))
-    from narrative.deduplication import deduplicator
+    from narrative.deduplication import deduplicator, format_members
     from narrative.literature_rag import rag_client
 # --------------------------------
 
@@ -120,6 +122,32 @@ def step_semantic_deduplication(enrichment_df: pd.DataFrame) -> List[Dict[str, A
     logger.info(f"Reduced to {len(clusters)} functional modules.")
     return clusters
 
+# Literature evidence memo, keyed on (term, sorted genes). Entries expire so a
+# module whose lookup came back empty or failed is retried on a later run.
+_EVIDENCE_TTL = 600.0
+_EVIDENCE_MAX = 256
+_evidence_cache: Dict[Tuple[str, Tuple[str, ...]], Tuple[float, Tuple[Dict[str, str], ...]]] = {}
+_evidence_lock = threading.Lock()
+
+def _fetch_evidence_cached(term: str, genes: List[str]) -> List[Dict[str, str]]:
+    """RAG lookup reused across narrative runs for identical modules; empty results are not kept."""
+    key = (term, tuple(sorted(genes)))
+    now = time.monotonic()
+    with _evidence_lock:
+        hit = _evidence_cache.get(key)
+        if hit is not None and now - hit[0] < _EVIDENCE_TTL:
+            return list(hit[1])
+
+    # The sorted tuple is only the key; the lookup keeps the caller's ranking
+    evidence = rag_client.fetch_evidence(term, list(genes))
+    if evidence:
+        with _evidence_lock:
+            _evidence_cache.pop(key, None)
+            if len(_evidence_cache) >= _EVIDENCE_MAX:
+                _evidence_cache.pop(next(iter(_evidence_cache)))
+            _evidence_cache[key] = (now, tuple(evidence))
+    return list(evidence)
+
 @motia.step(name="LiteratureScan", description="Fetches PubMed evidence for top modules.")
 def step_literature_scan(modules: List[Dict[str, Any]], context: Any = None) -> List[Dict[str, Any]]:
     # Process top 3 modules to save API tokens/time in this MVP
@@ -129,7 +157,7 @@ def step_literature_scan(modules: List[Dict[str, Any]], context: Any = None) ->
     for mod in top_modules:
         term = mod['representative']
         genes = mod['genes']
-        evidence = rag_client.fetch_evidence(term, list(genes))
+        evidence = _fetch_evidence_cached(term, genes)
         
         # Attach evidence to the module object
         mod_copy = mod.copy()
@@ -150,7 +178,7 @@ def step_generate_narrative(enhanced_modules: List[Dict[str, Any]]) -> str:
         snippet = ev[0]['snippet'] if ev else "No direct evidence found."
         
         narrative_parts.append(f"**{i+1}. {term} Axis**")
-        narrative_parts.append(f"Analysis identified a cluster of {mod['size']} related pathways (including {mod.get('members_str', '')}).")
+        narrative_parts.append(f"Analysis identified a cluster of {mod['size']} related pathways (including {format_members(mod)}).")
         narrative_parts.append(f"Key drivers: {', '.join(list(mod['genes'])[:5])}...")
         narrative_parts.append(f"*Mechanism*: {snippet}\n")
         
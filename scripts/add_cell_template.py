@@ -1,80 +1,103 @@
 import json
 import os
+import sys
 
-def create_hematopoietic_template():
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def save_columns(nodes, output_path):
+    """
+    Write a columnar (SoA) sidecar of the template nodes as .npz.
+
+    One array per field lets vectorized consumers color/lay out nodes
+    without walking a list of dicts. Strings are stored as fixed-width
+    unicode so the file loads without allow_pickle.
+    """
+    import numpy as np
+
+    np.savez_compressed(
+        output_path,
+        ids=np.array([n["id"] for n in nodes], dtype=np.int32),
+        names=np.array([n["name"] for n in nodes], dtype=str),
+        x=np.array([n["x"] for n in nodes], dtype=np.float32),
+        y=np.array([n["y"] for n in nodes], dtype=np.float32),
+        category=np.array([n["category"] for n in nodes], dtype=str),
+    )
+    print(f"Generated {output_path}")
+
+
+def create_hematopoietic_template(write_columns=False):
     """Generates a simplified KEGG-like JSON for Hematopoietic Cell Lineage (hsa04640)."""
     
     # Define the structure based on a hierarchical differentiation tree
     # Coordinates are approximate for visual layout
-    
-    # Root
-    hsc = {"id": 1, "name": "HSC", "x": 400, "y": 50, "type": "gene", "category": "Cell"} # Hematopoietic stem cell
-    
-    # Level 1: Multipotent
-    mpp = {"id": 2, "name": "MPP", "x": 400, "y": 150, "type": "gene", "category": "Cell"} # Multipotent progenitor
-    
-    # Level 2: Lineage Commitment
-    cmp = {"id": 3, "name": "CMP", "x": 200, "y": 250, "type": "gene", "category": "Cell"} # Common myeloid progenitor
-    clp = {"id": 4, "name": "CLP", "x": 600, "y": 250, "type": "gene", "category": "Cell"} # Common lymphoid progenitor
-    
-    # Level 3: Myeloid Branch
-    gmp = {"id": 5, "name": "GMP", "x": 100, "y": 350, "type": "gene", "category": "Cell"} # Granulocyte-macrophage progenitor
-    mep = {"id": 6, "name": "MEP", "x": 300, "y": 350, "type": "gene", "category": "Cell"} # Megakaryocyte-erythroid progenitor
-    
-    # Level 4: Differentiated Myeloid
-    monocyte = {"id": 7, "name": "Monocyte", "x": 50, "y": 450, "type": "gene", "category": "Cell"}
-    neutrophil = {"id": 8, "name": "Neutrophil", "x": 150, "y": 450, "type": "gene", "category": "Cell"}
-    eosinophil = {"id": 9, "name": "Eosinophil", "x": 100, "y": 550, "type": "gene", "category": "Cell"}
-    basophil = {"id": 10, "name": "Basophil", "x": 200, "y": 550, "type": "gene", "category": "Cell"}
-    macrophage = {"id": 11, "name": "Macrophage", "x": 50, "y": 550, "type": "gene", "category": "Cell"}
-    
-    # Level 3: Lymphoid Branch
-    pro_b = {"id": 12, "name": "Pro-B cell", "x": 500, "y": 350, "type": "gene", "category": "Cell"}
-    pro_t = {"id": 13, "name": "Pro-T cell", "x": 700, "y": 350, "type": "gene", "category": "Cell"}
-    nk_p = {"id": 14, "name": "NK precursor", "x": 800, "y": 350, "type": "gene", "category": "Cell"}
-
-    # Level 4: Differentiated Lymphoid
-    b_cell = {"id": 15, "name": "B cell", "x": 500, "y": 450, "type": "gene", "category": "Cell"}
-    t_cell = {"id": 16, "name": "T cell", "x": 700, "y": 450, "type": "gene", "category": "Cell"}
-    nk_cell = {"id": 17, "name": "NK cell", "x": 850, "y": 450, "type": "gene", "category": "Cell"}
-
-    # Level 5: T Cell Subsets
-    cd4_t = {"id": 18, "name": "CD4+ T cell", "x": 650, "y": 550, "type": "gene", "category": "Cell"}
-    cd8_t = {"id": 19, "name": "CD8+ T cell", "x": 750, "y": 550, "type": "gene", "category": "Cell"}
+    # (name, x, y, category); node ids are assigned in order starting at 1
+    node_spec = (
+        # Root
+        ("HSC", 400, 50, "Cell"),  # 1: Hematopoietic stem cell
+        # Level 1: Multipotent
+        ("MPP", 400, 150, "Cell"),  # 2: Multipotent progenitor
+        # Level 2: Lineage Commitment
+        ("CMP", 200, 250, "Cell"),  # 3: Common myeloid progenitor
+        ("CLP", 600, 250, "Cell"),  # 4: Common lymphoid progenitor
+        # Level 3: Myeloid Branch
+        ("GMP", 100, 350, "Cell"),  # 5: Granulocyte-macrophage progenitor
+        ("MEP", 300, 350, "Cell"),  # 6: Megakaryocyte-erythroid progenitor
+        # Level 4: Differentiated Myeloid
+        ("Monocyte", 50, 450, "Cell"),  # 7
+        ("Neutrophil", 150, 450, "Cell"),  # 8
+        ("Eosinophil", 100, 550, "Cell"),  # 9
+        ("Basophil", 200, 550, "Cell"),  # 10
+        ("Macrophage", 50, 550, "Cell"),  # 11
+        # Level 3: Lymphoid Branch
+        ("Pro-B cell", 500, 350, "Cell"),  # 12
+        ("Pro-T cell", 700, 350, "Cell"),  # 13
+        ("NK precursor", 800, 350, "Cell"),  # 14
+        # Level 4: Differentiated Lymphoid
+        ("B cell", 500, 450, "Cell"),  # 15
+        ("T cell", 700, 450, "Cell"),  # 16
+        ("NK cell", 850, 450, "Cell"),  # 17
+        # Level 5: T Cell Subsets
+        ("CD4+ T cell", 650, 550, "Cell"),  # 18
+        ("CD8+ T cell", 750, 550, "Cell"),  # 19
+    )
 
     nodes = [
-        hsc, mpp, cmp, clp, gmp, mep, 
-        monocyte, neutrophil, eosinophil, basophil, macrophage,
-        pro_b, pro_t, nk_p, b_cell, t_cell, nk_cell, cd4_t, cd8_t
+        {"id": i, "name": name, "x": x, "y": y, "type": "gene", "category": category}
+        for i, (name, x, y, category) in enumerate(node_spec, start=1)
     ]
 
-    # Edges (Differentiation paths)
-    edges = [
-        {"source": 1, "target": 2}, # HSC -> MPP
-        {"source": 2, "target": 3}, # MPP -> CMP
-        {"source": 2, "target": 4}, # MPP -> CLP
-        
+    # Edges (Differentiation paths) as (source, target)
+    edge_spec = (
+        (1, 2),  # HSC -> MPP
+        (2, 3),  # MPP -> CMP
+        (2, 4),  # MPP -> CLP
+
         # Myeloid Lineage
-        {"source": 3, "target": 5}, # CMP -> GMP
-        {"source": 3, "target": 6}, # CMP -> MEP
-        {"source": 5, "target": 7}, # GMP -> Monocyte
-        {"source": 7, "target": 11}, # Monocyte -> Macrophage
-        {"source": 5, "target": 8}, # GMP -> Neutrophil
-        {"source": 5, "target": 9}, # GMP -> Eosinophil
-        {"source": 5, "target": 10}, # GMP -> Basophil
-        
+        (3, 5),  # CMP -> GMP
+        (3, 6),  # CMP -> MEP
+        (5, 7),  # GMP -> Monocyte
+        (7, 11),  # Monocyte -> Macrophage
+        (5, 8),  # GMP -> Neutrophil
+        (5, 9),  # GMP -> Eosinophil
+        (5, 10),  # GMP -> Basophil
+
         # Lymphoid Lineage
-        {"source": 4, "target": 12}, # CLP -> Pro-B
-        {"source": 4, "target": 13}, # CLP -> Pro-T
-        {"source": 4, "target": 14}, # CLP -> NK precursor
-        
-        {"source": 12, "target": 15}, # Pro-B -> B cell
-        {"source": 13, "target": 16}, # Pro-T -> T cell
-        {"source": 14, "target": 17}, # NK p -> NK cell
-        
-        {"source": 16, "target": 18}, # T cell -> CD4+
-        {"source": 16, "target": 19}, # T cell -> CD8+
-    ]
+        (4, 12),  # CLP -> Pro-B
+        (4, 13),  # CLP -> Pro-T
+        (4, 14),  # CLP -> NK precursor
+
+        (12, 15),  # Pro-B -> B cell
+        (13, 16),  # Pro-T -> T cell
+        (14, 17),  # NK p -> NK cell
+
+        (16, 18),  # T cell -> CD4+
+        (16, 19),  # T cell -> CD8+
+    )
+
+    edges = [{"source": source, "target": target} for source, target in edge_spec]
 
     template = {
         "id": "hsa04640",
@@ -87,10 +110,17 @@ def create_hematopoietic_template():
     output_path = os.path.join("assets", "templates", "hsa04640.json") # Corrected path
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    with open(output_path, "w") as f:
-        json.dump(template, f, indent=2)
+    if orjson is not None:
+        with open(output_path, "wb") as f:
+            f.write(orjson.dumps(template, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, "w") as f:
+            json.dump(template, f, indent=2)
     
     print(f"Successfully generated {output_path}")
 
+    if write_columns:
+        save_columns(nodes, os.path.splitext(output_path)[0] + ".npz")
+
 if __name__ == "__main__":
-    create_hematopoietic_template()
+    create_hematopoietic_template(write_columns="--npz" in sys.argv[1:])
@@ -1,41 +1,64 @@
 import json
 import os
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def _build_nodes(node_spec):
+    """Expand (name, x, y, category, color) tuples into node dicts; ids start at 1."""
+    nodes = []
+    for i, (name, x, y, category, color) in enumerate(node_spec, start=1):
+        node = {"id": i, "name": name, "x": x, "y": y, "type": "gene", "category": category}
+        if color:
+            node["color"] = color
+        nodes.append(node)
+    return nodes
+
+
+def _build_edges(edge_spec):
+    """Expand (source, target, relation) tuples into edge dicts."""
+    return [
+        {"source": source, "target": target, "relation": relation}
+        for source, target, relation in edge_spec
+    ]
+
 
 def create_th1_th2_template():
     """Generates KEEG-like JSON for Th1 and Th2 cell differentiation (hsa04658)."""
     
-    # Naive CD4+ T cell as root
-    naive = {"id": 1, "name": "Naive CD4+ T cell", "x": 400, "y": 50, "type": "gene", "category": "Cell"}
-    
-    # Th1 Branch
-    il12 = {"id": 2, "name": "IL-12", "x": 200, "y": 150, "type": "gene", "category": "Cytokine", "color": "#3498db"}
-    ifng = {"id": 3, "name": "IFN-γ", "x": 200, "y": 250, "type": "gene", "category": "Cytokine", "color": "#3498db"}
-    tbet = {"id": 4, "name": "T-bet", "x": 200, "y": 350, "type": "gene", "category": "Transcription Factor"}
-    th1 = {"id": 5, "name": "Th1 cell", "x": 200, "y": 450, "type": "gene", "category": "Cell"}
-    
-    # Th2 Branch
-    il4 = {"id": 6, "name": "IL-4", "x": 600, "y": 150, "type": "gene", "category": "Cytokine", "color": "#e74c3c"}
-    il2 = {"id": 7, "name": "IL-2", "x": 600, "y": 250, "type": "gene", "category": "Cytokine", "color": "#e74c3c"}
-    gata3 = {"id": 8, "name": "GATA3", "x": 600, "y": 350, "type": "gene", "category": "Transcription Factor"}
-    th2 = {"id": 9, "name": "Th2 cell", "x": 600, "y": 450, "type": "gene", "category": "Cell"}
-
-    nodes = [naive, il12, ifng, tbet, th1, il4, il2, gata3, th2]
+    nodes = _build_nodes((
+        # Naive CD4+ T cell as root
+        ("Naive CD4+ T cell", 400, 50, "Cell", None),  # 1
+        # Th1 Branch
+        ("IL-12", 200, 150, "Cytokine", "#3498db"),  # 2
+        ("IFN-γ", 200, 250, "Cytokine", "#3498db"),  # 3
+        ("T-bet", 200, 350, "Transcription Factor", None),  # 4
+        ("Th1 cell", 200, 450, "Cell", None),  # 5
+        # Th2 Branch
+        ("IL-4", 600, 150, "Cytokine", "#e74c3c"),  # 6
+        ("IL-2", 600, 250, "Cytokine", "#e74c3c"),  # 7
+        ("GATA3", 600, 350, "Transcription Factor", None),  # 8
+        ("Th2 cell", 600, 450, "Cell", None),  # 9
+    ))
 
-    edges = [
+    edges = _build_edges((
         # Th1 Path
-        {"source": 1, "target": 5, "relation": "differentiation"},
-        {"source": 2, "target": 4, "relation": "activation"}, # IL-12 -> T-bet
-        {"source": 4, "target": 5, "relation": "regulation"},
-        
+        (1, 5, "differentiation"),
+        (2, 4, "activation"),  # IL-12 -> T-bet
+        (4, 5, "regulation"),
+
         # Th2 Path
-        {"source": 1, "target": 9, "relation": "differentiation"},
-        {"source": 6, "target": 8, "relation": "activation"}, # IL-4 -> GATA3
-        {"source": 8, "target": 9, "relation": "regulation"},
-        
+        (1, 9, "differentiation"),
+        (6, 8, "activation"),  # IL-4 -> GATA3
+        (8, 9, "regulation"),
+
         # Cross-regulation (Inhibition)
-        {"source": 3, "target": 9, "relation": "inhibition"}, # IFN-g inhibits Th2
-        {"source": 6, "target": 5, "relation": "inhibition"}, # IL-4 inhibits Th1
-    ]
+        (3, 9, "inhibition"),  # IFN-g inhibits Th2
+        (6, 5, "inhibition"),  # IL-4 inhibits Th1
+    ))
 
     template = {
         "id": "hsa04658",
@@ -50,39 +73,35 @@ def create_th1_th2_template():
 def create_th17_template():
     """Generates KEGG-like JSON for Th17 cell differentiation (hsa04659)."""
     
-    naive = {"id": 1, "name": "Naive CD4+ T cell", "x": 400, "y": 50, "type": "gene", "category": "Cell"}
-    
-    # Th17 Path
-    il6 = {"id": 2, "name": "IL-6", "x": 300, "y": 150, "type": "gene", "category": "Cytokine", "color": "#e67e22"}
-    tgfb = {"id": 3, "name": "TGF-β", "x": 500, "y": 150, "type": "gene", "category": "Cytokine", "color": "#e67e22"}
-    
-    stat3 = {"id": 4, "name": "STAT3", "x": 300, "y": 250, "type": "gene", "category": "Transcription Factor"}
-    rorc = {"id": 5, "name": "RORγt", "x": 500, "y": 250, "type": "gene", "category": "Transcription Factor"}
-    
-    th17 = {"id": 6, "name": "Th17 cell", "x": 400, "y": 350, "type": "gene", "category": "Cell"}
-    
-    # Treg Path (Closely related)
-    foxp3 = {"id": 7, "name": "Foxp3", "x": 700, "y": 250, "type": "gene", "category": "Transcription Factor"}
-    treg = {"id": 8, "name": "Treg cell", "x": 700, "y": 350, "type": "gene", "category": "Cell"}
+    nodes = _build_nodes((
+        ("Naive CD4+ T cell", 400, 50, "Cell", None),  # 1
+        # Th17 Path
+        ("IL-6", 300, 150, "Cytokine", "#e67e22"),  # 2
+        ("TGF-β", 500, 150, "Cytokine", "#e67e22"),  # 3
+        ("STAT3", 300, 250, "Transcription Factor", None),  # 4
+        ("RORγt", 500, 250, "Transcription Factor", None),  # 5
+        ("Th17 cell", 400, 350, "Cell", None),  # 6
+        # Treg Path (Closely related)
+        ("Foxp3", 700, 250, "Transcription Factor", None),  # 7
+        ("Treg cell", 700, 350, "Cell", None),  # 8
+    ))
+
+    edges = _build_edges((
+        (1, 6, "differentiation"),
+        (1, 8, "differentiation"),
+
+        (2, 4, "activation"),  # IL-6 -> STAT3
+        (3, 7, "activation"),  # TGF-b -> Foxp3 (Treg)
+
+        (4, 5, "activation"),  # STAT3 -> RORgt
+        (5, 6, "regulation"),  # RORgt -> Th17
+
+        (7, 8, "regulation"),  # Foxp3 -> Treg
 
-    nodes = [naive, il6, tgfb, stat3, rorc, th17, foxp3, treg]
-    
-    edges = [
-        {"source": 1, "target": 6, "relation": "differentiation"},
-        {"source": 1, "target": 8, "relation": "differentiation"},
-        
-        {"source": 2, "target": 4, "relation": "activation"}, # IL-6 -> STAT3
-        {"source": 3, "target": 7, "relation": "activation"}, # TGF-b -> Foxp3 (Treg)
-        
-        {"source": 4, "target": 5, "relation": "activation"}, # STAT3 -> RORgt
-        {"source": 5, "target": 6, "relation": "regulation"}, # RORgt -> Th17
-        
-        {"source": 7, "target": 8, "relation": "regulation"}, # Foxp3 -> Treg
-        
         # Th17 vs Treg balance
-        {"source": 7, "target": 5, "relation": "inhibition"}, # Foxp3 inhibits RORgt
-    ]
-    
+        (7, 5, "inhibition"),  # Foxp3 inhibits RORgt
+    ))
+
     template = {
         "id": "hsa04659",
         "title": "Th17 cell differentiation",
@@ -93,16 +112,26 @@ def create_th17_template():
     
     return template
 
-def save_template(template, filename):
+def save_template(template, filename, write_columns=False):
     output_path = os.path.join("assets", "templates", filename)
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, "w") as f:
-        json.dump(template, f, indent=2)
+    if orjson is not None:
+        with open(output_path, "wb") as f:
+            f.write(orjson.dumps(template, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_path, "w") as f:
+            json.dump(template, f, indent=2)
     print(f"Generated {output_path}")
 
+    if write_columns:
+        from add_cell_template import save_columns
+        save_columns(template["nodes"], os.path.splitext(output_path)[0] + ".npz")
+
 if __name__ == "__main__":
+    write_columns = "--npz" in sys.argv[1:]
+
     t1 = create_th1_th2_template()
-    save_template(t1, "hsa04658.json")
+    save_template(t1, "hsa04658.json", write_columns)
     
     t2 = create_th17_template()
-    save_template(t2, "hsa04659.json")
+    save_template(t2, "hsa04659.json", write_columns)
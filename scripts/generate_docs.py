@@ -1,6 +1,9 @@
 import markdown
 import os
 
+# Shared converter; reset() between documents clears per-document state
+_MARKDOWN = markdown.Markdown(extensions=['fenced_code', 'tables'])
+
 def generate_html_docs():
     # Configuration
     input_files = [
@@ -183,8 +186,17 @@ def generate_html_docs():
     </div>
     """
 
+    # Diagrams injected right after a heading, applied per converted file
+    # (the markers only ever occur within a single document)
+    diagram_anchors = (
+        # Workflow diagram goes after "Step 4" in the Manual
+        ("Step 4: 可视化 (Visualize)</h3>", workflow_diagram),
+        # Tech Stack diagram goes in "Product Intro", near Installation
+        ("核心价值</h3>", tech_stack_diagram),
+    )
+
     # Combine Content
-    full_content = ""
+    content_parts = []
     toc_links = []
     
     # Process Manual
@@ -195,22 +207,18 @@ def generate_html_docs():
             
         with open(filepath, "r", encoding="utf-8") as f:
             text = f.read()
-            html_fragment = markdown.markdown(text, extensions=['fenced_code', 'tables'])
-            
-            # Simple header extraction for TOC (Mock logic for now, just main sections)
-            base_name = os.path.basename(filepath).replace(".md", "").replace("_", " ")
-            toc_links.append(f"<li><a href='#{base_name}'>{base_name}</a></li>")
-            
-            full_content += f"<div id='{base_name}'>{html_fragment}</div><hr>"
+        html_fragment = _MARKDOWN.reset().convert(text)
+        for anchor, diagram in diagram_anchors:
+            if anchor in html_fragment:
+                html_fragment = html_fragment.replace(anchor, anchor + diagram)
+        
+        # Simple header extraction for TOC (Mock logic for now, just main sections)
+        base_name = os.path.basename(filepath).replace(".md", "").replace("_", " ")
+        toc_links.append(f"<li><a href='#{base_name}'>{base_name}</a></li>")
+        
+        content_parts.append(f"<div id='{base_name}'>{html_fragment}</div><hr>")
 
-    # Inject Diagrams into appropriate places (simple replacement for now)
-    # We'll put the Workflow diagram after "Step 4" in Manual
-    if "Step 4: 可视化" in full_content:
-         full_content = full_content.replace("Step 4: 可视化 (Visualize)</h3>", "Step 4: 可视化 (Visualize)</h3>" + workflow_diagram)
-    
-    # Put Tech Stack diagram in "Product Intro" or near Installation
-    if "核心价值" in full_content:
-        full_content = full_content.replace("核心价值</h3>", "核心价值</h3>" + tech_stack_diagram)
+    full_content = "".join(content_parts)
 
     # HTML Shell
     html_template = f"""
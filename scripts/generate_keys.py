@@ -3,6 +3,12 @@ from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 
 def generate_keys():
+    # Reuse an existing key pair: regenerating is slow and would invalidate
+    # every license already signed with it. Set FORCE_REGEN=1 to replace it.
+    if os.path.exists("private_key.pem") and not os.environ.get("FORCE_REGEN"):
+        print("ℹ️ private_key.pem already exists; skipping (set FORCE_REGEN=1 to regenerate)")
+        return
+
     # Generate private key
     private_key = rsa.generate_private_key(
         public_exponent=65537,
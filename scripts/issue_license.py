@@ -1,61 +1,187 @@
+"""
+Issue signed BioViz Pro licenses.
+
+License string format, parsed by python/license_validator.py and
+src/utils/licenseManager.ts (both must change together with it):
+
+    base64( {"data": {...license fields...}, "signature": base64(rsa_signature)} )
+
+The signature covers json.dumps(data, sort_keys=True) as UTF-8. The frontend
+decodes with atob() + JSON.parse(), so the envelope must stay ASCII JSON.
+"""
 import json
-import base64
 import datetime
+import hashlib
+import os
+import sys
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed
 from cryptography.hazmat.primitives import serialization
 
-def issue_license():
-    try:
-        with open("private_key.pem", "rb") as f:
+try:
+    from pybase64 import b64encode  # SIMD base64, same API as the stdlib
+except ImportError:  # optional speedup
+    from base64 import b64encode
+
+# Licenses are RSA PKCS#1 v1.5 / SHA-256 signatures: the embedded public key
+# and both verifiers (python/license_validator.py, src/utils/licenseManager.ts
+# via jsrsasign SHA256withRSA) depend on it. The parameter objects are
+# stateless, so one instance serves every signature.
+_PKCS1V15 = padding.PKCS1v15()
+_SHA256 = hashes.SHA256()
+# Payloads are hashed with hashlib and signed as digests; the signature is the
+# same as signing the message with _SHA256
+_PREHASHED_SHA256 = Prehashed(_SHA256)
+
+# Fixed scaffold of the envelope, json.dumps({"data": ..., "signature": ...}).
+# The canonical data string is ASCII (ensure_ascii) and base64 needs no
+# escaping, so the envelope is assembled from bytes without a second dump.
+_ENVELOPE_PREFIX = b'{"data": '
+_ENVELOPE_MID = b', "signature": "'
+_ENVELOPE_SUFFIX = b'"}'
+
+# Parsed private keys by (path, mtime); PEM/ASN.1 parsing costs far more than
+# a signature's surrounding bookkeeping, so repeat calls reuse the key object
+_KEY_CACHE = {}
+
+def _get_private_key(path="private_key.pem"):
+    cache_key = (os.path.abspath(path), os.stat(path).st_mtime)
+    private_key = _KEY_CACHE.get(cache_key)
+    if private_key is None:
+        # No backend argument: cryptography has one process-wide OpenSSL
+        # backend and ignores the parameter (kept only for compatibility)
+        with open(path, "rb") as f:
             private_key = serialization.load_pem_private_key(
                 f.read(),
                 password=None
             )
-    except FileNotFoundError:
-        print("❌ Error: private_key.pem not found. Run generate_keys.py first.")
-        return
+        _KEY_CACHE[cache_key] = private_key
+    return private_key
 
-    print("--- 📝 Issue New License ---")
-    name = input("User Name: ")
-    email = input("Email: ")
-    machine_id = input("Machine ID (Optional, press Enter to skip): ")
-    days = input("Validity (days, default 365): ") or "365"
-    
-    expiry_date = (datetime.datetime.now() + datetime.timedelta(days=int(days))).isoformat()
+def _sign_one_bytes(private_key, record, now=None):
+    """
+    Build and sign one license; returns the license string as ASCII bytes.
+    record: {"name", "email", "machineId" (optional), "days" (optional, default 365)}
+    """
+    # One clock read for both stamps, so issued + days == expiry exactly
+    if now is None:
+        now = datetime.datetime.now()
+    issued_date = now.isoformat()
+    expiry_date = (now + datetime.timedelta(days=int(record.get("days") or 365))).isoformat()
 
+    # Keys are listed in sorted order, so plain json.dumps already yields the
+    # canonical json.dumps(sort_keys=True) form the verifiers rebuild. Keep
+    # them sorted when adding fields, and keep the default separators.
     license_data = {
-        "name": name,
-        "email": email,
-        "machineId": machine_id if machine_id else None,
+        "email": record["email"],
         "expiry": expiry_date,
-        "issued": datetime.datetime.now().isoformat(),
+        "issued": issued_date,
+        "machineId": record.get("machineId") or None,
+        "name": record["name"],
         "type": "PRO"
     }
 
     # Canonical JSON string
-    data_str = json.dumps(license_data, sort_keys=True)
+    data_bytes = json.dumps(license_data).encode('utf-8')
     
     # Sign data
-    signature = private_key.sign(
-        data_str.encode('utf-8'),
-        padding.PKCS1v15(),
-        hashes.SHA256()
-    )
+    digest = hashlib.sha256(data_bytes).digest()
+    signature = private_key.sign(digest, _PKCS1V15, _PREHASHED_SHA256)
 
     # Combine data and signature
-    final_license = {
-        "data": license_data,
-        "signature": base64.b64encode(signature).decode('utf-8')
-    }
+    envelope = b"".join((
+        _ENVELOPE_PREFIX, data_bytes, _ENVELOPE_MID, b64encode(signature), _ENVELOPE_SUFFIX
+    ))
 
     # Encode entire object to base64 for easy copy-pasting
-    license_string = base64.b64encode(json.dumps(final_license).encode('utf-8')).decode('utf-8')
+    return b64encode(envelope)
+
+def _sign_one(private_key, record, now=None):
+    """Build and sign one license; returns the copy-pasteable license string."""
+    return _sign_one_bytes(private_key, record, now).decode('ascii')
+
+def issue_licenses(records, key_path="private_key.pem"):
+    """Issue one license per record with a single key load and clock read."""
+    private_key = _get_private_key(key_path)
+    now = datetime.datetime.now()
+    return [_sign_one(private_key, record, now) for record in records]
+
+def issue_license():
+    try:
+        private_key = _get_private_key()
+    except FileNotFoundError:
+        print("❌ Error: private_key.pem not found. Run generate_keys.py first.")
+        return
+
+    print("--- 📝 Issue New License ---")
+    name = input("User Name: ")
+    email = input("Email: ")
+    machine_id = input("Machine ID (Optional, press Enter to skip): ")
+    days = input("Validity (days, default 365): ") or "365"
+
+    license_string = _sign_one(
+        private_key,
+        {"name": name, "email": email, "machineId": machine_id, "days": days},
+    )
 
     print("\n✅ License Generated!")
     print("-" * 60)
     print(license_string)
     print("-" * 60)
 
+def _parse_record(line):
+    """Parse one stdin line into a license record; raises ValueError if unusable."""
+    try:
+        record = json.loads(line)
+    except json.JSONDecodeError:
+        raise ValueError("not a JSON object (expected one record per line, e.g. "
+                         '{"name": ..., "email": ...})') from None
+    if not isinstance(record, dict):
+        raise ValueError("not a JSON object")
+    for field in ("name", "email"):
+        if not isinstance(record.get(field), str) or not record[field].strip():
+            raise ValueError(f"missing or empty '{field}'")
+    try:
+        days = int(record.get("days") or 365)
+        # Also rejects spans datetime cannot represent
+        datetime.datetime.now() + datetime.timedelta(days=days)
+    except (TypeError, ValueError, OverflowError):
+        days = None
+    if days is None or days <= 0:
+        raise ValueError(f"invalid 'days': {record['days']!r}")
+    return record
+
+def issue_licenses_from_stdin():
+    """
+    Non-interactive mode: one JSON record per stdin line (same keys as
+    issue_licenses), one license string per stdout line. Every record is
+    validated before anything is signed, so bad input produces no output.
+    """
+    records = []
+    for lineno, line in enumerate(sys.stdin, 1):
+        if not line.strip():
+            continue
+        try:
+            records.append(_parse_record(line))
+        except ValueError as e:
+            print(f"❌ Error: stdin line {lineno}: {e}", file=sys.stderr)
+            sys.exit(1)
+    try:
+        private_key = _get_private_key()
+    except FileNotFoundError:
+        print("❌ Error: private_key.pem not found. Run generate_keys.py first.", file=sys.stderr)
+        sys.exit(1)
+    now = datetime.datetime.now()
+    # The licenses are already ASCII bytes; skip the text layer's re-encode
+    out = sys.stdout.buffer
+    for record in records:
+        out.write(_sign_one_bytes(private_key, record, now))
+        out.write(b"\n")
+    out.flush()
+
 if __name__ == "__main__":
-    issue_license()
+    if sys.stdin.isatty():
+        issue_license()
+    else:
+        issue_licenses_from_stdin()
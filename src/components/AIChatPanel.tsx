@@ -222,7 +222,7 @@ export const AIChatPanel: React.FC<AIChatPanelProps> = ({
                                 result.forEach((p: any) => {
                                     responseContent += `\n• ${p.id}: ${p.name}`;
                                 });
-                            } else if (lastResponse.tool_name === 'render_pathway' && result.pathway) {
+                            } else if ((lastResponse.tool_name === 'render_pathway' || lastResponse.tool_name === 'render_and_analyze') && result.pathway) {
                                 const pathway = result.pathway;
                                 const stats = result.statistics || {};
                                 responseContent += `\n\n**${t('Pathway')}**: ${pathway.title || pathway.id}`;
@@ -0,0 +1,163 @@
+"""
+Unit tests for chat completion streaming in ai_core.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "python"))
+
+import ai_core  # noqa: E402  (must load before ai_tools)
+from openai import OpenAI  # noqa: E402
+
+
+def _chunk(delta, index=0):
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "test-model",
+        "choices": [{"index": index, "delta": delta, "finish_reason": None}],
+    }
+
+
+def _sse_body(chunks):
+    lines = [f"data: {json.dumps(c)}\n\n" for c in chunks]
+    lines.append("data: [DONE]\n\n")
+    return "".join(lines).encode()
+
+
+def _json_body(content=None, tool_calls=None):
+    message = {"role": "assistant", "content": content}
+    if tool_calls:
+        message["tool_calls"] = tool_calls
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "test-model",
+        "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+    }
+
+
+def _client(handler):
+    return OpenAI(
+        api_key="sk-test",
+        base_url="http://test.invalid/v1",
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+    )
+
+
+class TestCollectStream:
+    """Test accumulation of streamed deltas."""
+
+    def test_sse_text_and_tool_call_deltas(self):
+        """Content parts and split tool-call arguments are joined per index."""
+        chunks = [
+            _chunk({"role": "assistant", "content": "Hel"}),
+            _chunk({"content": "lo"}),
+            _chunk({"tool_calls": [{"index": 0, "id": "call_1", "type": "function",
+                                    "function": {"name": "render_pathway", "arguments": '{"pathway'}}]}),
+            _chunk({"tool_calls": [{"index": 0, "function": {"arguments": '_id": "hsa04110"}'}}]}),
+        ]
+        requests = []
+
+        def handler(request):
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                  content=_sse_body(chunks))
+
+        updates = []
+        message = ai_core._complete_message(
+            _client(handler), lambda *a: updates.append(a),
+            model="test-model", messages=[{"role": "user", "content": "hi"}],
+        )
+
+        assert len(requests) == 1
+        assert requests[0]["stream"] is True
+        assert message.content == "Hello"
+        assert len(message.tool_calls) == 1
+        assert message.tool_calls[0].id == "call_1"
+        assert message.tool_calls[0].function.name == "render_pathway"
+        assert json.loads(message.tool_calls[0].function.arguments) == {"pathway_id": "hsa04110"}
+        assert updates == [("AI_PROCESS_UPDATE", {"stepIndex": 1, "status": "streaming"})]
+
+    def test_empty_stream_returns_none(self):
+        """A stream with no chunks is reported as None, not an empty message."""
+        assert ai_core._collect_stream(iter(())) is None
+
+
+class TestNonStreamingBackend:
+    """Test backends that ignore stream=True."""
+
+    def test_plain_json_body_is_used_directly(self):
+        """A JSON answer to a streamed request is parsed without a second request."""
+        requests = []
+
+        def handler(request):
+            payload = json.loads(request.content)
+            requests.append(payload)
+            return httpx.Response(200, json=_json_body(content="Plain answer"))
+
+        message = ai_core._complete_message(
+            _client(handler), model="test-model",
+            messages=[{"role": "user", "content": "hi"}],
+        )
+
+        assert [r["stream"] for r in requests] == [True]
+        assert message.content == "Plain answer"
+
+    def test_plain_json_tool_call(self):
+        """Tool calls in a plain JSON body come through like streamed ones."""
+        calls = []
+
+        def handler(request):
+            calls.append(json.loads(request.content)["stream"])
+            return httpx.Response(200, json=_json_body(tool_calls=[{
+                "id": "call_1", "type": "function",
+                "function": {"name": "render_pathway", "arguments": '{"pathway_id": "hsa04110"}'},
+            }]))
+
+        message = ai_core._complete_message(
+            _client(handler), model="test-model",
+            messages=[{"role": "user", "content": "hi"}],
+        )
+
+        assert calls == [True]
+        assert message.tool_calls[0].function.name == "render_pathway"
+        assert json.loads(message.tool_calls[0].function.arguments) == {"pathway_id": "hsa04110"}
+
+    def test_sse_without_chunks_retries_without_stream(self):
+        """Only an event stream that carries no chunks is re-sent without stream."""
+        calls = []
+
+        def handler(request):
+            payload = json.loads(request.content)
+            calls.append(payload["stream"])
+            if payload["stream"]:
+                return httpx.Response(200, headers={"content-type": "text/event-stream"},
+                                      content=b"data: [DONE]\n\n")
+            return httpx.Response(200, json=_json_body(content="Recovered"))
+
+        message = ai_core._complete_message(
+            _client(handler), model="test-model",
+            messages=[{"role": "user", "content": "hi"}],
+        )
+
+        assert calls == [True, False]
+        assert message.content == "Recovered"
+
+    def test_process_query_uses_plain_json_answer(self, monkeypatch):
+        """process_query returns the backend's text instead of the fallback reply."""
+        def handler(request):
+            return httpx.Response(200, json=_json_body(content="Real answer"))
+
+        monkeypatch.setattr(ai_core, "get_current_client", lambda: _client(handler))
+
+        action = ai_core.process_query("hello")
+
+        assert action.content == "Real answer"
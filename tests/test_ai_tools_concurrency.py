@@ -0,0 +1,85 @@
+"""
+Unit tests for concurrent structured prompts in ai_tools.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "python"))
+
+import ai_core  # noqa: E402,F401  (must load before ai_tools)
+import ai_tools  # noqa: E402
+
+
+class _EchoClient:
+    """Chat client stub that answers with the prompt text and counts calls."""
+
+    base_url = "http://test.invalid/v1"
+
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, *, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+        return SimpleNamespace(choices=[
+            SimpleNamespace(message=SimpleNamespace(content=f"echo:{messages[-1]['content']}"))
+        ])
+
+
+class _SlowCache(OrderedDict):
+    """Completion cache that yields after each lookup, widening race windows."""
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        time.sleep(0.0002)
+        return value
+
+
+@pytest.fixture
+def client(monkeypatch):
+    echo = _EchoClient()
+    monkeypatch.setattr(ai_tools, "_get_llm_client_and_model", lambda: (echo, "test-model"))
+    monkeypatch.setattr(ai_tools, "_COMPLETION_CACHE_MAX", 3)
+    monkeypatch.setattr(ai_tools, "_completion_cache", _SlowCache())
+    return echo
+
+
+class TestInvokeMany:
+    """Test invoke_many over the shared completion cache."""
+
+    def test_concurrent_hits_and_misses(self, client):
+        """Every call gets its own answer while a tiny cache is hit and evicted concurrently."""
+        prompts = [f"prompt {i % 6}" for i in range(240)]
+        calls = [lambda p=p: ai_tools._invoke_structured_prompt(p) for p in prompts]
+
+        for _ in range(5):
+            results = ai_tools.invoke_many(calls)
+
+            assert [r[2] for r in results] == [None] * len(prompts)
+            assert [r[0] for r in results] == [f"echo:{p}" for p in prompts]
+            assert len(ai_tools._completion_cache) <= 3
+        # Some calls were served from the cache
+        assert client.calls < 5 * len(prompts)
+
+    def test_results_keep_order(self, client):
+        results = ai_tools.invoke_many([lambda i=i: i * i for i in range(20)])
+
+        assert results == [i * i for i in range(20)]
+
+    def test_uncached_prompts_skip_cache(self, client):
+        ai_tools.invoke_many([
+            lambda: ai_tools._invoke_structured_prompt("explore", use_cache=False)
+            for _ in range(4)
+        ])
+
+        assert client.calls == 4
+        assert len(ai_tools._completion_cache) == 0
@@ -0,0 +1,120 @@
+"""
+Unit tests for narrative.deduplication module.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from python.narrative import deduplication
+from python.narrative.deduplication import SemanticAggregator
+
+
+def _edges(graph):
+    """Undirected edge set (i < j) of a sparse adjacency matrix."""
+    coo = sp.triu(graph + graph.T, k=1).tocoo()
+    return set(zip(coo.row.tolist(), coo.col.tolist()))
+
+
+class TestJaccard:
+    """Test the sparse Jaccard matrix."""
+
+    def test_matches_pairwise_sets(self):
+        sets = [frozenset("ABC"), frozenset("BCD"), frozenset("XY"), frozenset()]
+        agg = SemanticAggregator()
+
+        matrix = agg.jaccard_matrix(sets)
+
+        for i, a in enumerate(sets):
+            for j, b in enumerate(sets):
+                assert matrix[i, j] == pytest.approx(agg.calculate_jaccard(set(a), set(b)))
+
+
+class TestConnectedModules:
+    """Test module clustering in deduplicate."""
+
+    def test_transitive_links_form_one_module(self):
+        """A~B and B~C put A, B and C in one module even though A !~ C."""
+        df = pd.DataFrame({
+            "Term": ["A", "B", "C", "D"],
+            "Genes": ["G1;G2;G3;G4", "G3;G4;G5;G6", "G5;G6;G7;G8", "X1,X2"],
+            "Adjusted P-value": [0.01, 0.02, 0.03, 0.001],
+        })
+
+        modules = SemanticAggregator(similarity_threshold=0.3).deduplicate(df)
+
+        assert [m["representative"] for m in modules] == ["D", "A"]
+        assert modules[0]["members"] == ["D"]
+        assert modules[1]["members"] == ["A", "B", "C"]
+        assert modules[1]["size"] == 3
+        assert modules[1]["p_value"] == 0.01
+        assert sorted(modules[1]["genes"]) == ["G1", "G2", "G3", "G4"]
+
+    def test_gene_list_formats(self):
+        """Delimited strings, lists and missing values all parse to gene sets."""
+        df = pd.DataFrame({
+            "term": ["A", "B", "C"],
+            "genes": ["TP53, MDM2", ["TP53", " MDM2 "], None],
+            "p_value": [0.02, 0.01, 0.03],
+        })
+
+        modules = SemanticAggregator(similarity_threshold=0.9).deduplicate(df)
+
+        assert [m["members"] for m in modules] == [["B", "A"], ["C"]]
+        assert modules[1]["genes"] == []
+
+    def test_empty_frame(self):
+        assert SemanticAggregator().deduplicate(pd.DataFrame()) == []
+
+
+class TestMinHashGraph:
+    """Test the MinHash/LSH path used for large inputs."""
+
+    @staticmethod
+    def _gene_sets(n_families=120, per_family=20, seed=7):
+        # Families of near-duplicate terms (Jaccard >= 0.8 to their core)
+        # and no shared genes across families
+        rng = np.random.default_rng(seed)
+        sets = []
+        for f in range(n_families):
+            core = [f"F{f}_G{k}" for k in range(30)]
+            for _ in range(per_family):
+                drop = rng.choice(30, size=rng.integers(0, 3), replace=False)
+                sets.append(frozenset(g for k, g in enumerate(core) if k not in drop))
+        sets.append(frozenset())
+        return sets
+
+    def test_matches_exact_graph(self):
+        sets = self._gene_sets()
+        assert len(sets) >= deduplication.MINHASH_MIN_TERMS
+        agg = SemanticAggregator(similarity_threshold=0.4)
+
+        approx = agg.similarity_graph(sets)
+        exact = sp.csr_matrix(agg.jaccard_matrix(sets) >= agg.threshold)
+
+        assert _edges(approx) == _edges(exact)
+
+    def test_near_threshold_pairs(self):
+        """Pairs just below the threshold are dropped and those above it are kept."""
+        rng = np.random.default_rng(11)
+        sets = []
+        for f in range(100):
+            core = [f"F{f}_G{k}" for k in range(30)]
+            for _ in range(21):
+                drop = rng.choice(30, size=rng.integers(0, 14), replace=False)
+                sets.append(frozenset(g for k, g in enumerate(core) if k not in drop))
+        agg = SemanticAggregator(similarity_threshold=0.6)
+        matrix = agg.jaccard_matrix(sets)
+        assert ((matrix > 0.5) & (matrix < 0.6)).any()
+
+        approx = agg.similarity_graph(sets)
+
+        assert _edges(approx) == _edges(sp.csr_matrix(matrix >= 0.6))
+
+    def test_band_rows_keep_threshold_recall(self):
+        """Bands keep >= 99% recall at the threshold, never dropping below two rows."""
+        for threshold in (0.4, 0.6, 0.8):
+            rows = SemanticAggregator(similarity_threshold=threshold)._band_rows()
+            bands = deduplication._MINHASH_PERMUTATIONS // rows
+            assert 1.0 - (1.0 - threshold ** rows) ** bands >= 0.99
+        assert SemanticAggregator(similarity_threshold=0.1)._band_rows() == 2
@@ -0,0 +1,82 @@
+"""
+Unit tests for the non-interactive mode of scripts/issue_license.py.
+"""
+
+import base64
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "issue_license.py"
+
+
+@pytest.fixture
+def key_dir(tmp_path):
+    """Directory holding a throwaway private_key.pem."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    (tmp_path / "private_key.pem").write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    return tmp_path
+
+
+def _run(cwd, stdin):
+    return subprocess.run(
+        [sys.executable, str(SCRIPT)], input=stdin.encode(), cwd=cwd,
+        capture_output=True,
+    )
+
+
+class TestStdinIssuing:
+    """Test piped JSON records."""
+
+    def test_one_license_per_record(self, key_dir):
+        """Each record yields one base64 license line with the record's fields."""
+        stdin = (
+            '{"name": "Alice", "email": "alice@example.org", "days": "30"}\n'
+            "\n"
+            '{"name": "Bob", "email": "bob@example.org", "machineId": "M-1"}\n'
+        )
+        result = _run(key_dir, stdin)
+
+        assert result.returncode == 0, result.stderr
+        lines = result.stdout.decode("ascii").splitlines()
+        assert len(lines) == 2
+        envelopes = [json.loads(base64.b64decode(line)) for line in lines]
+        assert envelopes[0]["data"]["name"] == "Alice"
+        assert envelopes[0]["data"]["machineId"] is None
+        assert envelopes[1]["data"]["machineId"] == "M-1"
+        assert all(e["signature"] for e in envelopes)
+
+    @pytest.mark.parametrize("stdin, reason", [
+        ("Alice\nalice@example.org\n\n365\n", "line 1: not a JSON object"),
+        ('["Alice"]\n', "line 1: not a JSON object"),
+        ('{"name": "Alice", "email": "a@example.org"}\n{"name": "Bob"}\n', "line 2: missing or empty 'email'"),
+        ('{"name": "", "email": "a@example.org"}\n', "line 1: missing or empty 'name'"),
+        ('{"name": "Alice", "email": "a@example.org", "days": "soon"}\n', "line 1: invalid 'days'"),
+        ('{"name": "Alice", "email": "a@example.org", "days": -5}\n', "line 1: invalid 'days'"),
+    ])
+    def test_bad_input_writes_nothing(self, key_dir, stdin, reason):
+        """Invalid records exit 1 with a one-line error and no partial output."""
+        result = _run(key_dir, stdin)
+
+        assert result.returncode == 1
+        assert result.stdout == b""
+        stderr = result.stderr.decode("utf-8").strip()
+        assert "\n" not in stderr
+        assert reason in stderr
+
+    def test_missing_key(self, tmp_path):
+        """Without private_key.pem the script fails the same way."""
+        result = _run(tmp_path, '{"name": "Alice", "email": "a@example.org"}\n')
+
+        assert result.returncode == 1
+        assert result.stdout == b""
+        assert "private_key.pem not found" in result.stderr.decode("utf-8")
@@ -0,0 +1,121 @@
+"""
+Unit tests for license_validator module.
+"""
+
+import base64
+import datetime
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+import python.license_validator as license_validator
+from python.license_validator import LicenseValidator
+
+_spec = importlib.util.spec_from_file_location(
+    "issue_license", Path(__file__).resolve().parents[1] / "scripts" / "issue_license.py"
+)
+issue_license = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(issue_license)
+
+_PRIVATE_KEY = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+class _CountingKey:
+    """Public key wrapper that counts RSA verifications."""
+
+    def __init__(self, key):
+        self._key = key
+        self.verifications = 0
+
+    def verify(self, *args):
+        self.verifications += 1
+        return self._key.verify(*args)
+
+
+@pytest.fixture
+def public_key(monkeypatch):
+    key = _CountingKey(_PRIVATE_KEY.public_key())
+    monkeypatch.setattr(license_validator, "_load_public_key", lambda: key)
+    license_validator._verify_envelope.cache_clear()
+    yield key
+    license_validator._verify_envelope.cache_clear()
+
+
+def _license(now=None, **record):
+    record = {"name": "Alice", "email": "alice@example.org", **record}
+    return issue_license._sign_one(_PRIVATE_KEY, record, now)
+
+
+def _reencode(license_key, **envelope_overrides):
+    envelope = json.loads(base64.b64decode(license_key))
+    envelope.update(envelope_overrides)
+    return base64.b64encode(json.dumps(envelope, indent=2).encode()).decode()
+
+
+class TestValidation:
+    """Test validate() results."""
+
+    def test_issued_license_is_valid(self, public_key):
+        result = LicenseValidator().validate(_license(machineId="M-1"), machine_id="M-1")
+
+        assert result["valid"] is True
+        assert result["data"]["email"] == "alice@example.org"
+
+    def test_tampered_data_is_rejected(self, public_key):
+        envelope = json.loads(base64.b64decode(_license()))
+        envelope["data"]["type"] = "ENTERPRISE"
+        tampered = base64.b64encode(json.dumps(envelope).encode()).decode()
+
+        assert LicenseValidator().validate(tampered) == {"valid": False, "error": "Invalid Signature"}
+
+    def test_garbage_is_rejected(self, public_key):
+        result = LicenseValidator().validate("not a license")
+
+        assert result == {"valid": False, "error": "Invalid License Format (Base64/JSON)"}
+        assert public_key.verifications == 0
+
+
+class TestVerificationCache:
+    """Test the per-key-string verification cache."""
+
+    def test_repeat_validation_skips_rsa(self, public_key):
+        validator = LicenseValidator()
+        key = _license()
+
+        for _ in range(5):
+            assert validator.validate(key)["valid"] is True
+
+        assert public_key.verifications == 1
+
+    def test_forged_signature_does_not_poison_cache(self, public_key):
+        """Failed checks are per key string; the genuine license still verifies."""
+        validator = LicenseValidator()
+        key = _license()
+        good = json.loads(base64.b64decode(key))["signature"]
+        forged = base64.b64encode(b"\0" * 256).decode()
+
+        assert validator.validate(_reencode(key, signature=forged))["valid"] is False
+        assert validator.validate(_reencode(key, signature=forged, extra=1))["valid"] is False
+        assert public_key.verifications == 2
+        assert validator.validate(_reencode(key, signature=good))["valid"] is True
+
+    def test_expiry_checked_on_cached_entries(self, public_key):
+        """Expiry is evaluated on every call, not frozen into the cache."""
+        validator = LicenseValidator()
+        key = _license(now=datetime.datetime.now() - datetime.timedelta(days=400))
+
+        for _ in range(2):
+            result = validator.validate(key)
+            assert result["valid"] is False
+            assert result["error"] == "License Expired"
+        assert public_key.verifications == 1
+
+    def test_returned_data_does_not_alias_cache(self, public_key):
+        validator = LicenseValidator()
+        key = _license(machineId="M-1")
+
+        validator.validate(key)["data"]["machineId"] = "OTHER"
+
+        assert validator.validate(key, machine_id="M-1")["valid"] is True
@@ -0,0 +1,222 @@
+"""
+Unit tests for project_manager module.
+"""
+
+import itertools
+import json
+
+import pytest
+import python.project_manager as project_manager
+from python.project_manager import ProjectManager
+
+
+def _analysis(**overrides):
+    record = {
+        "file_path": "/data/run.csv",
+        "data_type": "gene",
+        "pathway_id": "hsa04110",
+        "pathway_name": "Cell cycle",
+        "gene_count": 3,
+        "has_pvalue": True,
+        "insights_summary": "ok",
+        "top_genes": [
+            {"gene": "TP53", "score": 2.5, "direction": "UP"},
+            {"gene": "CDK1", "score": -1.0, "direction": "DOWN"},
+        ],
+    }
+    record.update(overrides)
+    return record
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing created_at values, so ORDER BY created_at has no ties."""
+    counter = itertools.count()
+    monkeypatch.setattr(
+        project_manager, "_now_iso",
+        lambda: f"2026-01-01T00:00:00.{next(counter):06d}",
+    )
+
+
+@pytest.fixture
+def manager(tmp_path, clock):
+    return ProjectManager(str(tmp_path / "memory.db"))
+
+
+def _count(pm, table):
+    return pm._read(f"SELECT COUNT(*) FROM {table}")[0][0]
+
+
+class TestConnection:
+    """Test the long-lived connection."""
+
+    def test_wal_and_schema(self, manager):
+        """The shared connection runs in WAL mode with the covering indexes."""
+        assert manager._read("PRAGMA journal_mode")[0][0] == "wal"
+        indexes = {r["name"] for r in manager._read("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_project_genes_gene_cover", "idx_project_genes_project_cover"} <= indexes
+        assert "idx_project_genes_gene" not in indexes
+
+    def test_reopen_keeps_data(self, tmp_path, clock):
+        """Rows committed by one manager are visible to a new one on the same file."""
+        path = str(tmp_path / "memory.db")
+        first = ProjectManager(path)
+        project_id = first.record_analysis(**_analysis())
+
+        second = ProjectManager(path)
+        assert [r["id"] for r in second.list_recent()] == [project_id]
+
+    def test_failed_write_rolls_back(self, manager):
+        """An exception inside a write block leaves nothing behind."""
+        with pytest.raises(RuntimeError):
+            with manager._write() as conn:
+                conn.execute(project_manager._SQL_INSERT_AUDIT, ("t", None, "ora", None, "{}", "{}"))
+                raise RuntimeError("boom")
+        assert _count(manager, "enrichment_audits") == 0
+        # The connection is usable again afterwards
+        assert manager.record_enrichment_run(file_path=None, method="ora", gene_set_source=None, metadata={})
+
+    def test_cached_reads_see_new_writes(self, manager):
+        """list_recent is cached, but a write through the manager invalidates it."""
+        first = manager.record_analysis(**_analysis())
+        assert [r["id"] for r in manager.list_recent()] == [first]
+        second = manager.record_analysis(**_analysis(pathway_id="hsa04115"))
+        assert [r["id"] for r in manager.list_recent()] == [second, first]
+        freq = {r["pathway_id"]: r["count"] for r in manager.list_pathway_frequency()}
+        assert freq == {"hsa04110": 1, "hsa04115": 1}
+
+
+class TestDeferredWrites:
+    """Test the background writer."""
+
+    def test_flush_commits_queued_records(self, tmp_path, clock):
+        """Deferred record_* calls return None and are visible after flush()."""
+        pm = ProjectManager(str(tmp_path / "memory.db"), deferred_writes=True)
+        results = [pm.record_analysis(**_analysis()) for _ in range(100)]
+        results.append(pm.record_de_analysis(
+            file_path="/data/run.csv", method="ttest",
+            group1_samples=["a"], group2_samples=["b"], qc_report={"ok": True},
+        ))
+        assert results == [None] * 101
+
+        pm.flush()
+
+        assert _count(pm, "projects") == 100
+        assert _count(pm, "project_genes") == 200
+        assert _count(pm, "de_analyses") == 1
+
+    def test_bad_job_does_not_drop_batch(self, tmp_path, clock):
+        """A failing job in a batch is skipped; the others still commit."""
+        pm = ProjectManager(str(tmp_path / "memory.db"), deferred_writes=True)
+
+        def bad(conn):
+            raise ValueError("bad record")
+
+        pm.record_enrichment_run(file_path="a", method="ora", gene_set_source=None, metadata={})
+        pm._submit(bad)
+        pm.record_enrichment_run(file_path="b", method="ora", gene_set_source=None, metadata={})
+        pm.flush()
+
+        assert sorted(r["file_path"] for r in pm.list_enrichment_audits()) == ["a", "b"]
+
+
+class TestBulkRecord:
+    """Test record_analyses_bulk."""
+
+    def test_ids_genes_and_config(self, manager):
+        """Ids come back in input order; genes and shared configs are stored per project."""
+        shared = {"threshold": 0.05}
+        records = [
+            _analysis(config=shared),
+            _analysis(config=shared, top_genes=[{"gene": "MYC", "score": None}]),
+            _analysis(top_genes=None),
+        ]
+
+        ids = manager.record_analyses_bulk(records)
+
+        assert len(ids) == 3 and ids == sorted(ids)
+        rows = manager._read("SELECT id, config_json FROM projects ORDER BY id")
+        assert [r["id"] for r in rows] == ids
+        assert [json.loads(r["config_json"]) for r in rows] == [shared, shared, {}]
+        genes = manager._read("SELECT project_id, gene, score FROM project_genes ORDER BY project_id, gene")
+        assert [tuple(g) for g in genes] == [
+            (ids[0], "CDK1", -1.0), (ids[0], "TP53", 2.5), (ids[1], "MYC", 0.0),
+        ]
+
+    def test_all_or_nothing(self, manager):
+        """A failing record rolls back the records before it."""
+        records = [_analysis(), _analysis(top_genes=[{"gene": "TP53", "score": "high"}])]
+
+        with pytest.raises(ValueError):
+            manager.record_analyses_bulk(records)
+
+        assert _count(manager, "projects") == 0
+        assert _count(manager, "project_genes") == 0
+
+
+class TestGeneContext:
+    """Test both get_gene_context query plans."""
+
+    @pytest.fixture
+    def populated(self, manager):
+        # 40 projects, each hitting a rotating window of 10 genes out of 60
+        for p in range(40):
+            manager.record_analysis(**_analysis(
+                pathway_id=f"path{p}",
+                top_genes=[
+                    {"gene": f"G{(p * 7 + k) % 60}", "score": float(k), "direction": "UP"}
+                    for k in range(10)
+                ],
+            ))
+        return manager
+
+    @staticmethod
+    def _expected(pm, genes, limit):
+        rows = pm._read("""
+            SELECT p.id, p.created_at, g.gene FROM project_genes g
+            JOIN projects p ON p.id = g.project_id
+        """)
+        wanted = set(genes)
+        hits = sorted((r for r in rows if r["gene"] in wanted), key=lambda r: r["created_at"], reverse=True)
+        return [(r["id"], r["gene"]) for r in hits[:limit]]
+
+    def _check(self, pm, genes, limit, plan, monkeypatch):
+        queries = []
+        read = pm._read
+        monkeypatch.setattr(pm, "_read", lambda q, p=(): queries.append(q) or read(q, p))
+        rows = pm.get_gene_context(genes, limit=limit)
+        assert queries[0].startswith(plan.split("{placeholders}")[0])
+
+        expected = self._expected(pm, genes, limit)
+        # Same projects newest first. Gene order within one project is
+        # unspecified, so the last (possibly cut off) project is compared by id only
+        assert [r["id"] for r in rows] == [pid for pid, _ in expected]
+        last = expected[-1][0]
+        assert sorted((r["id"], r["gene"]) for r in rows if r["id"] != last) == \
+            sorted(pair for pair in expected if pair[0] != last)
+
+    def test_small_list_uses_gene_index_plan(self, populated, monkeypatch):
+        """A few genes go through the gene index and come back newest first."""
+        self._check(populated, ["G3", "G17", "G42"], 8, project_manager._SQL_GENE_CONTEXT, monkeypatch)
+
+    def test_large_list_uses_recent_first_plan(self, populated, monkeypatch):
+        """A list past the threshold is walked newest-first with the same result."""
+        genes = [f"G{i}" for i in range(0, 60, 2)] + [f"MISSING{i}" for i in range(270)]
+        assert len(genes) >= project_manager._RECENT_FIRST_MIN_GENES
+        self._check(populated, genes, 25, project_manager._SQL_GENE_CONTEXT_RECENT_FIRST, monkeypatch)
+
+    def test_plans_agree(self, populated):
+        """Both statements return the same rows for the same gene list."""
+        genes = [f"G{i}" for i in range(0, 60, 3)]
+        params = (*genes, 1000)
+        placeholders = ",".join(["?"] * len(genes))
+        by_gene = populated._read(project_manager._SQL_GENE_CONTEXT.format(placeholders=placeholders), params)
+        by_project = populated._read(
+            project_manager._SQL_GENE_CONTEXT_RECENT_FIRST.format(placeholders=placeholders), params
+        )
+
+        assert [r["id"] for r in by_gene] == [r["id"] for r in by_project]
+        assert sorted(map(tuple, by_gene)) == sorted(map(tuple, by_project))
+
+    def test_empty_list(self, manager):
+        assert manager.get_gene_context([]) == []